@@ -31,12 +31,13 @@ class ChatAgent:
         self.codebase = codebase
         self.agent = create_chat_agent(self.codebase, model_provider=model_provider, model_name=model_name, memory=memory, additional_tools=tools, **kwargs)
 
-    def run(self, prompt: str, thread_id: Optional[str] = None) -> str:
+    def run(self, prompt: str, thread_id: Optional[str] = None, stream: bool = False) -> str:
         """Run the agent with a prompt.
 
         Args:
             prompt: The prompt to run
             thread_id: Optional thread ID for message history. If None, a new thread is created.
+            stream: Whether to print the model's tokens and tool calls as they arrive instead of complete messages
 
         Returns:
             The agent's response
@@ -45,6 +46,12 @@ class ChatAgent:
             thread_id = str(uuid4())
 
         input = {"query": prompt}
+        if stream:
+            from codegen.cli.rich.agent_stream import AgentStreamRenderer
+
+            messages = self.agent.stream(input, config={"configurable": {"thread_id": thread_id}}, stream_mode="messages")
+            return AgentStreamRenderer().render(messages)
+
         stream = self.agent.stream(input, config={"configurable": {"thread_id": thread_id}}, stream_mode="values")
 
         for s in stream:
@@ -59,12 +66,13 @@ class ChatAgent:
 
         return s["final_answer"]
 
-    def chat(self, prompt: str, thread_id: Optional[str] = None) -> tuple[str, str]:
+    def chat(self, prompt: str, thread_id: Optional[str] = None, stream: bool = False) -> tuple[str, str]:
         """Chat with the agent, maintaining conversation history.
 
         Args:
             prompt: The user message
             thread_id: Optional thread ID for message history. If None, a new thread is created.
+            stream: Whether to print the model's tokens and tool calls as they arrive
 
         Returns:
             A tuple of (response_content, thread_id) to allow continued conversation
@@ -75,7 +83,7 @@ class ChatAgent:
         else:
             print(f"Continuing chat thread: {thread_id}")
 
-        response = self.run(prompt, thread_id=thread_id)
+        response = self.run(prompt, thread_id=thread_id, stream=stream)
         return response, thread_id
 
     def get_chat_history(self, thread_id: str) -> list:
@@ -5,21 +5,29 @@ from uuid import uuid4
 from langchain.tools import BaseTool
 from langchain_core.messages import AIMessage, HumanMessage
 from langchain_core.runnables.config import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph.graph import CompiledGraph
 from langsmith import Client
 
-from codegen.agents.loggers import ExternalLogger
+from codegen.agents.loggers import BatchingLogger, ExternalLogger, get_batching_logger
 from codegen.agents.tracer import MessageStreamTracer
 from codegen.extensions.langchain.agent import create_codebase_agent
 from codegen.extensions.langchain.utils.get_langsmith_url import (
-    find_and_print_langsmith_run_url,
+    RootRunIdCallbackHandler,
+    get_langsmith_url,
 )
+from codegen.extensions.langchain.utils.io_executor import run_in_io_executor
+from codegen.extensions.langchain.utils.tool_cache import get_tool_cache
+from codegen.extensions.langchain.utils.tool_metrics import get_tool_metrics
 
 if TYPE_CHECKING:
     from codegen import Codebase
 
 from codegen.agents.utils import AgentConfig
 
+# Seconds to wait for the logger to deliver the records of a run
+LOGGER_FLUSH_TIMEOUT = 5.0
+
 
 class CodeAgent:
     """Agent for interacting with a codebase."""
@@ -32,6 +40,7 @@ class CodeAgent:
     run_id: str | None = None
     instance_id: str | None = None
     difficulty: int | None = None
+    langsmith_run_id: str | None = None
     logger: Optional[ExternalLogger] = None
 
     def __init__(
@@ -46,6 +55,7 @@ class CodeAgent:
         agent_config: Optional[AgentConfig] = None,
         thread_id: Optional[str] = None,
         logger: Optional[ExternalLogger] = None,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
         **kwargs,
     ):
         """Initialize a CodeAgent.
@@ -58,6 +68,9 @@ class CodeAgent:
             tools: Additional tools to use
             tags: Tags to add to the agent trace. Must be of the same type.
             metadata: Metadata to use for the agent. Must be a dictionary.
+            checkpointer: Checkpointer for the conversation state. Defaults to the database named
+                by CODEGEN_CHECKPOINT_DB, or ~/.cache/codegen/checkpoints.db. Pass the same thread_id
+                and a persistent checkpointer to `resume` a run in another process.
             **kwargs: Additional LLM configuration options. Supported options:
                 - temperature: Temperature parameter (0-1)
                 - top_p: Top-p sampling parameter (0-1)
@@ -72,6 +85,7 @@ class CodeAgent:
             memory=memory,
             additional_tools=tools,
             config=agent_config,
+            checkpointer=checkpointer,
             **kwargs,
         )
         self.model_name = model_name
@@ -96,8 +110,9 @@ class CodeAgent:
         # Initialize tags for agent trace
         self.tags = [*tags, self.model_name]
 
-        # set logger if provided
-        self.logger = logger
+        # set logger if provided, delivering from a background thread so a slow backend can't stall the agent.
+        # Agents given the same logger share that thread.
+        self.logger = get_batching_logger(logger) if logger is not None else None
 
         # Initialize metadata for agent trace
         self.metadata = {
@@ -117,6 +132,101 @@ class CodeAgent:
         Returns:
             The agent's response
         """
+        content, config = self._prepare_run(prompt, image_urls)
+        # we stream the steps instead of invoke because it allows us to access intermediate nodes.
+        # Updates only carry what each node changed, instead of the full state after every step.
+        human_message = HumanMessage(content=content, id=str(uuid4()))
+        stream = self.agent.stream({"messages": [human_message]}, config=config, stream_mode="updates")
+
+        _tracer = MessageStreamTracer(logger=self.logger)
+
+        # Process the stream with the tracer
+        traced_stream = _tracer.process_stream(stream)
+
+        # Keep track of run IDs from the stream
+        run_ids = []
+        result = None
+
+        _tracer.trace_input([human_message])
+        self._print_messages(_tracer.new_messages, run_ids)
+        for s in traced_stream:
+            self._print_messages(_tracer.new_messages, run_ids)
+            result = self._get_final_answer(s, result)
+
+        self._export_tool_metrics()
+        self._flush_logger()
+        self._print_trace_url()
+        return result
+
+    async def arun(self, prompt: str, image_urls: Optional[list[str]] = None) -> str:
+        """Async version of `run`.
+
+        Model calls are awaited and tools run in executors, so many agents can
+        share one event loop, e.g. in a webhook server.
+
+        Args:
+            prompt: The prompt to run
+            image_urls: Optional list of base64-encoded image strings. Example: ["data:image/png;base64,<base64_str>"]
+
+        Returns:
+            The agent's response
+        """
+        content, config = self._prepare_run(prompt, image_urls)
+
+        human_message = HumanMessage(content=content, id=str(uuid4()))
+        stream = self.agent.astream({"messages": [human_message]}, config=config, stream_mode="updates")
+
+        _tracer = MessageStreamTracer(logger=self.logger)
+        traced_stream = _tracer.aprocess_stream(stream)
+
+        run_ids = []
+        result = None
+
+        _tracer.trace_input([human_message])
+        self._print_messages(_tracer.new_messages, run_ids)
+        async for s in traced_stream:
+            self._print_messages(_tracer.new_messages, run_ids)
+            result = self._get_final_answer(s, result)
+
+        self._export_tool_metrics()
+        await run_in_io_executor(self._flush_logger)
+        # The first URL lookup fetches the tenant and project IDs from LangSmith
+        await run_in_io_executor(self._print_trace_url)
+        return result
+
+    def resume(self) -> Optional[str]:
+        """Resume an interrupted run of this agent's thread from its last checkpoint.
+
+        Returns:
+            The agent's response, or None if the thread has no checkpoint
+        """
+        config = self._new_run_config()
+        self.config = config
+        state = self.agent.get_state(config)
+        if not state.values:
+            return None
+        if not state.next:
+            # The last run completed, there is nothing left to do
+            return state.values.get("final_answer")
+
+        get_tool_cache(self.codebase).invalidate()
+        # Streaming without input continues from the last checkpoint
+        stream = self.agent.stream(None, config=config, stream_mode="updates")
+        _tracer = MessageStreamTracer(logger=self.logger)
+
+        run_ids = []
+        result = state.values.get("final_answer")
+        for s in _tracer.process_stream(stream):
+            self._print_messages(_tracer.new_messages, run_ids)
+            result = self._get_final_answer(s, result)
+
+        self._export_tool_metrics()
+        self._flush_logger()
+        self._print_trace_url()
+        return result
+
+    def _prepare_run(self, prompt: str, image_urls: Optional[list[str]]) -> tuple[list[dict], RunnableConfig]:
+        """Build the message content and run config of a run."""
         self.config = {
             "configurable": {
                 "thread_id": self.thread_id,
@@ -130,64 +240,70 @@ class CodeAgent:
         if image_urls:
             content += [{"type": "image_url", "image_url": {"url": image_url}} for image_url in image_urls]
 
-        config = RunnableConfig(configurable={"thread_id": self.thread_id}, tags=self.tags, metadata=self.metadata, recursion_limit=200)
-        # we stream the steps instead of invoke because it allows us to access intermediate nodes
+        config = self._new_run_config()
 
-        stream = self.agent.stream({"messages": [HumanMessage(content=content)]}, config=config, stream_mode="values")
+        # Tool results are only memoized within a run, the codebase may have changed since the last one
+        get_tool_cache(self.codebase).invalidate()
+        return content, config
 
-        _tracer = MessageStreamTracer(logger=self.logger)
+    def _export_tool_metrics(self) -> None:
+        """Log the cumulative tool metrics of the process after a run, ahead of `_flush_logger`."""
+        if self.logger:
+            get_tool_metrics().export(self.logger)
 
-        # Process the stream with the tracer
-        traced_stream = _tracer.process_stream(stream)
+    def _flush_logger(self) -> None:
+        """Wait for the records of a run to be delivered before returning it."""
+        if isinstance(self.logger, BatchingLogger):
+            self.logger.flush(LOGGER_FLUSH_TIMEOUT)
 
-        # Keep track of run IDs from the stream
-        run_ids = []
-
-        for s in traced_stream:
-            if len(s["messages"]) == 0 or isinstance(s["messages"][-1], HumanMessage):
-                message = HumanMessage(content=content)
-            else:
-                message = s["messages"][-1]
+    def _new_run_config(self) -> RunnableConfig:
+        """Build the config of a run, capturing the ID of its root run for the trace URL."""
+        self._run_id_handler = RootRunIdCallbackHandler()
+        return RunnableConfig(configurable={"thread_id": self.thread_id}, tags=self.tags, metadata=self.metadata, recursion_limit=200, callbacks=[self._run_id_handler])
 
+    def _print_messages(self, messages: list, run_ids: list[str]) -> None:
+        """Print the new messages of a streamed update and collect their run IDs."""
+        for message in messages:
             if isinstance(message, tuple):
                 # print(message)
-                pass
+                continue
+            if isinstance(message, AIMessage) and isinstance(message.content, list) and len(message.content) > 0 and "text" in message.content[0]:
+                AIMessage(message.content[0]["text"]).pretty_print()
             else:
-                if isinstance(message, AIMessage) and isinstance(message.content, list) and len(message.content) > 0 and "text" in message.content[0]:
-                    AIMessage(message.content[0]["text"]).pretty_print()
-                else:
-                    message.pretty_print()
-
-                # Try to extract run ID if available in metadata
-                if hasattr(message, "additional_kwargs") and "run_id" in message.additional_kwargs:
-                    run_ids.append(message.additional_kwargs["run_id"])
-
-        # Get the last message content
-        result = s["final_answer"]
-
-        # # Try to find run IDs in the LangSmith client's recent runs
-        try:
-            # Find and print the LangSmith run URL
-            find_and_print_langsmith_run_url(self.langsmith_client, self.project_name)
-        except Exception as e:
+                message.pretty_print()
+
+            # Try to extract run ID if available in metadata
+            if hasattr(message, "additional_kwargs") and "run_id" in message.additional_kwargs:
+                run_ids.append(message.additional_kwargs["run_id"])
+
+    @staticmethod
+    def _get_final_answer(s: dict, default: Optional[str]) -> Optional[str]:
+        """Get the final answer set by any node of a streamed update."""
+        for update in s.values():
+            if isinstance(update, dict) and "final_answer" in update:
+                return update["final_answer"]
+        return default
+
+    def _print_trace_url(self) -> None:
+        self.langsmith_run_id = self._run_id_handler.run_id
+        run_url = self.get_agent_trace_url()
+        if run_url:
             separator = "=" * 60
-            print(f"\n{separator}\nCould not retrieve LangSmith URL: {e}")
-            import traceback
-
-            print(traceback.format_exc())
-            print(separator)
-
-        return result
+            print(f"\n{separator}\n🔍 LangSmith Run URL: {run_url}\n{separator}")
 
     def get_agent_trace_url(self) -> str | None:
         """Get the URL for the most recent agent run in LangSmith.
 
+        The run ID is captured while the agent runs and the tenant and project IDs
+        are cached, so this does not make any API requests after the first run.
+
         Returns:
             The URL for the run in LangSmith if found, None otherwise
         """
+        if self.langsmith_run_id is None:
+            return None
         try:
-            # TODO - this is definitely not correct, we should be able to get the URL directly...
-            return find_and_print_langsmith_run_url(client=self.langsmith_client, project_name=self.project_name)
+            return get_langsmith_url(self.langsmith_client, run_id=self.langsmith_run_id, project_name=self.project_name)
         except Exception as e:
             separator = "=" * 60
             print(f"\n{separator}\nCould not retrieve LangSmith URL: {e}")
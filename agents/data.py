@@ -42,6 +42,24 @@ class AssistantMessage(BaseMessage):
 
     type: Literal["assistant"] = field(default="assistant")
     tool_calls: list[ToolCall] = field(default_factory=list)
+    cache_read_tokens: int = 0  # Input tokens read from the provider's prompt cache
+    cache_creation_tokens: int = 0  # Input tokens written to the provider's prompt cache
+    model: Optional[str] = None
+    route: Optional[str] = None  # "main" or "fast", see `ModelRouter`
+    latency: Optional[float] = None  # Seconds the model took to respond
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+@dataclass
+class ModelUsage:
+    """Totals of the reasoner steps answered by one model."""
+
+    model: str
+    steps: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    total_latency: float = 0.0
 
 
 @dataclass
@@ -53,6 +71,23 @@ class ToolMessageData(BaseMessage):
     tool_response: Optional[str] = None
     tool_id: Optional[str] = None
     status: Optional[str] = None
+    cache_hit: bool = False
+
+
+@dataclass
+class ToolMetricsData(BaseMessage):
+    """Cumulative metrics of one tool in this process, see `ToolMetricsRegistry`."""
+
+    type: Literal["tool_metrics"] = field(default="tool_metrics")
+    tool_name: Optional[str] = None
+    calls: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    output_chars: int = 0
+    output_tokens: int = 0
+    total_latency: float = 0.0
+    latency_p50: float = 0.0  # Upper bounds in seconds, see `LatencyHistogram.percentile`
+    latency_p95: float = 0.0
 
 
 @dataclass
@@ -69,4 +104,4 @@ class UnknownMessage(BaseMessage):
     type: Literal["unknown"] = field(default="unknown")
 
 
-type AgentRunMessage = Union[UserMessage, SystemMessageData, AssistantMessage, ToolMessageData, FunctionMessageData, UnknownMessage]
+type AgentRunMessage = Union[UserMessage, SystemMessageData, AssistantMessage, ToolMessageData, ToolMetricsData, FunctionMessageData, UnknownMessage]
@@ -1,7 +1,24 @@
-from typing import Protocol
+import atexit
+import queue
+import threading
+import time
+import weakref
+from typing import Optional, Protocol
+
+from codegen.shared.logging.get_logger import get_logger
 
 from .data import AgentRunMessage
 
+logger = get_logger(__name__)
+
+# Batching loggers that are still running. Their threads are daemons, so the records
+# still queued at interpreter exit are delivered by an exit hook instead.
+_open_loggers: "weakref.WeakSet[BatchingLogger]" = weakref.WeakSet()
+
+# Batching logger of each wrapped logger by its id, see `get_batching_logger`
+_batching_loggers: dict[int, "BatchingLogger"] = {}
+_batching_loggers_lock = threading.Lock()
+
 
 # Define the interface for ExternalLogger
 class ExternalLogger(Protocol):
@@ -14,3 +31,122 @@ class ExternalLogger(Protocol):
             data: The structured data to log, either as a dictionary or a BaseMessage
         """
         pass
+
+
+class BatchingLogger:
+    """ExternalLogger that hands records to another logger from a background thread.
+
+    `log` only enqueues, so a slow or failing backend never delays the agent. Records
+    are delivered in batches, through the wrapped logger's `log_batch` if it has one.
+    The queue is bounded: when the backend falls behind, the oldest records are
+    dropped and counted in `dropped`. Loggers that were not closed are closed at
+    interpreter exit.
+
+    Args:
+        logger: The logger to deliver records to
+        max_queue_size: Maximum number of records waiting for delivery
+        batch_size: Maximum number of records per delivery
+        flush_interval: Seconds to wait for a batch to fill up before delivering it
+    """
+
+    def __init__(self, logger: ExternalLogger, max_queue_size: int = 10000, batch_size: int = 100, flush_interval: float = 1.0) -> None:
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: queue.Queue[AgentRunMessage] = queue.Queue(maxsize=max_queue_size)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._worker, name="batching-logger", daemon=True)
+        self._thread.start()
+        _open_loggers.add(self)
+
+    def log(self, data: AgentRunMessage) -> None:
+        while True:
+            try:
+                self._queue.put_nowait(data)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queued records were delivered.
+
+        Returns:
+            Whether the queue was drained before the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Deliver the queued records and stop the background thread."""
+        _open_loggers.discard(self)
+        with _batching_loggers_lock:
+            if _batching_loggers.get(id(self.logger)) is self:
+                del _batching_loggers[id(self.logger)]
+        self.flush(timeout)
+        self._closed.set()
+        self._thread.join(timeout)
+
+    def _worker(self) -> None:
+        while not self._closed.is_set():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            # Give the batch a moment to fill up, without holding records back for long
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._deliver(batch)
+
+    def _deliver(self, batch: list[AgentRunMessage]) -> None:
+        try:
+            if hasattr(self.logger, "log_batch"):
+                self.logger.log_batch(batch)
+            else:
+                for data in batch:
+                    self.logger.log(data)
+        except Exception as e:
+            logger.warning(f"Failed to deliver {len(batch)} agent log records: {e!s}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+
+def get_batching_logger(logger: ExternalLogger) -> BatchingLogger:
+    """Get the batching logger delivering to a logger, starting it on first use.
+
+    Every caller with the same logger gets the same batching logger, so agents
+    created with one logger share a single background thread instead of each
+    starting their own. Closing it starts a new one on the next call.
+    """
+    if isinstance(logger, BatchingLogger):
+        return logger
+    with _batching_loggers_lock:
+        # The registry holds the wrapped logger, so its id can't be reused while it is registered
+        batching_logger = _batching_loggers.get(id(logger))
+        if batching_logger is None:
+            batching_logger = BatchingLogger(logger)
+            _batching_loggers[id(logger)] = batching_logger
+        return batching_logger
+
+
+@atexit.register
+def _close_open_loggers() -> None:
+    for batching_logger in list(_open_loggers):
+        batching_logger.close()
@@ -1,4 +1,5 @@
-from collections.abc import Generator
+from collections import deque
+from collections.abc import AsyncIterator, Generator
 from typing import Any, Optional
 
 from langchain.schema import AIMessage, HumanMessage
@@ -6,57 +7,108 @@ from langchain.schema import FunctionMessage as LCFunctionMessage
 from langchain.schema import SystemMessage as LCSystemMessage
 from langchain_core.messages import ToolMessage as LCToolMessage
 
-from .data import AssistantMessage, BaseMessage, FunctionMessageData, SystemMessageData, ToolCall, ToolMessageData, UnknownMessage, UserMessage
+from .data import AssistantMessage, BaseMessage, FunctionMessageData, ModelUsage, SystemMessageData, ToolCall, ToolMessageData, UnknownMessage, UserMessage
 from .loggers import ExternalLogger
 
 
+# Number of traces kept in memory, older ones are only available through the logger
+MAX_TRACES = 1000
+
+
 class MessageStreamTracer:
-    def __init__(self, logger: Optional[ExternalLogger] = None):
-        self.traces = []
+    """Traces the messages of an agent stream.
+
+    Works with both `stream_mode="values"` and `stream_mode="updates"` streams. Each
+    message is traced once, when it first appears. Only the most recent `max_traces`
+    records are kept. Pass a `BatchingLogger` as the logger so a slow backend does not
+    delay the agent.
+    """
+
+    def __init__(self, logger: Optional[ExternalLogger] = None, max_traces: int = MAX_TRACES):
+        self.traces: deque[BaseMessage] = deque(maxlen=max_traces)
         self.logger = logger
+        # Messages seen in the last chunk for the first time
+        self.new_messages: list[Any] = []
+        self._seen_ids: set[str] = set()
+        self.cache_hits = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+        # Steps, tokens and latency of the model responses, by model
+        self.model_usage: dict[str, ModelUsage] = {}
 
     def process_stream(self, message_stream: Generator) -> Generator:
         """Process the stream of messages from the LangGraph agent,
         extract structured data, and pass through the messages.
         """
         for chunk in message_stream:
-            # Process the chunk
-            structured_data = self.extract_structured_data(chunk)
-
-            # Log the structured data
-            if structured_data:
-                self.traces.append(structured_data)
-
-                # If there's an external logger, send the data there
-                if self.logger:
-                    self.logger.log(structured_data)
-
+            self._trace_chunk(chunk)
             # Pass through the chunk to maintain the original stream behavior
             yield chunk
 
+    async def aprocess_stream(self, message_stream: AsyncIterator) -> AsyncIterator:
+        """Async version of `process_stream` for streams from `astream`."""
+        async for chunk in message_stream:
+            self._trace_chunk(chunk)
+            yield chunk
+
+    def trace_input(self, messages: list[Any]) -> None:
+        """Trace the input messages of a run, which update streams don't include."""
+        self._trace_chunk({"messages": messages})
+
+    def _trace_chunk(self, chunk: dict[str, Any]) -> None:
+        self.new_messages = self._extract_new_messages(chunk)
+        for message in self.new_messages:
+            structured_data = self.to_structured_data(message)
+            self.traces.append(structured_data)
+
+            # If there's an external logger, send the data there
+            if self.logger:
+                self.logger.log(structured_data)
+
+    def _extract_new_messages(self, chunk: dict[str, Any]) -> list[Any]:
+        """Get the messages of a chunk that were not traced yet, in order."""
+        if not isinstance(chunk, dict):
+            return []
+
+        if "messages" in chunk:
+            # Full state: new messages are at the end, stop at the first one already seen
+            messages = chunk["messages"]
+            new = []
+            for message in reversed(messages):
+                if self._is_seen(message):
+                    break
+                new.append(message)
+            new.reverse()
+        else:
+            # Updates of each node: new messages, or a summarize update that rebuilds the history
+            new = []
+            for update in chunk.values():
+                messages = update.get("messages") if isinstance(update, dict) else None
+                if isinstance(messages, dict) and messages.get("type") == "summarize":
+                    messages = [m for m in [messages.get("summary_message"), *messages.get("tail", [])] if m is not None]
+                if isinstance(messages, list):
+                    new.extend(m for m in messages if not self._is_seen(m))
+
+        for message in new:
+            if getattr(message, "id", None):
+                self._seen_ids.add(message.id)
+        return new
+
+    def _is_seen(self, message) -> bool:
+        message_id = getattr(message, "id", None)
+        return message_id is not None and message_id in self._seen_ids
+
     def extract_structured_data(self, chunk: dict[str, Any]) -> Optional[BaseMessage]:
-        """Extract structured data from a message chunk.
+        """Extract structured data for the latest message of a full state chunk.
         Returns None if the chunk doesn't contain useful information.
-        Returns a BaseMessage subclass instance based on the message type.
         """
-        # Get the messages from the chunk if available
         messages = chunk.get("messages", [])
-        if not messages and isinstance(chunk, dict):
-            # Sometimes the message might be in a different format
-            for key, value in chunk.items():
-                if isinstance(value, list) and all(hasattr(item, "type") for item in value if hasattr(item, "__dict__")):
-                    messages = value
-                    break
-
         if not messages:
             return None
+        return self.to_structured_data(messages[-1])
 
-        # Get the latest message
-        latest_message = messages[-1] if messages else None
-
-        if not latest_message:
-            return None
-
+    def to_structured_data(self, latest_message) -> BaseMessage:
+        """Convert a LangChain message to a BaseMessage subclass instance based on the message type."""
         # Determine message type
         message_type = self._get_message_type(latest_message)
         content = self._get_message_content(latest_message)
@@ -69,7 +121,23 @@ class MessageStreamTracer:
         elif message_type == "assistant":
             tool_calls_data = self._extract_tool_calls(latest_message)
             tool_calls = [ToolCall(name=tc.get("name"), arguments=tc.get("arguments"), id=tc.get("id")) for tc in tool_calls_data]
-            return AssistantMessage(type=message_type, content=content, tool_calls=tool_calls)
+            cache_read_tokens, cache_creation_tokens = self._record_prompt_cache_usage(latest_message)
+            metadata = getattr(latest_message, "response_metadata", None) or {}
+            usage = getattr(latest_message, "usage_metadata", None) or {}
+            assistant_message = AssistantMessage(
+                type=message_type,
+                content=content,
+                tool_calls=tool_calls,
+                cache_read_tokens=cache_read_tokens,
+                cache_creation_tokens=cache_creation_tokens,
+                model=metadata.get("model_name") or metadata.get("model"),
+                route=metadata.get("model_route"),
+                latency=metadata.get("latency"),
+                input_tokens=usage.get("input_tokens", 0),
+                output_tokens=usage.get("output_tokens", 0),
+            )
+            self._record_model_usage(assistant_message)
+            return assistant_message
         elif message_type == "tool":
             return ToolMessageData(
                 type=message_type,
@@ -78,12 +146,40 @@ class MessageStreamTracer:
                 tool_response=getattr(latest_message, "artifact", content),
                 tool_id=getattr(latest_message, "tool_call_id", None),
                 status=getattr(latest_message, "status", None),
+                cache_hit=self._record_cache_hit(latest_message),
             )
         elif message_type == "function":
             return FunctionMessageData(type=message_type, content=content)
         else:
             return UnknownMessage(type=message_type, content=content)
 
+    def _record_cache_hit(self, message) -> bool:
+        """Check whether a tool result came from the tool result cache, counting hits."""
+        cache_hit = bool(getattr(message, "additional_kwargs", {}).get("cache_hit"))
+        if cache_hit:
+            self.cache_hits += 1
+        return cache_hit
+
+    def _record_prompt_cache_usage(self, message) -> tuple[int, int]:
+        """Get the prompt cache read and creation tokens of a model response, adding them to the totals."""
+        usage = getattr(message, "usage_metadata", None) or {}
+        details = usage.get("input_token_details") or {}
+        cache_read = details.get("cache_read") or 0
+        cache_creation = details.get("cache_creation") or 0
+        self.cache_read_tokens += cache_read
+        self.cache_creation_tokens += cache_creation
+        return cache_read, cache_creation
+
+    def _record_model_usage(self, message: AssistantMessage) -> None:
+        """Add a model response to the totals of its model."""
+        if message.model is None:
+            return
+        usage = self.model_usage.setdefault(message.model, ModelUsage(model=message.model))
+        usage.steps += 1
+        usage.input_tokens += message.input_tokens
+        usage.output_tokens += message.output_tokens
+        usage.total_latency += message.latency or 0.0
+
     def _get_message_type(self, message) -> str:
         """Determine the type of message."""
         if isinstance(message, HumanMessage):
@@ -135,9 +231,15 @@ class MessageStreamTracer:
         return tool_calls
 
     def get_traces(self) -> list[BaseMessage]:
-        """Get all collected traces."""
-        return self.traces
+        """Get the most recent traces."""
+        return list(self.traces)
 
     def clear_traces(self) -> None:
         """Clear all traces."""
-        self.traces = []
+        self.traces.clear()
+        self.new_messages = []
+        self._seen_ids.clear()
+        self.cache_hits = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+        self.model_usage.clear()
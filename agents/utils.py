@@ -6,3 +6,8 @@ class AgentConfig(TypedDict, total=False):
 
     keep_first_messages: int  # Number of initial messages to keep during summarization
     max_messages: int  # Maximum number of messages before triggering summarization
+    background_summarization: bool  # Whether to start summarizing in the background before the limits are reached
+    soft_max_messages: int  # Number of messages at which a background summary is started
+    summarize_soft_token_margin: int  # Start a background summary this many tokens below the input budget (context window minus the response)
+    summarize_token_margin: int  # Summarize before a request estimated to come this close to the input budget
+    compaction_keep_recent: int  # Number of most recent messages whose tool outputs are never truncated by compaction
@@ -4,9 +4,9 @@ import warnings
 import rich_click as click
 from langchain_core.messages import SystemMessage
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.prompt import Prompt
 
+from codegen.cli.rich.agent_stream import AgentStreamRenderer
 from codegen.extensions.langchain.agent import create_agent_with_tools
 from codegen.extensions.langchain.tools import (
     CreateFileTool,
@@ -51,13 +51,6 @@ def agent_command(query: str):
     with console.status("[bold green]Initializing codebase...[/bold green]"):
         codebase = Codebase("./")
 
-    # Helper function for agent to print messages
-    def say(message: str):
-        console.print()  # Add blank line before message
-        markdown = Markdown(message)
-        console.print(markdown)
-        console.print()  # Add blank line after message
-
     # Initialize tools
     tools = [
         ViewFileTool(codebase),
@@ -90,7 +83,7 @@ Always explain what you're planning to do before taking actions."""
         query = Prompt.ask("[bold]>[/bold]")  # Simple arrow prompt
 
     # Create the agent
-    agent = create_agent_with_tools(codebase=codebase, tools=tools, system_message=system_message)
+    agent = create_agent_with_tools(codebase=codebase, tools=tools, system_message=system_message, debug=False)
 
     # Main chat loop
     while True:
@@ -103,19 +96,17 @@ Always explain what you're planning to do before taking actions."""
         if user_input.lower() in ["exit", "quit"]:
             break
 
-        # Invoke the agent
-        with console.status("[bold green]Agent is thinking...") as status:
-            try:
-                thread_id = str(uuid.uuid4())
-                result = agent.invoke(
-                    {"input": user_input},
-                    config={"configurable": {"thread_id": thread_id}},
-                )
-
-                result = result["messages"][-1].content
-                # Update chat history with AI's response
-                if result:
-                    say(result)
-            except Exception as e:
-                console.print(f"[bold red]Error during agent execution:[/bold red] {e}")
-                break
+        # Stream the agent's tokens and tool calls as they arrive
+        console.print()
+        try:
+            thread_id = str(uuid.uuid4())
+            stream = agent.stream(
+                {"query": user_input},
+                config={"configurable": {"thread_id": thread_id}},
+                stream_mode="messages",
+            )
+            AgentStreamRenderer(console).render(stream)
+            console.print()
+        except Exception as e:
+            console.print(f"[bold red]Error during agent execution:[/bold red] {e}")
+            break
@@ -0,0 +1,117 @@
+"""Incremental rendering of agent runs streamed with `stream_mode="messages"`."""
+
+import time
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from rich.console import Console
+from rich.text import Text
+
+# Only the output of these nodes is shown, not the summarizer's tokens or compacted tool outputs
+REASONER_NODE = "reasoner"
+TOOLS_NODE = "tools"
+
+# Tool outputs are cut to this many lines and characters
+MAX_OUTPUT_LINES = 15
+MAX_OUTPUT_CHARS = 2000
+
+
+def truncate_output(output: str, max_lines: int = MAX_OUTPUT_LINES, max_chars: int = MAX_OUTPUT_CHARS) -> str:
+    """Cut a tool output down for display, noting how much was left out."""
+    lines = output.splitlines()
+    shown = "\n".join(lines[:max_lines])[:max_chars]
+    if shown == "\n".join(lines):
+        return output
+    return f"{shown}\n... ({len(output) - len(shown)} more characters)"
+
+
+def _text_of(content: Any) -> str:
+    """Get the text of a message or chunk content, skipping tool use blocks."""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict) and block.get("type") == "text")
+
+
+class AgentStreamRenderer:
+    """Renders model tokens, tool calls and tool results as they arrive.
+
+    Feed it the `(message, metadata)` pairs of a `stream_mode="messages"` stream.
+    Text is printed token by token. Tool calls are shown when the model starts
+    writing them and again when their result arrives, with the result truncated.
+    """
+
+    def __init__(self, console: Console | None = None, max_output_lines: int = MAX_OUTPUT_LINES, max_output_chars: int = MAX_OUTPUT_CHARS) -> None:
+        self.console = console or Console()
+        self.max_output_lines = max_output_lines
+        self.max_output_chars = max_output_chars
+        # Text of the last model response, the final answer once the run is done
+        self.answer = ""
+        self._message_id: str | None = None
+        self._tool_calls: dict[str, tuple[str, float]] = {}  # Tool name and start time, by tool call ID
+        self._at_line_start = True
+
+    def render(self, stream: Iterable[tuple[BaseMessage, dict[str, Any]]]) -> str:
+        """Render a stream and return the final answer."""
+        for message, metadata in stream:
+            self.handle(message, metadata)
+        self.finish()
+        return self.answer
+
+    async def arender(self, stream: AsyncIterator[tuple[BaseMessage, dict[str, Any]]]) -> str:
+        """Async version of `render` for streams from `astream`."""
+        async for message, metadata in stream:
+            self.handle(message, metadata)
+        self.finish()
+        return self.answer
+
+    def handle(self, message: BaseMessage, metadata: dict[str, Any]) -> None:
+        node = metadata.get("langgraph_node")
+        if isinstance(message, ToolMessage) and node == TOOLS_NODE:
+            self._handle_tool_result(message)
+        elif isinstance(message, AIMessage) and node == REASONER_NODE:
+            self._handle_model_output(message)
+
+    def finish(self) -> None:
+        self._end_line()
+
+    def _handle_model_output(self, message: AIMessage) -> None:
+        if message.id != self._message_id:
+            # A new model response, chunks of one response share its ID
+            self._end_line()
+            self._message_id = message.id
+            self.answer = ""
+
+        if text := _text_of(message.content):
+            self.answer += text
+            self._write(text)
+
+        chunks = message.tool_call_chunks if isinstance(message, AIMessageChunk) else message.tool_calls
+        for chunk in chunks:
+            # Only the first chunk of a tool call has its name and ID
+            if chunk.get("name") and chunk.get("id") and chunk["id"] not in self._tool_calls:
+                self._tool_calls[chunk["id"]] = (chunk["name"], time.perf_counter())
+                self._end_line()
+                self.console.print(f"[bold blue]→ {chunk['name']}[/bold blue]")
+
+    def _handle_tool_result(self, message: ToolMessage) -> None:
+        self._end_line()
+        name, start = self._tool_calls.pop(message.tool_call_id, (message.name or "tool", None))
+        elapsed = f" ({time.perf_counter() - start:.1f}s)" if start is not None else ""
+        if message.status == "error":
+            self.console.print(f"[bold red]✗ {name}{elapsed}[/bold red]")
+        else:
+            self.console.print(f"[bold green]✓ {name}{elapsed}[/bold green]")
+
+        output = truncate_output(_text_of(message.content), self.max_output_lines, self.max_output_chars)
+        if output.strip():
+            self.console.print(Text(output, style="dim"))
+
+    def _write(self, text: str) -> None:
+        self.console.print(text, end="", markup=False, highlight=False, soft_wrap=True)
+        self._at_line_start = text.endswith("\n")
+
+    def _end_line(self) -> None:
+        if not self._at_line_start:
+            self.console.print()
+            self._at_line_start = True
@@ -0,0 +1,321 @@
+"""End-to-end benchmark of the agent framework with a scripted model.
+
+Runs `create_codebase_agent` on generated fixture repositories with a fake chat model
+that replies with a fixed sequence of tool calls. Model latency is zero, so what is
+measured is the framework: graph steps, reducers, tool execution, tracing and
+rendering. For every repository size it reports the wall time per graph step, the
+latency per tool, the peak RSS and the size of the message history.
+
+Each size runs in its own process, so peak RSS is per size. Fixture repositories are
+generated once and reused from the fixtures directory.
+
+Usage:
+    python -m codegen.extensions.benchmarks.agent_e2e [--sizes 1000 10000 50000]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.2]
+"""
+
+#!/usr/bin/env python
+import argparse
+import io
+import json
+import multiprocessing
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+from rich.console import Console
+
+from codegen.agents.tracer import MessageStreamTracer
+from codegen.cli.rich.agent_stream import AgentStreamRenderer
+from codegen.extensions.langchain.agent import create_codebase_agent
+from codegen.sdk.core.codebase import Codebase
+
+SIZES = [1000, 10000, 50000]
+FILES_PER_PACKAGE = 100
+QUERY = "Find the helpers of the first module, add a scratch module next to it and clean it up again."
+
+# Changes smaller than this are noise, whatever the relative threshold
+MIN_REGRESSION_MS = 1.0
+
+# ============================ FIXTURES ============================
+
+
+def _module_path(i: int) -> str:
+    return f"pkg_{i // FILES_PER_PACKAGE:04d}/module_{i:05d}.py"
+
+
+def _module_source(i: int) -> str:
+    lines = []
+    if i > 0:
+        previous = _module_path(i - 1).removesuffix(".py").replace("/", ".")
+        lines += [f"from {previous} import Model{i - 1}, helper_{i - 1}", ""]
+    # Keep inheritance chains within a package, a chain over every file would only test recursion depth
+    base = f"Model{i - 1}" if i % FILES_PER_PACKAGE else "object"
+    call = f"helper_{i - 1}(value) + " if i > 0 else ""
+    lines += [
+        "",
+        f"class Model{i}({base}):",
+        f'    """Model number {i}."""',
+        "",
+        "    def __init__(self, value: int) -> None:",
+        "        self.value = value",
+        "",
+        "    def compute(self) -> int:",
+        f"        return helper_{i}(self.value)",
+        "",
+        "",
+        f"def helper_{i}(value: int) -> int:",
+        f"    return {call}value * {i % 7 + 1}",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def ensure_fixture_repo(fixtures_dir: Path, num_files: int) -> Path:
+    """Get the fixture repository with `num_files` modules, generating it if needed."""
+    repo = fixtures_dir / f"repo_{num_files}"
+    if (repo / ".git").exists():
+        return repo
+
+    repo.mkdir(parents=True, exist_ok=True)
+    for package in range((num_files + FILES_PER_PACKAGE - 1) // FILES_PER_PACKAGE):
+        (repo / f"pkg_{package:04d}").mkdir(exist_ok=True)
+        (repo / f"pkg_{package:04d}" / "__init__.py").write_text("")
+    for i in range(num_files):
+        (repo / _module_path(i)).write_text(_module_source(i))
+
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com"]
+    subprocess.run([*git, "init", "-q"], cwd=repo, check=True)
+    subprocess.run([*git, "add", "-A"], cwd=repo, check=True)
+    subprocess.run([*git, "commit", "-q", "-m", "Fixture"], cwd=repo, check=True)
+    return repo
+
+
+# ============================ SCRIPTED MODEL ============================
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that replies with a fixed sequence of messages, without any network.
+
+    The last response is repeated once the script runs out.
+    """
+
+    model_name: str = "scripted"
+    responses: list[AIMessage]
+    _position: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        response = self.responses[min(self._position, len(self.responses) - 1)]
+        self._position += 1
+        # Every response is a new message, like a live one
+        message = response.model_copy(deep=True)
+        message.id = str(uuid.uuid4())
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+
+def _tool_calls(*calls: tuple[str, dict[str, Any]]) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"} for name, args in calls])
+
+
+def build_script(num_files: int) -> list[AIMessage]:
+    """Get the model responses of the benchmark run: exploration, a small edit and a final answer."""
+    middle = num_files // 2
+    scratch = "pkg_0000/scratch.py"
+    return [
+        _tool_calls(("list_directory", {"dirpath": "./", "depth": 1})),
+        _tool_calls(("search", {"query": "def helper_1\\b"})),
+        _tool_calls(("search_files_by_name", {"pattern": "module_0000*.py"})),
+        _tool_calls(("view_file", {"filepath": _module_path(1)}), ("view_file", {"filepath": _module_path(middle)})),
+        _tool_calls(("search", {"query": "class Model", "page": 2})),
+        _tool_calls(("create_file", {"filepath": scratch, "content": "from pkg_0000.module_00001 import helper_1\n\nVALUE = helper_1(1)\n"})),
+        _tool_calls(("view_file", {"filepath": scratch})),
+        _tool_calls(("delete_file", {"filepath": scratch})),
+        AIMessage(content="helper_1 multiplies its input and calls helper_0. The scratch module was added and removed again."),
+    ]
+
+
+# ============================ MEASUREMENT ============================
+
+
+class TimingCallbackHandler(BaseCallbackHandler):
+    """Records the wall time of every graph step and tool call."""
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self.steps: dict[str, list[float]] = defaultdict(list)
+        self.tools: dict[str, list[float]] = defaultdict(list)
+        self._starts: dict[UUID, tuple[str, float]] = {}
+
+    def on_chain_start(self, serialized: dict[str, Any], inputs: Any, *, run_id: UUID, metadata: Optional[dict[str, Any]] = None, **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        # Runnables inside a node share its metadata, only time the node itself
+        if node is not None and kwargs.get("name") == node:
+            self._starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(self.steps, run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(self.steps, run_id)
+
+    def on_tool_start(self, serialized: dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = ((serialized or {}).get("name") or kwargs.get("name") or "unknown", time.perf_counter())
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(self.tools, run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(self.tools, run_id)
+
+    def _finish(self, timings: dict[str, list[float]], run_id: UUID) -> None:
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            name, started_at = start
+            timings[name].append(time.perf_counter() - started_at)
+
+
+def _summarize(timings: dict[str, list[float]]) -> dict[str, dict[str, float]]:
+    return {
+        name: {
+            "count": len(values),
+            "total_ms": round(sum(values) * 1000, 3),
+            "mean_ms": round(statistics.fmean(values) * 1000, 3),
+            "max_ms": round(max(values) * 1000, 3),
+        }
+        for name, values in sorted(timings.items())
+    }
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_benchmark(num_files: int, fixtures_dir: Path) -> dict[str, Any]:
+    """Run the scripted agent on the fixture repository with `num_files` modules."""
+    repo = ensure_fixture_repo(fixtures_dir, num_files)
+
+    start = time.perf_counter()
+    codebase = Codebase(str(repo))
+    parse_s = time.perf_counter() - start
+
+    script = build_script(num_files)
+    # No summarization, it would call a real model
+    agent = create_codebase_agent(codebase, llm=ScriptedChatModel(responses=script), config={"max_messages": 10 * len(script)})
+    timing = TimingCallbackHandler()
+    tracer = MessageStreamTracer()
+    renderer = AgentStreamRenderer(Console(file=io.StringIO(), force_terminal=True))
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}, "callbacks": [timing], "recursion_limit": 10 * len(script)}
+
+    tracing_s = rendering_s = 0.0
+    start = time.perf_counter()
+    for mode, chunk in agent.stream({"query": QUERY}, config=config, stream_mode=["updates", "messages"]):
+        chunk_start = time.perf_counter()
+        if mode == "updates":
+            tracer._trace_chunk(chunk)
+            tracing_s += time.perf_counter() - chunk_start
+        else:
+            renderer.handle(*chunk)
+            rendering_s += time.perf_counter() - chunk_start
+    renderer.finish()
+    wall_s = time.perf_counter() - start
+
+    history = agent.get_state(config).values["messages"]
+    return {
+        "files": num_files,
+        "parse_s": round(parse_s, 3),
+        "wall_s": round(wall_s, 3),
+        "steps": _summarize(timing.steps),
+        "tools": _summarize(timing.tools),
+        "tracing_ms": round(tracing_s * 1000, 3),
+        "rendering_ms": round(rendering_s * 1000, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "history": {"messages": len(history), "bytes": len(json.dumps(messages_to_dict(history), default=str))},
+    }
+
+
+# ============================ BASELINES ============================
+
+
+def _flatten(result: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not key.endswith("count"):
+            flat[f"{prefix}{key}"] = float(value)
+    return flat
+
+
+def find_regressions(results: list[dict[str, Any]], baseline: list[dict[str, Any]], threshold: float) -> list[str]:
+    """Compare results with a baseline, returning a description of every regression."""
+    baseline_by_size = {entry["files"]: _flatten(entry) for entry in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_size.get(result["files"])
+        if previous is None:
+            continue
+        for key, value in _flatten(result).items():
+            old = previous.get(key)
+            if old is None or key == "files":
+                continue
+            # Times in seconds are compared in milliseconds for the noise floor
+            scale = 1000 if key.endswith("_s") else 1
+            if value > old * (1 + threshold) and (value - old) * scale > MIN_REGRESSION_MS:
+                regressions.append(f"{result['files']} files: {key} went from {old} to {value}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Numbers of files of the fixture repositories")
+    parser.add_argument("--fixtures-dir", type=Path, default=Path(tempfile.gettempdir()) / "codegen-agent-bench", help="Directory of the generated fixture repositories")
+    parser.add_argument("--output", type=Path, help="Save the results as a JSON baseline")
+    parser.add_argument("--baseline", type=Path, help="Compare the results with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results.append(pool.submit(run_benchmark, size, args.fixtures_dir).result())
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        regressions = find_regressions(results, json.loads(args.baseline.read_text()), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    status = main()
+    sys.exit(status)
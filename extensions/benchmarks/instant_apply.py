@@ -0,0 +1,127 @@
+"""Benchmark the local instant apply merge engine against recorded edit snippets.
+
+Each line of the input JSONL file is a recorded edit:
+
+    {"initial_code": "...", "edit_snippet": "...", "merged_code": "..."}
+
+where `merged_code` is the expected result (e.g. as returned by the Relace API).
+
+Usage:
+    python -m codegen.extensions.benchmarks.instant_apply edits.jsonl [--remote]
+"""
+
+#!/usr/bin/env python
+import argparse
+import json
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from codegen.extensions.tools.instant_apply import AmbiguousEditError, apply_edit_snippet
+from codegen.extensions.tools.relace_edit import apply_relace_edit, get_relace_api_key
+
+
+@dataclass
+class ApplyStats:
+    """Accuracy and latency of one merge strategy."""
+
+    name: str
+    correct: int = 0
+    wrong: int = 0
+    ambiguous: int = 0
+    failed: int = 0
+    latencies_ms: list[float] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return self.correct + self.wrong + self.ambiguous + self.failed
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies_ms) or [0.0]
+        return {
+            "name": self.name,
+            "total": self.total,
+            "accuracy": self.correct / max(self.total, 1),
+            # Accuracy on the edits that were actually applied
+            "applied_accuracy": self.correct / max(self.correct + self.wrong, 1),
+            "ambiguous_rate": self.ambiguous / max(self.total, 1),
+            "failed": self.failed,
+            "latency_ms_p50": statistics.median(latencies),
+            "latency_ms_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        }
+
+
+def load_records(path: Path) -> list[dict]:
+    """Load the recorded edits from a JSONL file."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _matches(merged: str, expected: str) -> bool:
+    # Trailing whitespace differences are not meaningful for the comparison
+    return [l.rstrip() for l in merged.rstrip().splitlines()] == [l.rstrip() for l in expected.rstrip().splitlines()]
+
+
+def run_local(records: list[dict]) -> ApplyStats:
+    """Apply every record with the local merge engine."""
+    stats = ApplyStats(name="local")
+    for record in records:
+        start = time.perf_counter()
+        try:
+            merged = apply_edit_snippet(record["initial_code"], record["edit_snippet"])
+        except AmbiguousEditError:
+            stats.ambiguous += 1
+            continue
+        except Exception:
+            stats.failed += 1
+            continue
+        finally:
+            stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        if _matches(merged, record["merged_code"]):
+            stats.correct += 1
+        else:
+            stats.wrong += 1
+    return stats
+
+
+def run_remote(records: list[dict], api_key: str) -> ApplyStats:
+    """Apply every record with the Relace API."""
+    stats = ApplyStats(name="remote")
+    for record in records:
+        start = time.perf_counter()
+        try:
+            merged = apply_relace_edit(api_key, record["initial_code"], record["edit_snippet"])
+        except Exception:
+            stats.failed += 1
+            continue
+        finally:
+            stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        if _matches(merged, record["merged_code"]):
+            stats.correct += 1
+        else:
+            stats.wrong += 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("records", type=Path, help="JSONL file of recorded edit snippets")
+    parser.add_argument("--remote", action="store_true", help="Also benchmark the Relace API (requires RELACE_API)")
+    args = parser.parse_args()
+
+    records = load_records(args.records)
+    results = [run_local(records).summary()]
+    if args.remote:
+        results.append(run_remote(records, get_relace_api_key()).summary())
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    status = main()
+    sys.exit(status)
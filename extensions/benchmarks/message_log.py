@@ -0,0 +1,85 @@
+"""Micro-benchmark of the message history reducer over a simulated agent run.
+
+Compares the previous reducer, which walked, re-indexed and copied the whole history
+on every graph step, against the MessageLog-based reducer at several history sizes.
+Both reducers get the same updates: every step returns only its new message. The
+MessageLog reducer still copies the history on every step, so both are O(history)
+per step and the speedup is in the constant factor.
+
+Usage:
+    python -m codegen.extensions.benchmarks.message_log [--repeat 5]
+"""
+
+#!/usr/bin/env python
+import argparse
+import json
+import sys
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+
+from codegen.extensions.langchain.graph import manage_messages
+
+SIZES = [50, 200, 1000]
+
+
+def legacy_manage_messages(existing: list[AnyMessage], updates: list[AnyMessage]) -> list[AnyMessage]:
+    """The list reducer as it was before MessageLog, kept for comparison."""
+    for msg in existing + updates:
+        if not hasattr(msg, "id") or msg.id is None:
+            msg.id = str(uuid.uuid4())
+    existing_by_id = {msg.id: i for i, msg in enumerate(existing)}
+    result = existing.copy()
+    for msg in updates:
+        if msg.id in existing_by_id:
+            result[existing_by_id[msg.id]] = msg
+        else:
+            result.append(msg)
+    return result
+
+
+def _make_messages(size: int) -> list[AnyMessage]:
+    # Alternate tool calls and tool responses like a real run
+    messages = []
+    for i in range(size // 2):
+        call_id = f"call_{i}"
+        messages.append(AIMessage(content="", tool_calls=[{"name": "view_file", "args": {"filepath": f"f{i}.py"}, "id": call_id}]))
+        messages.append(ToolMessage(content="x" * 200, tool_call_id=call_id))
+    return messages
+
+
+def _run(reducer, messages: list[AnyMessage]) -> float:
+    """Simulate a run where every step returns only its new message."""
+    start = time.perf_counter()
+    state: list[AnyMessage] = []
+    for msg in messages:
+        state = reducer(state, [msg])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs per size, the best one is reported")
+    args = parser.parse_args()
+
+    results = []
+    for size in SIZES:
+        legacy = min(_run(legacy_manage_messages, _make_messages(size)) for _ in range(args.repeat))
+        message_log = min(_run(manage_messages, _make_messages(size)) for _ in range(args.repeat))
+        results.append(
+            {
+                "messages": size,
+                "legacy_ms": round(legacy * 1000, 3),
+                "message_log_ms": round(message_log * 1000, 3),
+                "speedup": round(legacy / message_log, 1) if message_log else None,
+            }
+        )
+
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    status = main()
+    sys.exit(status)
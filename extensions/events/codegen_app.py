@@ -2,10 +2,11 @@ import os
 from typing import Any, Optional
 
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 
 from codegen.configs.models.codebase import CodebaseConfig
 from codegen.configs.models.secrets import SecretsConfig
+from codegen.extensions.langchain.utils.tool_metrics import get_tool_metrics
 from codegen.sdk.core.codebase import Codebase
 from codegen.shared.logging.get_logger import get_logger
 
@@ -139,6 +140,10 @@ class CodegenApp:
             </html>
             """
 
+    async def metrics(self) -> str:
+        """Render the tool metrics of this process in the Prometheus text format."""
+        return get_tool_metrics().to_prometheus()
+
     async def handle_slack_event(self, request: Request):
         """Handle incoming Slack events."""
         payload = await request.json()
@@ -161,6 +166,10 @@ class CodegenApp:
         async def _root():
             return await self.root()
 
+        @self.app.get("/metrics", response_class=PlainTextResponse)
+        async def _metrics():
+            return await self.metrics()
+
         # @self.app.post("/{org}/{repo}/slack/events")
         @self.app.post("/slack/events")
         async def _handle_slack_event(request: Request):
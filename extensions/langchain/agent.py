@@ -3,14 +3,16 @@
 from typing import TYPE_CHECKING, Any
 
 from langchain.tools import BaseTool
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import SystemMessage
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph.graph import CompiledGraph
 
 from codegen.agents.utils import AgentConfig
 from codegen.extensions.langchain.llm import LLM
 from codegen.extensions.langchain.prompts import REASONER_SYSTEM_MESSAGE
 from codegen.extensions.langchain.tools import (
+    CreateCheckpointTool,
     CreateFileTool,
     DeleteFileTool,
     GlobalReplacementEditTool,
@@ -19,15 +21,19 @@ from codegen.extensions.langchain.tools import (
     ReflectionTool,
     RelaceEditTool,
     RenameFileTool,
+    RenameFilesTool,
     ReplacementEditTool,
     RevealSymbolTool,
     RipGrepTool,
+    RollbackToCheckpointTool,
     SearchFilesByNameTool,
     # SemanticEditTool,
     ViewFileTool,
 )
 
 from .graph import create_react_agent
+from .utils.checkpointer import get_default_checkpointer
+from .utils.model_router import ModelRouter
 
 if TYPE_CHECKING:
     from codegen import Codebase
@@ -42,6 +48,11 @@ def create_codebase_agent(
     debug: bool = False,
     additional_tools: list[BaseTool] | None = None,
     config: AgentConfig | None = None,
+    checkpointer: BaseCheckpointSaver | None = None,
+    fast_model_provider: str | None = None,
+    fast_model_name: str | None = None,
+    router: ModelRouter | None = None,
+    llm: BaseChatModel | None = None,
     **kwargs,
 ) -> CompiledGraph:
     """Create an agent with all codebase tools.
@@ -52,6 +63,11 @@ def create_codebase_agent(
         model_name: Name of the model to use
         verbose: Whether to print agent's thought process (default: True)
         chat_history: Optional list of messages to initialize chat history with
+        checkpointer: Checkpointer to use when memory is enabled, see `get_default_checkpointer`
+        fast_model_provider: Provider of the fast model, defaults to `model_provider`
+        fast_model_name: Name of a cheaper model for mechanical steps, disabled if None
+        router: Router that picks the model of each step, see `HeuristicModelRouter`
+        llm: Chat model to use instead of building one from the model options, e.g. a scripted model in benchmarks
         **kwargs: Additional LLM configuration options. Supported options:
             - temperature: Temperature parameter (0-1)
             - top_p: Top-p sampling parameter (0-1)
@@ -61,7 +77,8 @@ def create_codebase_agent(
     Returns:
         Initialized agent with message history
     """
-    llm = LLM(model_provider=model_provider, model_name=model_name, **kwargs)
+    llm = llm or LLM(model_provider=model_provider, model_name=model_name, **kwargs)
+    fast_llm = LLM(model_provider=fast_model_provider or model_provider, model_name=fast_model_name, **kwargs) if fast_model_name else None
 
     # Initialize default tools
     tools = [
@@ -72,7 +89,9 @@ def create_codebase_agent(
         CreateFileTool(codebase),
         DeleteFileTool(codebase),
         RenameFileTool(codebase),
+        RenameFilesTool(codebase),
         # MoveSymbolTool(codebase),
+        # MoveSymbolsTool(codebase),
         # RevealSymbolTool(codebase),
         # SemanticEditTool(codebase),
         ReplacementEditTool(codebase),
@@ -80,6 +99,8 @@ def create_codebase_agent(
         ReflectionTool(codebase),
         SearchFilesByNameTool(codebase),
         GlobalReplacementEditTool(codebase),
+        CreateCheckpointTool(codebase),
+        RollbackToCheckpointTool(codebase),
     ]
 
     if additional_tools:
@@ -89,9 +110,9 @@ def create_codebase_agent(
         tools = [t for t in tools if t.get_name() not in additional_names]
         tools.extend(additional_tools)
 
-    memory = MemorySaver() if memory else None
+    memory = (checkpointer or get_default_checkpointer()) if memory else None
 
-    return create_react_agent(model=llm, tools=tools, system_message=system_message, checkpointer=memory, debug=debug, config=config)
+    return create_react_agent(model=llm, tools=tools, system_message=system_message, checkpointer=memory, debug=debug, config=config, fast_model=fast_llm, router=router)
 
 
 def create_chat_agent(
@@ -139,7 +160,7 @@ def create_chat_agent(
     if additional_tools:
         tools.extend(additional_tools)
 
-    memory = MemorySaver() if memory else None
+    memory = get_default_checkpointer() if memory else None
 
     return create_react_agent(model=llm, tools=tools, system_message=system_message, checkpointer=memory, debug=debug, config=config)
 
@@ -178,7 +199,7 @@ def create_codebase_inspector_agent(
         RevealSymbolTool(codebase),
     ]
 
-    memory = MemorySaver() if memory else None
+    memory = get_default_checkpointer() if memory else None
     return create_react_agent(model=llm, tools=tools, system_message=system_message, checkpointer=memory, debug=debug, config=config)
 
 
@@ -212,6 +233,6 @@ def create_agent_with_tools(
     """
     llm = LLM(model_provider=model_provider, model_name=model_name, **kwargs)
 
-    memory = MemorySaver() if memory else None
+    memory = get_default_checkpointer() if memory else None
 
     return create_react_agent(model=llm, tools=tools, system_message=system_message, checkpointer=memory, debug=debug, config=config)
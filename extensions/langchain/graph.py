@@ -1,10 +1,12 @@
 """Demo implementation of an agent with Codegen tools."""
 
+import threading
+import time
 import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass
 from typing import Annotated, Any, Literal, Optional, Union
 
-import anthropic
-import openai
 from langchain.tools import BaseTool
 from langchain_core.messages import (
     AIMessage,
@@ -14,17 +16,38 @@ from langchain_core.messages import (
     ToolMessage,
 )
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import run_in_executor
 from langchain_core.stores import InMemoryBaseStore
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import END, START
 from langgraph.graph.state import CompiledGraph, StateGraph
-from langgraph.pregel import RetryPolicy
+from langgraph.utils.runnable import RunnableCallable
 
 from codegen.agents.utils import AgentConfig
-from codegen.extensions.langchain.llm import LLM
+from codegen.extensions.langchain.llm import DEFAULT_MAX_TOKENS, LLM
 from codegen.extensions.langchain.prompts import SUMMARIZE_CONVERSATION_PROMPT
+from codegen.extensions.langchain.utils.compaction import KEEP_RECENT_MESSAGES, compact_messages
 from codegen.extensions.langchain.utils.custom_tool_node import CustomToolNode
-from codegen.extensions.langchain.utils.utils import get_max_model_input_tokens
+from codegen.extensions.langchain.utils.io_executor import get_io_executor
+from codegen.extensions.langchain.utils.message_log import MessageLog
+from codegen.extensions.langchain.utils.model_router import ROUTE_KEY, HeuristicModelRouter, ModelRouter, Route
+from codegen.extensions.langchain.utils.token_estimator import TokenEstimator
+from codegen.extensions.langchain.utils.utils import get_model_limits
+from codegen.shared.logging.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def create_summary_message(summary: str) -> AIMessage:
+    """Create the message that replaces the summarized part of the conversation."""
+    summary_msg = AIMessage(
+        content=f"""Here is a summary of the conversation
+            from a previous timestep to aid for the continuing conversation: \n{summary}\n\n""",
+        additional_kwargs={"is_summary": True},  # Use additional_kwargs for custom metadata
+    )
+    summary_msg.id = str(uuid.uuid4())
+    return summary_msg
 
 
 def manage_messages(existing: list[AnyMessage], updates: Union[list[AnyMessage], dict]) -> list[AnyMessage]:
@@ -38,39 +61,20 @@ def manage_messages(existing: list[AnyMessage], updates: Union[list[AnyMessage],
         Updated list of messages
     """
     if isinstance(updates, list):
-        # Ensure all messages have IDs
-        for msg in existing + updates:
-            if not hasattr(msg, "id") or msg.id is None:
-                msg.id = str(uuid.uuid4())
-
-        # Create a map of existing messages by ID
-        existing_by_id = {msg.id: i for i, msg in enumerate(existing)}
-
-        # Start with copy of existing messages
-        result = existing.copy()
-
-        # Update or append new messages
-        for msg in updates:
-            if msg.id in existing_by_id:
-                # Update existing message
-                result[existing_by_id[msg.id]] = msg
-            else:
-                # Append new message
-                result.append(msg)
-
-        return result
+        # Messages with a known ID replace the existing entry, new ones are appended.
+        # The updates go into a copy, the previous channel value may still be held by
+        # a checkpoint or a reader of the state. The copy is O(history), but only a flat
+        # copy of the list and the index. Lists restored from a checkpoint are
+        # rehydrated into a new log instead.
+        log = existing.copy() if isinstance(existing, MessageLog) else MessageLog(existing or [])
+        return log.upsert(updates)
 
     if isinstance(updates, dict):
         if updates.get("type") == "summarize":
-            # Create summary message and mark it with additional_kwargs
-            summary_msg = AIMessage(
-                content=f"""Here is a summary of the conversation
-            from a previous timestep to aid for the continuing conversation: \n{updates["summary"]}\n\n""",
-                additional_kwargs={"is_summary": True},  # Use additional_kwargs for custom metadata
-            )
-            summary_msg.id = str(uuid.uuid4())
+            # Reuse the summary message if the caller already showed it to the model
+            summary_msg = updates.get("summary_message") or create_summary_message(updates["summary"])
             updates["tail"][-1].additional_kwargs["just_summarized"] = True
-            result = updates["head"] + [summary_msg] + updates["tail"]
+            result = MessageLog([*updates["head"], summary_msg, *updates["tail"]])
             return result
 
     return existing
@@ -84,58 +88,289 @@ class GraphState(dict[str, Any]):
     messages: Annotated[list[AnyMessage], manage_messages]
 
 
+@dataclass
+class PendingSummary:
+    """A conversation summary being generated in the background."""
+
+    future: Future[str]
+    summarized_ids: list[str]  # IDs of the messages the summary replaces, in order
+
+
+@dataclass
+class ReasonerStep:
+    """The model request of a reasoner step and what is needed to turn its result into a state update."""
+
+    thread_id: str
+    messages: list[AnyMessage]  # History the request was built from
+    new_messages: list[AnyMessage]  # Messages added by this step before the model response
+    request: list[AnyMessage]
+    summarized: Optional[tuple[list[AnyMessage], str, list[AnyMessage]]] = None  # (head, summary, tail) swapped in this step
+    summary_message: Optional[AIMessage] = None
+    route: Route = "main"  # Model the request goes to
+
+
 class AgentGraph:
     """Main graph class for the agent."""
 
-    def __init__(self, model: "LLM", tools: list[BaseTool], system_message: SystemMessage, config: AgentConfig | None = None):
+    def __init__(
+        self,
+        model: "LLM",
+        tools: list[BaseTool],
+        system_message: SystemMessage,
+        config: AgentConfig | None = None,
+        fast_model: Optional["LLM"] = None,
+        router: Optional[ModelRouter] = None,
+    ):
         self.model = model.bind_tools(tools)
+        # Steps the router classifies as mechanical go to the fast model, if there is one
+        self.models = {"main": self.model}
+        self.model_names = {"main": model.model_name}
+        if fast_model is not None:
+            self.models["fast"] = fast_model.bind_tools(tools)
+            self.model_names["fast"] = fast_model.model_name
+        self.router = router or (HeuristicModelRouter() if fast_model is not None else None)
         self.tools = tools
         self.system_message = system_message
         self.config = config
         self.max_messages = config.get("max_messages", 100) if config else 100
         self.keep_first_messages = config.get("keep_first_messages", 1) if config else 1
+        self.background_summarization = config.get("background_summarization", True) if config else True
+        self.soft_max_messages = config.get("soft_max_messages", int(self.max_messages * 0.8)) if config else int(self.max_messages * 0.8)
+        self.summarize_soft_token_margin = config.get("summarize_soft_token_margin", 60000) if config else 60000
+        self.summarize_token_margin = config.get("summarize_token_margin", 30000) if config else 30000
+        self.compaction_keep_recent = config.get("compaction_keep_recent", KEEP_RECENT_MESSAGES) if config else KEEP_RECENT_MESSAGES
         self.store = InMemoryBaseStore()
 
+        # Predict the size of the next request locally instead of waiting for an oversized one
+        self.model_limits = get_model_limits(model.model_name)
+        self.token_estimator = TokenEstimator(tools)
+        # The context window also holds the response, so the request must leave room for it
+        max_output_tokens = model.max_tokens or DEFAULT_MAX_TOKENS.get(model.model_provider, self.model_limits.output_tokens)
+        self.input_token_budget = self.model_limits.input_tokens - min(max_output_tokens, self.model_limits.output_tokens)
+
+        # Summaries started in the background, by thread ID
+        self._pending_summaries: dict[str, PendingSummary] = {}
+        self._pending_lock = threading.Lock()
+
     # =================================== NODES ====================================
 
     # Reasoner node
-    def reasoner(self, state: GraphState) -> dict[str, Any]:
+    def reasoner(self, state: GraphState, config: RunnableConfig) -> dict[str, Any]:
+        step = self._prepare_reasoner_step(state, config)
+        result = self._invoke_model(step)
+        if self._should_escalate(step, result):
+            step.route = "main"
+            result = self._invoke_model(step)
+        return self._finish_reasoner_step(step, result)
+
+    async def areasoner(self, state: GraphState, config: RunnableConfig) -> dict[str, Any]:
+        """Async version of `reasoner`, used when the graph is driven with `astream`/`ainvoke`."""
+        step = self._prepare_reasoner_step(state, config)
+        result = await self._ainvoke_model(step)
+        if self._should_escalate(step, result):
+            step.route = "main"
+            result = await self._ainvoke_model(step)
+        return self._finish_reasoner_step(step, result)
+
+    def _invoke_model(self, step: ReasonerStep) -> AnyMessage:
+        start = time.perf_counter()
+        result = self.models[step.route].invoke(step.request)
+        return self._tag_result(step, result, time.perf_counter() - start)
+
+    async def _ainvoke_model(self, step: ReasonerStep) -> AnyMessage:
+        start = time.perf_counter()
+        result = await self.models[step.route].ainvoke(step.request)
+        return self._tag_result(step, result, time.perf_counter() - start)
+
+    def _tag_result(self, step: ReasonerStep, result: AnyMessage, latency: float) -> AnyMessage:
+        """Record the model choice and latency of a step in the response metadata for tracing."""
+        if isinstance(result, AIMessage):
+            result.response_metadata[ROUTE_KEY] = step.route
+            result.response_metadata.setdefault("model_name", self.model_names[step.route])
+            result.response_metadata["latency"] = latency
+        return result
+
+    @staticmethod
+    def _should_escalate(step: ReasonerStep, result: AnyMessage) -> bool:
+        """Final answers always come from the main model, redo a fast step that wants to stop."""
+        if step.route == "fast" and isinstance(result, AIMessage) and not result.tool_calls:
+            logger.info("Fast model gave a final answer, escalating the step to the main model")
+            return True
+        return False
+
+    def _prepare_reasoner_step(self, state: GraphState, config: RunnableConfig) -> ReasonerStep:
         new_turn = len(state["messages"]) == 0 or isinstance(state["messages"][-1], AIMessage)
         messages = state["messages"]
-
+        thread_id = self._get_thread_id(config)
+
+        # Swap in a summary that finished in the background since the last step
+        summarized = self._take_background_summary(thread_id, messages, wait=False)
+        summary_msg = None
+        if summarized:
+            head, summary, tail = summarized
+            summary_msg = create_summary_message(summary)
+            messages = [*head, summary_msg, *tail]
+
+        # Only return the new messages, the reducer appends them to the history
+        new_messages = []
         if new_turn:
             query = state["query"]
-            messages.append(HumanMessage(content=query))
+            new_messages.append(HumanMessage(content=query))
+
+        request = [self.system_message, *messages, *new_messages]
+        route = self.router.route([*messages, *new_messages]) if self.router and "fast" in self.models else "main"
+        return ReasonerStep(thread_id=thread_id, messages=messages, new_messages=new_messages, request=request, summarized=summarized, summary_message=summary_msg, route=route)
+
+    def _finish_reasoner_step(self, step: ReasonerStep, result: AnyMessage) -> dict[str, Any]:
+        # The estimator predicts the requests of the main model, whose limits decide when to summarize
+        if step.route == "main" and getattr(result, "usage_metadata", None):
+            self.token_estimator.observe(step.request, result.usage_metadata["input_tokens"])
+
+        if step.summarized:
+            head, summary, tail = step.summarized
+            update = {"type": "summarize", "summary": summary, "summary_message": step.summary_message, "head": head, "tail": [*tail, *step.new_messages, result]}
+        else:
+            update = [*step.new_messages, result]
+            self._maybe_start_background_summary(step.thread_id, [*step.messages, *step.new_messages, result])
 
-        result = self.model.invoke([self.system_message, *messages])
         if isinstance(result, AIMessage) and not result.tool_calls:
-            updated_messages = [*messages, result]
-            return {"messages": updated_messages, "final_answer": result.content}
+            return {"messages": update, "final_answer": result.content}
 
-        updated_messages = [*messages, result]
-        return {"messages": updated_messages}
+        return {"messages": update}
 
-    def summarize_conversation(self, state: GraphState):
+    def compact_context(self, state: GraphState) -> dict[str, Any]:
+        """Compact stale tool outputs without an LLM call, see `compact_messages`."""
+        compacted = compact_messages(state["messages"], keep_recent=self.compaction_keep_recent)
+        if not compacted:
+            return {}
+        logger.info(f"Compacted {len(compacted)} stale tool outputs")
+        # Same IDs, so the reducer replaces the messages in place
+        return {"messages": compacted}
+
+    def summarize_conversation(self, state: GraphState, config: RunnableConfig):
         """Summarize conversation while preserving key context and recent messages."""
         messages = state["messages"]
+
+        # Prefer a summary that is already being generated in the background
+        summarized = self._take_background_summary(self._get_thread_id(config), messages, wait=True)
+        if summarized and summarized[2]:
+            head, new_summary, tail = summarized
+            return {"messages": {"type": "summarize", "summary": new_summary, "tail": tail, "head": head}}
+
+        split = self._split_for_summary(messages)
+        if split is None:
+            # The history is too short to summarize. Mark it as summarized anyway, so the
+            # edges move on to the next step instead of compacting and summarizing again.
+            logger.warning(f"Nothing to summarize in {len(messages)} messages over the context budget")
+            last_message = messages[-1]
+            marked = last_message.model_copy(update={"additional_kwargs": {**last_message.additional_kwargs, "just_summarized": True}})
+            return {"messages": [marked]}
+
+        head, to_summarize, tail = split
+        new_summary = self._generate_summary(to_summarize)
+        return {"messages": {"type": "summarize", "summary": new_summary, "tail": tail, "head": head}}
+
+    async def asummarize_conversation(self, state: GraphState, config: RunnableConfig):
+        """Async version of `summarize_conversation`.
+
+        Waiting for a background summary blocks, so the sync node runs in an executor
+        instead of on the event loop.
+        """
+        return await run_in_executor(config, self.summarize_conversation, state, config)
+
+    # =================================== SUMMARIZATION ====================================
+
+    def _split_for_summary(self, messages: list[AnyMessage]) -> Optional[tuple[list[AnyMessage], list[AnyMessage], list[AnyMessage]]]:
+        """Split the history into the head to keep, the part to summarize and the tail to keep.
+
+        Returns:
+            Tuple of (head, to_summarize, tail), or None if there is nothing to summarize
+        """
         keep_first = self.keep_first_messages
         target_size = len(messages) // 2
         messages_from_tail = target_size - keep_first
+        if messages_from_tail <= 0:
+            return None
 
+        truncation_idx = len(messages) - messages_from_tail
         head = messages[:keep_first]
-        tail = messages[-messages_from_tail:]
-        to_summarize = messages[: len(messages) - messages_from_tail]
+        to_summarize = messages[:truncation_idx]
+        return head, to_summarize, self._tail_after(messages, truncation_idx)
 
+    @staticmethod
+    def _tail_after(messages: list[AnyMessage], truncation_idx: int) -> list[AnyMessage]:
+        """Get the messages kept after the summarized part of the history."""
+        tail = messages[truncation_idx:]
         # Handle tool message pairing at truncation point
-        truncation_idx = len(messages) - messages_from_tail
-        if truncation_idx > 0 and isinstance(messages[truncation_idx], ToolMessage):
+        if 0 < truncation_idx < len(messages) and isinstance(messages[truncation_idx], ToolMessage):
             # Keep the AI message right before it
             tail = [messages[truncation_idx - 1], *tail]
-
-        # Skip if nothing to summarize
-        if not to_summarize:
-            return state
-
+        return tail
+
+    @staticmethod
+    def _get_thread_id(config: Optional[RunnableConfig]) -> str:
+        return (config or {}).get("configurable", {}).get("thread_id", "default")
+
+    def _maybe_start_background_summary(self, thread_id: str, messages: list[AnyMessage]) -> None:
+        """Start summarizing in the background once the history crosses the soft limits.
+
+        The hard limits in should_continue still apply. When they are reached, the
+        summarize node waits for the background summary instead of starting over.
+        """
+        if not self.background_summarization:
+            return
+
+        over_tokens = self._estimate_input_tokens(messages) > self.input_token_budget - self.summarize_soft_token_margin
+        if len(messages) <= self.soft_max_messages and not over_tokens:
+            return
+
+        with self._pending_lock:
+            if thread_id in self._pending_summaries:
+                return
+            split = self._split_for_summary(messages)
+            if split is None:
+                return
+            _, to_summarize, _ = split
+            # Copy the messages, the history is updated in place while the summary runs
+            # Summaries are LLM calls, they run on the shared I/O executor so graphs own no threads
+            future = get_io_executor().submit(self._generate_summary, list(to_summarize))
+            self._pending_summaries[thread_id] = PendingSummary(future=future, summarized_ids=[msg.id for msg in to_summarize])
+        logger.info(f"Started background summary of {len(to_summarize)} messages for thread {thread_id}")
+
+    def _take_background_summary(self, thread_id: str, messages: list[AnyMessage], wait: bool) -> Optional[tuple[list[AnyMessage], str, list[AnyMessage]]]:
+        """Take the background summary for a thread if it is ready and still valid.
+
+        A summary is only valid if the history still starts with the messages it summarized.
+
+        Args:
+            thread_id: Thread the summary was started for
+            messages: Current message history
+            wait: Whether to wait for a summary that is still being generated
+
+        Returns:
+            Tuple of (head, summary, tail), or None if no valid summary is available
+        """
+        with self._pending_lock:
+            pending = self._pending_summaries.get(thread_id)
+            if pending is None or (not wait and not pending.future.done()):
+                return None
+            del self._pending_summaries[thread_id]
+
+        try:
+            summary = pending.future.result()
+        except Exception as e:
+            logger.warning(f"Background summary for thread {thread_id} failed: {e!s}")
+            return None
+
+        truncation_idx = len(pending.summarized_ids)
+        if [msg.id for msg in messages[:truncation_idx]] != pending.summarized_ids:
+            logger.info(f"Discarding stale background summary for thread {thread_id}")
+            return None
+
+        return messages[: self.keep_first_messages], summary, self._tail_after(messages, truncation_idx)
+
+    def _generate_summary(self, to_summarize: list[AnyMessage]) -> str:
+        """Summarize a list of messages with an LLM."""
         # Define constants
         HEADER_WIDTH = 40
         HEADER_TYPES = {"human": "HUMAN", "ai": "AI", "summary": "SUMMARY FROM PREVIOUS TIMESTEP", "tool_call": "TOOL CALL", "tool_response": "TOOL RESPONSE"}
@@ -199,51 +434,63 @@ class AgentGraph:
             summarizer_content.append(image_url)
 
         chain = ChatPromptTemplate([("human", summarizer_content)]) | summary_llm
-        new_summary = chain.invoke(
+        return chain.invoke(
             {
                 "conversation": conversation,
             }
         ).content
 
-        return {"messages": {"type": "summarize", "summary": new_summary, "tail": tail, "head": head}}
+    def _estimate_input_tokens(self, messages: list[AnyMessage]) -> int:
+        """Estimate the input tokens of the next reasoner request for this history."""
+        return self.token_estimator.estimate([self.system_message, *messages])
+
+    def _over_token_budget(self, messages: list[AnyMessage]) -> bool:
+        return self._estimate_input_tokens(messages) > self.input_token_budget - self.summarize_token_margin
 
     # =================================== EDGE CONDITIONS ====================================
-    def should_continue(self, state: GraphState) -> Literal["tools", "summarize_conversation", END]:
+    def should_continue(self, state: GraphState) -> Literal["tools", "compact_context", "summarize_conversation", END]:
         messages = state["messages"]
         last_message = messages[-1]
         just_summarized = last_message.additional_kwargs.get("just_summarized")
-        curr_input_tokens = last_message.usage_metadata["input_tokens"]
-        max_input_tokens = get_max_model_input_tokens(self.model)
 
         # Summarize if the number of messages passed in exceeds the max_messages threshold (default 100)
-        if len(messages) > self.max_messages:
+        if len(messages) > self.max_messages and not just_summarized:
             return "summarize_conversation"
 
-        # Summarize if the last message exceeds the max input tokens of the model - 10000 tokens
-        elif isinstance(last_message, AIMessage) and not just_summarized and curr_input_tokens > (max_input_tokens - 30000):
-            return "summarize_conversation"
+        # Compact, then summarize if needed, if the next request is estimated to come within
+        # summarize_token_margin of the input budget
+        elif isinstance(last_message, AIMessage) and not just_summarized and self._over_token_budget(messages):
+            return "compact_context"
 
         elif hasattr(last_message, "tool_calls") and last_message.tool_calls:
             return "tools"
 
         return END
 
+    def should_reason(self, state: GraphState) -> Literal["reasoner", "compact_context"]:
+        """Compact before calling the reasoner if the tool outputs would overflow its context."""
+        messages = state["messages"]
+        if not messages[-1].additional_kwargs.get("just_summarized") and self._over_token_budget(messages):
+            return "compact_context"
+        return "reasoner"
+
+    def after_compact(self, state: GraphState) -> Literal["reasoner", "tools", "compact_context", "summarize_conversation", END]:
+        # Only fall back to LLM summarization if compaction did not free enough context
+        if self._over_token_budget(state["messages"]):
+            return "summarize_conversation"
+        return self.after_summarize(state)
+
+    def after_summarize(self, state: GraphState) -> Literal["reasoner", "tools", "compact_context", "summarize_conversation", END]:
+        # Summaries triggered after a tool call end on the tool output, which the reasoner still has to see
+        if isinstance(state["messages"][-1], ToolMessage):
+            return "reasoner"
+        return self.should_continue(state)
+
     # =================================== COMPILE GRAPH ====================================
-    def create(self, checkpointer: Optional[MemorySaver] = None, debug: bool = False) -> CompiledGraph:
+    def create(self, checkpointer: Optional[BaseCheckpointSaver] = None, debug: bool = False) -> CompiledGraph:
         """Create and compile the graph."""
         builder = StateGraph(GraphState)
 
-        # the retry policy has an initial interval, a backoff factor, and a max interval of controlling the
-        # amount of time between retries
-        retry_policy = RetryPolicy(
-            retry_on=[anthropic.RateLimitError, openai.RateLimitError, anthropic.InternalServerError, anthropic.BadRequestError],
-            max_attempts=10,
-            initial_interval=30.0,  # Start with 30 second wait
-            backoff_factor=2,  # Double the wait time each retry
-            max_interval=1000.0,  # Cap at 1000 second max wait
-            jitter=True,
-        )
-
         # Custom error handler for tool validation errors
         def handle_tool_errors(exception):
             error_msg = str(exception)
@@ -487,18 +734,24 @@ class AgentGraph:
             return f"Error executing tool: {exception!s}\n\nPlease check your tool usage and try again with the correct parameters."
 
         # Add nodes
-        builder.add_node("reasoner", self.reasoner, retry=retry_policy)
-        builder.add_node("tools", CustomToolNode(self.tools, handle_tool_errors=handle_tool_errors), retry=retry_policy)
-        builder.add_node("summarize_conversation", self.summarize_conversation, retry=retry_policy)
+        # Nodes with an async version don't block the event loop when the graph is run with astream
+        # Nodes are not retried. Model requests already retry transient errors up to
+        # MAX_ATTEMPTS times through the shared rate limiter, a node retry would multiply
+        # those attempts, and re-running the tools node would repeat their side effects.
+        builder.add_node("reasoner", RunnableCallable(self.reasoner, self.areasoner, name="reasoner"))
+        builder.add_node("tools", CustomToolNode(self.tools, handle_tool_errors=handle_tool_errors))
+        builder.add_node("compact_context", self.compact_context)
+        builder.add_node("summarize_conversation", RunnableCallable(self.summarize_conversation, self.asummarize_conversation, name="summarize_conversation"))
 
         # Add edges
         builder.add_edge(START, "reasoner")
-        builder.add_edge("tools", "reasoner")
+        builder.add_conditional_edges("tools", self.should_reason)
         builder.add_conditional_edges(
             "reasoner",
             self.should_continue,
         )
-        builder.add_conditional_edges("summarize_conversation", self.should_continue)
+        builder.add_conditional_edges("compact_context", self.after_compact)
+        builder.add_conditional_edges("summarize_conversation", self.after_summarize)
 
         return builder.compile(checkpointer=checkpointer, store=self.store, debug=debug)
 
@@ -507,10 +760,16 @@ def create_react_agent(
     model: "LLM",
     tools: list[BaseTool],
     system_message: SystemMessage,
-    checkpointer: Optional[MemorySaver] = None,
+    checkpointer: Optional[BaseCheckpointSaver] = None,
     debug: bool = False,
     config: Optional[dict[str, Any]] = None,
+    fast_model: Optional["LLM"] = None,
+    router: Optional[ModelRouter] = None,
 ) -> CompiledGraph:
-    """Create a reactive agent graph."""
-    graph = AgentGraph(model, tools, system_message, config=config)
+    """Create a reactive agent graph.
+
+    With a `fast_model`, steps the router classifies as mechanical are sent to it
+    instead of `model`. Defaults to a `HeuristicModelRouter`.
+    """
+    graph = AgentGraph(model, tools, system_message, config=config, fast_model=fast_model, router=router)
     return graph.create(checkpointer=checkpointer, debug=debug)
@@ -1,21 +1,91 @@
 """LLM implementation supporting both OpenAI and Anthropic models."""
 
+import asyncio
+import json
 import os
-from collections.abc import Sequence
+import time
+from collections.abc import AsyncIterator, Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, wait
 from typing import Any, Optional
 
 from langchain_anthropic import ChatAnthropic
-from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_anthropic.chat_models import convert_to_anthropic_tool
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
 from langchain_core.language_models.base import LanguageModelInput
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import BaseMessage
-from langchain_core.outputs import ChatResult
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage, tool_call_chunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
 from langchain_core.runnables import Runnable
 from langchain_core.tools import BaseTool
 from langchain_openai import ChatOpenAI
 from langchain_xai import ChatXAI
 from pydantic import Field
 
+from codegen.extensions.langchain.utils.histogram import get_latency_histogram
+from codegen.extensions.langchain.utils.io_executor import get_io_executor
+from codegen.extensions.langchain.utils.llm_registry import get_llm_registry, make_client_key
+from codegen.extensions.langchain.utils.rate_limiter import get_rate_limiter, is_retryable_error
+from codegen.extensions.langchain.utils.response_cache import ResponseCacheMode, get_response_cache, make_cache_key
+
+# Attempts per model request. Retries go through the shared rate limiter instead of the
+# provider SDKs, so that every agent in the process backs off together on a 429.
+MAX_ATTEMPTS = 8
+
+# Bound kwarg with the request kwargs of the fallback model, see `LLM.bind_tools`
+FALLBACK_KWARGS = "fallback_kwargs"
+
+# Anthropic prompt cache breakpoint
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Output limit of a request by provider when `max_tokens` is not set
+DEFAULT_MAX_TOKENS = {"anthropic": 8192, "openai": 4096, "xai": 12000}
+
+
+def _with_cache_control(message: BaseMessage) -> BaseMessage:
+    """Copy a message with a cache breakpoint on its last content block."""
+    if isinstance(message.content, str):
+        if not message.content:
+            return message
+        blocks = [{"type": "text", "text": message.content}]
+    else:
+        blocks = [block if isinstance(block, dict) else {"type": "text", "text": block} for block in message.content]
+        if not blocks:
+            return message
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    return message.model_copy(update={"content": blocks})
+
+
+def add_cache_breakpoints(messages: list[BaseMessage]) -> list[BaseMessage]:
+    """Place Anthropic prompt cache breakpoints on a request.
+
+    Breakpoints go on the system prompt, which is identical for every step, and on
+    the last message, so the next step reads the whole history up to it from the
+    cache. Together with the breakpoint on the last tool schema (see `LLM.bind_tools`)
+    this stays within Anthropic's limit of four breakpoints per request. The
+    messages themselves are not modified.
+    """
+    result = list(messages)
+    for i, message in enumerate(result):
+        if isinstance(message, SystemMessage):
+            result[i] = _with_cache_control(message)
+            break
+    if result and isinstance(result[-1], (HumanMessage, ToolMessage)):
+        result[-1] = _with_cache_control(result[-1])
+    return result
+
+
+def _to_chunk(message: BaseMessage) -> ChatGenerationChunk:
+    """Turn a complete response into a single stream chunk."""
+    tool_calls = message.tool_calls if isinstance(message, AIMessage) else []
+    chunk = AIMessageChunk(
+        content=message.content,
+        id=message.id,
+        tool_call_chunks=[tool_call_chunk(name=call["name"], args=json.dumps(call["args"]), id=call["id"], index=i) for i, call in enumerate(tool_calls)],
+        usage_metadata=getattr(message, "usage_metadata", None),
+        response_metadata=message.response_metadata,
+    )
+    return ChatGenerationChunk(message=chunk)
+
 
 class LLM(BaseChatModel):
     """A unified chat model that supports both OpenAI and Anthropic."""
@@ -32,6 +102,20 @@ class LLM(BaseChatModel):
 
     max_tokens: Optional[int] = Field(default=None, description="Maximum number of tokens to generate.", ge=1)
 
+    prompt_caching: bool = Field(default=True, description="Whether to place prompt cache breakpoints for providers that need them.")
+
+    hedge_percentile: Optional[float] = Field(default=None, description="Send a second request when a request takes longer than this percentile (0-100) of observed latencies.", gt=0, le=100)
+
+    hedge_min_samples: int = Field(default=20, description="Number of observed requests needed before requests are hedged.", ge=1)
+
+    fallback_provider: Optional[str] = Field(default=None, description="Provider of hedged requests, defaults to the model provider.")
+
+    fallback_model_name: Optional[str] = Field(default=None, description="Model of hedged requests, defaults to the model name.")
+
+    cache_mode: Optional[str] = Field(default=None, description="Response cache mode (off, record, replay or read_through), defaults to the CODEGEN_LLM_CACHE_MODE environment variable.")
+
+    cache_path: Optional[str] = Field(default=None, description="Path of the response cache database, defaults to the CODEGEN_LLM_CACHE_PATH environment variable.")
+
     def __init__(self, model_provider: str = "anthropic", model_name: str = "claude-3-5-sonnet-latest", **kwargs: Any) -> None:
         """Initialize the LLM.
 
@@ -43,17 +127,47 @@ class LLM(BaseChatModel):
                 - top_p: Top-p sampling parameter (0-1)
                 - top_k: Top-k sampling parameter (>= 1)
                 - max_tokens: Maximum number of tokens to generate
+                - prompt_caching: Whether to place prompt cache breakpoints (default True)
+                - hedge_percentile: Hedge requests slower than this latency percentile (default off)
+                - hedge_min_samples: Observed requests needed before hedging (default 20)
+                - fallback_provider: Provider of hedged requests (default same provider)
+                - fallback_model_name: Model of hedged requests (default same model)
+                - cache_mode: Response cache mode, see `ResponseCache` (default off)
+                - cache_path: Path of the response cache database
         """
         # Set model provider and name before calling super().__init__
         kwargs["model_provider"] = model_provider
         kwargs["model_name"] = model_name
 
         # Filter out unsupported kwargs
-        supported_kwargs = {"model_provider", "model_name", "temperature", "top_p", "top_k", "max_tokens", "callbacks", "tags", "metadata"}
+        supported_kwargs = {
+            "model_provider",
+            "model_name",
+            "temperature",
+            "top_p",
+            "top_k",
+            "max_tokens",
+            "prompt_caching",
+            "hedge_percentile",
+            "hedge_min_samples",
+            "fallback_provider",
+            "fallback_model_name",
+            "cache_mode",
+            "cache_path",
+            "callbacks",
+            "tags",
+            "metadata",
+        }
         filtered_kwargs = {k: v for k, v in kwargs.items() if k in supported_kwargs}
 
         super().__init__(**filtered_kwargs)
-        self._model = self._get_model()
+        self._response_cache = get_response_cache(self.cache_mode, self.cache_path)
+        # LLMs with the same configuration share one client and its connection pool.
+        # Replaying clients may lack an API key, so they are never shared with live ones.
+        self._client_key = make_client_key(self.model_provider, {**self._get_model_kwargs(), "replaying": self._replaying})
+        self._model = get_llm_registry().get(self._client_key, self._get_model)
+        self._latency = get_latency_histogram(self.model_provider, self.model_name)
+        self._fallback_llm: Optional[LLM] = None
 
     @property
     def _llm_type(self) -> str:
@@ -83,26 +197,36 @@ class LLM(BaseChatModel):
         else:  # openai
             return {**base_kwargs, "model": self.model_name}
 
+    @property
+    def _replaying(self) -> bool:
+        return self._response_cache is not None and self._response_cache.mode == ResponseCacheMode.REPLAY
+
+    def _get_api_key_kwargs(self, env_var: str) -> dict[str, Any]:
+        """Check that the provider's API key is set, or get a placeholder when replaying without one."""
+        if os.getenv(env_var):
+            return {}
+        if self._replaying:
+            # Replayed requests never reach the provider, the client only formats tools
+            return {"api_key": "replay"}
+        msg = f"{env_var} not found in environment. Please set it in your .env file or environment variables."
+        raise ValueError(msg)
+
     def _get_model(self) -> BaseChatModel:
         """Get the appropriate model instance based on configuration."""
         if self.model_provider == "anthropic":
-            if not os.getenv("ANTHROPIC_API_KEY"):
-                msg = "ANTHROPIC_API_KEY not found in environment. Please set it in your .env file or environment variables."
-                raise ValueError(msg)
-            max_tokens = 8192
-            return ChatAnthropic(**self._get_model_kwargs(), max_tokens=max_tokens, max_retries=10, timeout=1000)
+            api_key_kwargs = self._get_api_key_kwargs("ANTHROPIC_API_KEY")
+            model_kwargs = {"max_tokens": DEFAULT_MAX_TOKENS["anthropic"], **self._get_model_kwargs()}
+            return ChatAnthropic(**model_kwargs, **api_key_kwargs, max_retries=0, timeout=1000)
 
         elif self.model_provider == "openai":
-            if not os.getenv("OPENAI_API_KEY"):
-                msg = "OPENAI_API_KEY not found in environment. Please set it in your .env file or environment variables."
-                raise ValueError(msg)
-            return ChatOpenAI(**self._get_model_kwargs(), max_tokens=4096, max_retries=10, timeout=1000)
+            api_key_kwargs = self._get_api_key_kwargs("OPENAI_API_KEY")
+            model_kwargs = {"max_tokens": DEFAULT_MAX_TOKENS["openai"], **self._get_model_kwargs()}
+            return ChatOpenAI(**model_kwargs, **api_key_kwargs, max_retries=0, timeout=1000)
 
         elif self.model_provider == "xai":
-            if not os.getenv("XAI_API_KEY"):
-                msg = "XAI_API_KEY not found in environment. Please set it in your .env file or environment variables."
-                raise ValueError(msg)
-            return ChatXAI(**self._get_model_kwargs(), max_tokens=12000)
+            api_key_kwargs = self._get_api_key_kwargs("XAI_API_KEY")
+            model_kwargs = {"max_tokens": DEFAULT_MAX_TOKENS["xai"], **self._get_model_kwargs()}
+            return ChatXAI(**model_kwargs, **api_key_kwargs, max_retries=0)
 
         msg = f"Unknown model provider: {self.model_provider}. Must be one of: anthropic, openai, xai"
         raise ValueError(msg)
@@ -125,7 +249,289 @@ class LLM(BaseChatModel):
         Returns:
             ChatResult containing the generated completion
         """
-        return self._model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        fallback_kwargs = kwargs.pop(FALLBACK_KWARGS, None)
+        if self._response_cache is None:
+            return self._generate_hedged(messages, stop, run_manager, fallback_kwargs, **kwargs)
+
+        key = make_cache_key(self.model_provider, self._get_model_kwargs(), messages, stop, kwargs)
+        result = self._response_cache.lookup(key)
+        if result is None:
+            result = self._generate_hedged(messages, stop, run_manager, fallback_kwargs, **kwargs)
+            self._response_cache.store(key, self.model_name, result)
+        return result
+
+    def _generate_hedged(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]],
+        run_manager: Optional[CallbackManagerForLLMRun],
+        fallback_kwargs: Optional[dict[str, Any]],
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Make a request, hedging it with a second one if it is slow, see `hedge_percentile`."""
+        delay = self._get_hedge_delay()
+        if delay is None:
+            return self._generate_once(messages, stop, run_manager, **kwargs)
+
+        # The primary request gets the run manager, so callbacks only see one response
+        executor = get_io_executor()
+        primary = executor.submit(self._generate_once, messages, stop, run_manager, **kwargs)
+        if wait([primary], timeout=delay).done:
+            return primary.result()
+
+        hedge_llm, hedge_kwargs = self._get_hedge_target(kwargs, fallback_kwargs)
+        hedge = executor.submit(hedge_llm._generate_once, messages, stop, None, **hedge_kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # A blocking request can't be aborted, the slower response is dropped. It
+                    # still records its latency when it finishes, so slow requests keep counting.
+                    for other in pending:
+                        other.cancel()
+                    get_llm_registry().record_hedge(self._client_key, won=future is hedge)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _generate_once(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Make a single request, retrying transient errors through the rate limiter."""
+        # OpenAI caches request prefixes automatically, Anthropic needs explicit breakpoints
+        if self.model_provider == "anthropic" and self.prompt_caching:
+            messages = add_cache_breakpoints(messages)
+        limiter = get_rate_limiter(self.model_provider, self.model_name)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            limiter.acquire()
+            start = time.perf_counter()
+            try:
+                with get_llm_registry().track(self._client_key):
+                    result = self._model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS or not is_retryable_error(e):
+                    raise
+                time.sleep(limiter.on_error(e, attempt))
+                continue
+            self._latency.record(time.perf_counter() - start)
+            limiter.on_success()
+            return result
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Generate chat completion asynchronously using the underlying model.
+
+        Uses the provider's async client instead of running `_generate` in a thread,
+        so many agents can wait on the model concurrently on a single event loop.
+        """
+        fallback_kwargs = kwargs.pop(FALLBACK_KWARGS, None)
+        if self._response_cache is None:
+            return await self._agenerate_hedged(messages, stop, run_manager, fallback_kwargs, **kwargs)
+
+        # SQLite lookups are fast enough to not need a thread
+        key = make_cache_key(self.model_provider, self._get_model_kwargs(), messages, stop, kwargs)
+        result = self._response_cache.lookup(key)
+        if result is None:
+            result = await self._agenerate_hedged(messages, stop, run_manager, fallback_kwargs, **kwargs)
+            self._response_cache.store(key, self.model_name, result)
+        return result
+
+    async def _agenerate_hedged(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]],
+        run_manager: Optional[AsyncCallbackManagerForLLMRun],
+        fallback_kwargs: Optional[dict[str, Any]],
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Async version of `_generate_hedged`."""
+        delay = self._get_hedge_delay()
+        if delay is None:
+            return await self._agenerate_once(messages, stop, run_manager, **kwargs)
+
+        start = time.perf_counter()
+        tasks = [asyncio.ensure_future(self._agenerate_once(messages, stop, run_manager, **kwargs))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return tasks[0].result()
+
+            hedge_llm, hedge_kwargs = self._get_hedge_target(kwargs, fallback_kwargs)
+            tasks.append(asyncio.ensure_future(hedge_llm._agenerate_once(messages, stop, None, **hedge_kwargs)))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        get_llm_registry().record_hedge(self._client_key, won=task is tasks[1])
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            if not tasks[0].done():
+                # The primary request lost and is cancelled before it can record its latency.
+                # It took at least this long; leaving it out would hide exactly the slow
+                # requests the hedge delay is computed from.
+                self._latency.record(time.perf_counter() - start)
+            # Cancel the slower request
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _agenerate_once(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Async version of `_generate_once`."""
+        if self.model_provider == "anthropic" and self.prompt_caching:
+            messages = add_cache_breakpoints(messages)
+        limiter = get_rate_limiter(self.model_provider, self.model_name)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await limiter.aacquire()
+            start = time.perf_counter()
+            try:
+                with get_llm_registry().track(self._client_key):
+                    result = await self._model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS or not is_retryable_error(e):
+                    raise
+                await asyncio.sleep(limiter.on_error(e, attempt))
+                continue
+            self._latency.record(time.perf_counter() - start)
+            limiter.on_success()
+            return result
+
+    # =================================== STREAMING ====================================
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """Stream the response of the underlying model chunk by chunk.
+
+        Used instead of `_generate` when a streaming callback handler is attached, e.g.
+        when a graph is streamed with `stream_mode="messages"`. Streamed requests are
+        not hedged, and are only retried if they fail before their first chunk.
+        With a response cache, the whole response is generated (or replayed) and
+        yielded as one chunk, so recorded and replayed runs see the same responses.
+        """
+        if self._response_cache is not None:
+            yield _to_chunk(self._generate(messages, stop, run_manager, **kwargs).generations[0].message)
+            return
+        kwargs.pop(FALLBACK_KWARGS, None)
+        if self.model_provider == "anthropic" and self.prompt_caching:
+            messages = add_cache_breakpoints(messages)
+        limiter = get_rate_limiter(self.model_provider, self.model_name)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            limiter.acquire()
+            start = time.perf_counter()
+            started = False
+            try:
+                with get_llm_registry().track(self._client_key):
+                    for chunk in self._model._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                        started = True
+                        yield chunk
+            except Exception as e:
+                if started or attempt == MAX_ATTEMPTS or not is_retryable_error(e):
+                    raise
+                time.sleep(limiter.on_error(e, attempt))
+                continue
+            self._latency.record(time.perf_counter() - start)
+            limiter.on_success()
+            return
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Async version of `_stream`."""
+        if self._response_cache is not None:
+            result = await self._agenerate(messages, stop, run_manager, **kwargs)
+            yield _to_chunk(result.generations[0].message)
+            return
+        kwargs.pop(FALLBACK_KWARGS, None)
+        if self.model_provider == "anthropic" and self.prompt_caching:
+            messages = add_cache_breakpoints(messages)
+        limiter = get_rate_limiter(self.model_provider, self.model_name)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await limiter.aacquire()
+            start = time.perf_counter()
+            started = False
+            try:
+                with get_llm_registry().track(self._client_key):
+                    async for chunk in self._model._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                        started = True
+                        yield chunk
+            except Exception as e:
+                if started or attempt == MAX_ATTEMPTS or not is_retryable_error(e):
+                    raise
+                await asyncio.sleep(limiter.on_error(e, attempt))
+                continue
+            self._latency.record(time.perf_counter() - start)
+            limiter.on_success()
+            return
+
+    # =================================== HEDGING ====================================
+
+    def _get_hedge_delay(self) -> Optional[float]:
+        """Get how long to wait for a response before hedging, or None to not hedge."""
+        if self.hedge_percentile is None or self._latency.count < self.hedge_min_samples:
+            return None
+        return self._latency.percentile(self.hedge_percentile)
+
+    def _get_fallback_llm(self) -> "LLM":
+        if self.fallback_provider is None and self.fallback_model_name is None:
+            return self
+        if self._fallback_llm is None:
+            self._fallback_llm = LLM(
+                model_provider=self.fallback_provider or self.model_provider,
+                model_name=self.fallback_model_name or self.model_name,
+                temperature=self.temperature,
+                top_p=self.top_p,
+                top_k=self.top_k,
+                max_tokens=self.max_tokens,
+                prompt_caching=self.prompt_caching,
+                cache_mode=self.cache_mode,
+                cache_path=self.cache_path,
+            )
+        return self._fallback_llm
+
+    def _get_hedge_target(self, kwargs: dict[str, Any], fallback_kwargs: Optional[dict[str, Any]]) -> tuple["LLM", dict[str, Any]]:
+        """Get the model and request kwargs of a hedged request.
+
+        Tools bound to this model are in this provider's format, so a fallback with
+        another provider needs the kwargs bound for it by `bind_tools`. Without them
+        the request is hedged with this model instead.
+        """
+        fallback = self._get_fallback_llm()
+        if fallback is self:
+            return self, kwargs
+        if fallback_kwargs is not None:
+            return fallback, fallback_kwargs
+        if fallback.model_provider == self.model_provider or "tools" not in kwargs:
+            return fallback, kwargs
+        return self, kwargs
 
     def bind_tools(
         self,
@@ -141,4 +547,19 @@ class LLM(BaseChatModel):
         Returns:
             Runnable that can be used to invoke the model with tools
         """
-        return self._model.bind_tools(tools, **kwargs)
+        fallback = self._get_fallback_llm()
+        fallback_kwargs = fallback.bind_tools(tools, **kwargs).kwargs if fallback is not self else None
+
+        if self.model_provider == "anthropic" and self.prompt_caching and tools:
+            # A breakpoint on the last tool caches all tool schemas
+            formatted_tools = [convert_to_anthropic_tool(tool) for tool in tools]
+            formatted_tools[-1] = {**formatted_tools[-1], "cache_control": CACHE_CONTROL}
+            tools = formatted_tools
+
+        # Let the provider model format the tool kwargs, but bind them to this model
+        # so requests still go through `_generate`
+        binding = self._model.bind_tools(tools, **kwargs)
+        if fallback_kwargs is not None:
+            # Hedged requests to the fallback model use its own tool format
+            return self.bind(**binding.kwargs, **{FALLBACK_KWARGS: fallback_kwargs})
+        return self.bind(**binding.kwargs)
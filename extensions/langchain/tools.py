@@ -36,6 +36,7 @@ from codegen.sdk.core.codebase import Codebase
 
 from ..tools import (
     commit,
+    create_checkpoint,
     create_file,
     create_pr,
     create_pr_comment,
@@ -44,12 +45,31 @@ from ..tools import (
     edit_file,
     list_directory,
     move_symbol,
+    move_symbols,
     rename_file,
+    rename_files,
+    rollback_to_checkpoint,
     view_file,
     view_pr,
 )
+from ..tools.move_symbol import SymbolMove
 from ..tools.relace_edit_prompts import RELACE_EDIT_PROMPT
+from ..tools.rename_file import FileRename
 from ..tools.semantic_edit_prompts import FILE_EDIT_PROMPT
+from .utils.io_executor import run_in_io_executor
+from .utils.tool_metrics import instrument_tool
+
+
+class IOBoundTool(BaseTool):
+    """Base class for tools that spend most of their time waiting on a remote API.
+
+    The async path runs `_run` on the shared I/O executor, so agents driven with
+    `astream` can wait on GitHub, Linear, Slack or an LLM without blocking the event loop.
+    Other tools use the default executor for their async path.
+    """
+
+    async def _arun(self, *args, **kwargs):
+        return await run_in_io_executor(self._run, *args, **kwargs)
 
 
 class ViewFileInput(BaseModel):
@@ -71,6 +91,8 @@ class ViewFileTool(BaseTool):
 For large files (>500 lines), content will be paginated. Use start_line and end_line to navigate through the file.
 The response will indicate if there are more lines available to view."""
     args_schema: ClassVar[type[BaseModel]] = ViewFileInput
+    read_only: ClassVar[bool] = True
+    cacheable: ClassVar[bool] = True
     codebase: Codebase = Field(exclude=True)
 
     def __init__(self, codebase: Codebase) -> None:
@@ -111,6 +133,8 @@ class ListDirectoryTool(BaseTool):
     name: ClassVar[str] = "list_directory"
     description: ClassVar[str] = "List contents of a directory in the codebase"
     args_schema: ClassVar[type[BaseModel]] = ListDirectoryInput
+    read_only: ClassVar[bool] = True
+    cacheable: ClassVar[bool] = True
     codebase: Codebase = Field(exclude=True)
 
     def __init__(self, codebase: Codebase) -> None:
@@ -141,6 +165,8 @@ class RipGrepTool(BaseTool):
     name: ClassVar[str] = "search"
     description: ClassVar[str] = "Search the codebase using `ripgrep` or regex pattern matching"
     args_schema: ClassVar[type[BaseModel]] = SearchInput
+    read_only: ClassVar[bool] = True
+    cacheable: ClassVar[bool] = True
     codebase: Codebase = Field(exclude=True)
 
     def __init__(self, codebase: Codebase) -> None:
@@ -282,6 +308,50 @@ class CommitTool(BaseTool):
         return result.render()
 
 
+class CreateCheckpointInput(BaseModel):
+    """Input for creating an edit checkpoint."""
+
+    name: str = Field(..., description="Name of the checkpoint, e.g. 'before-refactor'. Reusing a name moves the checkpoint.")
+
+
+class CreateCheckpointTool(BaseTool):
+    """Tool for checkpointing the edits made so far."""
+
+    name: ClassVar[str] = "create_checkpoint"
+    description: ClassVar[str] = "Create a named checkpoint of all file edits made so far. Use this before trying an approach you may want to undo."
+    args_schema: ClassVar[type[BaseModel]] = CreateCheckpointInput
+    codebase: Codebase = Field(exclude=True)
+
+    def __init__(self, codebase: Codebase) -> None:
+        super().__init__(codebase=codebase)
+
+    def _run(self, name: str) -> str:
+        result = create_checkpoint(self.codebase, name)
+        return result.render()
+
+
+class RollbackToCheckpointInput(BaseModel):
+    """Input for rolling back to an edit checkpoint."""
+
+    name: str = Field(..., description="Name of the checkpoint to roll back to")
+
+
+class RollbackToCheckpointTool(BaseTool):
+    """Tool for undoing the edits made after a checkpoint."""
+
+    name: ClassVar[str] = "rollback_to_checkpoint"
+    description: ClassVar[str] = "Undo all file edits (edits, creations, deletions and renames) made after a named checkpoint"
+    args_schema: ClassVar[type[BaseModel]] = RollbackToCheckpointInput
+    codebase: Codebase = Field(exclude=True)
+
+    def __init__(self, codebase: Codebase) -> None:
+        super().__init__(codebase=codebase)
+
+    def _run(self, name: str) -> str:
+        result = rollback_to_checkpoint(self.codebase, name)
+        return result.render()
+
+
 class RevealSymbolInput(BaseModel):
     """Input for revealing symbol relationships."""
 
@@ -301,6 +371,8 @@ class RevealSymbolTool(BaseTool):
     name: ClassVar[str] = "reveal_symbol"
     description: ClassVar[str] = "Reveal the dependencies and usages of a symbol up to N degrees"
     args_schema: ClassVar[type[BaseModel]] = RevealSymbolInput
+    read_only: ClassVar[bool] = True
+    cacheable: ClassVar[bool] = True
     codebase: Codebase = Field(exclude=True)
 
     def __init__(self, codebase: Codebase) -> None:
@@ -355,7 +427,7 @@ class SemanticEditInput(BaseModel):
     tool_call_id: Annotated[str, InjectedToolCallId]
 
 
-class SemanticEditTool(BaseTool):
+class SemanticEditTool(IOBoundTool):
     """Tool for semantic editing of files."""
 
     name: ClassVar[str] = "semantic_edit"
@@ -395,6 +467,28 @@ class RenameFileTool(BaseTool):
         return result.render()
 
 
+class RenameFilesInput(BaseModel):
+    """Input for renaming several files at once."""
+
+    renames: list[FileRename] = Field(..., description="Files to rename, each with its current and new path")
+
+
+class RenameFilesTool(BaseTool):
+    """Tool for renaming several files with a single import update."""
+
+    name: ClassVar[str] = "rename_files"
+    description: ClassVar[str] = "Rename several files in one step and update all imports to point to the new locations. Returns a summary of the changed files."
+    args_schema: ClassVar[type[BaseModel]] = RenameFilesInput
+    codebase: Codebase = Field(exclude=True)
+
+    def __init__(self, codebase: Codebase) -> None:
+        super().__init__(codebase=codebase)
+
+    def _run(self, renames: list[FileRename]) -> str:
+        result = rename_files(self.codebase, renames)
+        return result.render()
+
+
 class MoveSymbolInput(BaseModel):
     """Input for moving a symbol between files."""
 
@@ -438,6 +532,38 @@ class MoveSymbolTool(BaseTool):
         return result.render()
 
 
+class MoveSymbolsInput(BaseModel):
+    """Input for moving several symbols at once."""
+
+    moves: list[SymbolMove] = Field(..., description="Symbols to move, each with its source file, name and target file")
+    strategy: Literal["update_all_imports", "add_back_edge"] = Field(
+        default="update_all_imports",
+        description="Strategy for handling imports: 'update_all_imports' (default) or 'add_back_edge'",
+    )
+    include_dependencies: bool = Field(default=True, description="Whether to move dependencies along with the symbols")
+
+
+class MoveSymbolsTool(BaseTool):
+    """Tool for moving several symbols as one refactoring transaction."""
+
+    name: ClassVar[str] = "move_symbols"
+    description: ClassVar[str] = "Move several symbols between files in one step, e.g. to split a large module. Imports are updated once for all moves and a summary of the changed files is returned."
+    args_schema: ClassVar[type[BaseModel]] = MoveSymbolsInput
+    codebase: Codebase = Field(exclude=True)
+
+    def __init__(self, codebase: Codebase) -> None:
+        super().__init__(codebase=codebase)
+
+    def _run(
+        self,
+        moves: list[SymbolMove],
+        strategy: Literal["update_all_imports", "add_back_edge"] = "update_all_imports",
+        include_dependencies: bool = True,
+    ) -> str:
+        result = move_symbols(self.codebase, moves, strategy=strategy, include_dependencies=include_dependencies)
+        return result.render()
+
+
 class SemanticSearchInput(BaseModel):
     """Input for Semantic search of a codebase"""
 
@@ -452,6 +578,8 @@ class SemanticSearchTool(BaseTool):
     name: ClassVar[str] = "semantic_search"
     description: ClassVar[str] = "Search the codebase using natural language queries and semantic similarity"
     args_schema: ClassVar[type[BaseModel]] = SemanticSearchInput
+    read_only: ClassVar[bool] = True
+    cacheable: ClassVar[bool] = True
     codebase: Codebase = Field(exclude=True)
 
     def __init__(self, codebase: Codebase) -> None:
@@ -498,7 +626,7 @@ class GithubCreatePRInput(BaseModel):
     body: str = Field(..., description="The body of the PR")
 
 
-class GithubCreatePRTool(BaseTool):
+class GithubCreatePRTool(IOBoundTool):
     """Tool for creating a PR."""
 
     name: ClassVar[str] = "create_pr"
@@ -520,12 +648,13 @@ class GithubSearchIssuesInput(BaseModel):
     query: str = Field(..., description="Search query string to find issues")
 
 
-class GithubSearchIssuesTool(BaseTool):
+class GithubSearchIssuesTool(IOBoundTool):
     """Tool for searching GitHub issues."""
 
     name: ClassVar[str] = "search_issues"
     description: ClassVar[str] = "Search for GitHub issues/PRs using a query string from pygithub, e.g. 'is:pr is:open test_query'"
     args_schema: ClassVar[type[BaseModel]] = GithubSearchIssuesInput
+    read_only: ClassVar[bool] = True
     codebase: Codebase = Field(exclude=True)
 
     def __init__(self, codebase: Codebase) -> None:
@@ -542,12 +671,13 @@ class GithubViewPRInput(BaseModel):
     pr_id: int = Field(..., description="Number of the PR to get the contents for")
 
 
-class GithubViewPRTool(BaseTool):
+class GithubViewPRTool(IOBoundTool):
     """Tool for getting PR data."""
 
     name: ClassVar[str] = "view_pr"
     description: ClassVar[str] = "View the diff and associated context for a pull request"
     args_schema: ClassVar[type[BaseModel]] = GithubViewPRInput
+    read_only: ClassVar[bool] = True
     codebase: Codebase = Field(exclude=True)
 
     def __init__(self, codebase: Codebase) -> None:
@@ -564,7 +694,7 @@ class GithubCheckoutPRInput(BaseModel):
     pr_number: int = Field(..., description="Number of the PR to checkout")
 
 
-class GithubCheckoutPRTool(BaseTool):
+class GithubCheckoutPRTool(IOBoundTool):
     """Tool for checking out a PR head branch."""
 
     name: ClassVar[str] = "checkout_pr"
@@ -587,7 +717,7 @@ class GithubCreatePRCommentInput(BaseModel):
     body: str = Field(..., description="The comment text")
 
 
-class GithubCreatePRCommentTool(BaseTool):
+class GithubCreatePRCommentTool(IOBoundTool):
     """Tool for creating a general PR comment."""
 
     name: ClassVar[str] = "create_pr_comment"
@@ -614,7 +744,7 @@ class GithubCreatePRReviewCommentInput(BaseModel):
     start_line: int | None = Field(None, description="For multi-line comments, the starting line")
 
 
-class GithubCreatePRReviewCommentTool(BaseTool):
+class GithubCreatePRReviewCommentTool(IOBoundTool):
     """Tool for creating inline PR review comments."""
 
     name: ClassVar[str] = "create_pr_review_comment"
@@ -651,12 +781,13 @@ class GithubViewPRCheckInput(BaseModel):
     pr_number: int = Field(..., description="The PR number to view checks for")
 
 
-class GithubViewPRCheckTool(BaseTool):
+class GithubViewPRCheckTool(IOBoundTool):
     """Tool for viewing PR checks."""
 
     name: ClassVar[str] = "view_pr_checks"
     description: ClassVar[str] = "View the check suites for a PR"
     args_schema: ClassVar[type[BaseModel]] = GithubCreatePRReviewCommentInput
+    read_only: ClassVar[bool] = True
     codebase: Codebase = Field(exclude=True)
 
     def __init__(self, codebase: Codebase) -> None:
@@ -678,12 +809,13 @@ class LinearGetIssueInput(BaseModel):
     issue_id: str = Field(..., description="ID of the Linear issue to retrieve")
 
 
-class LinearGetIssueTool(BaseTool):
+class LinearGetIssueTool(IOBoundTool):
     """Tool for getting Linear issue details."""
 
     name: ClassVar[str] = "linear_get_issue"
     description: ClassVar[str] = "Get details of a Linear issue by its ID"
     args_schema: ClassVar[type[BaseModel]] = LinearGetIssueInput
+    read_only: ClassVar[bool] = True
     client: LinearClient = Field(exclude=True)
 
     def __init__(self, client: LinearClient) -> None:
@@ -700,12 +832,13 @@ class LinearGetIssueCommentsInput(BaseModel):
     issue_id: str = Field(..., description="ID of the Linear issue to get comments for")
 
 
-class LinearGetIssueCommentsTool(BaseTool):
+class LinearGetIssueCommentsTool(IOBoundTool):
     """Tool for getting Linear issue comments."""
 
     name: ClassVar[str] = "linear_get_issue_comments"
     description: ClassVar[str] = "Get all comments on a Linear issue"
     args_schema: ClassVar[type[BaseModel]] = LinearGetIssueCommentsInput
+    read_only: ClassVar[bool] = True
     client: LinearClient = Field(exclude=True)
 
     def __init__(self, client: LinearClient) -> None:
@@ -723,12 +856,13 @@ class LinearCommentOnIssueInput(BaseModel):
     body: str = Field(..., description="The comment text")
 
 
-class LinearCommentOnIssueTool(BaseTool):
+class LinearCommentOnIssueTool(IOBoundTool):
     """Tool for commenting on Linear issues."""
 
     name: ClassVar[str] = "linear_comment_on_issue"
     description: ClassVar[str] = "Add a comment to a Linear issue"
     args_schema: ClassVar[type[BaseModel]] = LinearCommentOnIssueInput
+    modifies_codebase: ClassVar[bool] = False
     client: LinearClient = Field(exclude=True)
 
     def __init__(self, client: LinearClient) -> None:
@@ -746,12 +880,13 @@ class LinearSearchIssuesInput(BaseModel):
     limit: int = Field(default=10, description="Maximum number of issues to return")
 
 
-class LinearSearchIssuesTool(BaseTool):
+class LinearSearchIssuesTool(IOBoundTool):
     """Tool for searching Linear issues."""
 
     name: ClassVar[str] = "linear_search_issues"
     description: ClassVar[str] = "Search for Linear issues using a query string"
     args_schema: ClassVar[type[BaseModel]] = LinearSearchIssuesInput
+    read_only: ClassVar[bool] = True
     client: LinearClient = Field(exclude=True)
 
     def __init__(self, client: LinearClient) -> None:
@@ -770,12 +905,13 @@ class LinearCreateIssueInput(BaseModel):
     team_id: str | None = Field(None, description="Optional team ID. If not provided, uses the default team_id (recommended)")
 
 
-class LinearCreateIssueTool(BaseTool):
+class LinearCreateIssueTool(IOBoundTool):
     """Tool for creating Linear issues."""
 
     name: ClassVar[str] = "linear_create_issue"
     description: ClassVar[str] = "Create a new Linear issue"
     args_schema: ClassVar[type[BaseModel]] = LinearCreateIssueInput
+    modifies_codebase: ClassVar[bool] = False
     client: LinearClient = Field(exclude=True)
 
     def __init__(self, client: LinearClient) -> None:
@@ -786,11 +922,12 @@ class LinearCreateIssueTool(BaseTool):
         return result.render()
 
 
-class LinearGetTeamsTool(BaseTool):
+class LinearGetTeamsTool(IOBoundTool):
     """Tool for getting Linear teams."""
 
     name: ClassVar[str] = "linear_get_teams"
     description: ClassVar[str] = "Get all Linear teams the authenticated user has access to"
+    read_only: ClassVar[bool] = True
     client: LinearClient = Field(exclude=True)
 
     def __init__(self, client: LinearClient) -> None:
@@ -812,7 +949,7 @@ class SlackSendMessageInput(BaseModel):
     content: str = Field(..., description="Message to send to Slack")
 
 
-class SlackSendMessageTool(BaseTool):
+class SlackSendMessageTool(IOBoundTool):
     """Tool for sending a message to Slack."""
 
     name: ClassVar[str] = "send_slack_message"
@@ -822,6 +959,7 @@ class SlackSendMessageTool(BaseTool):
         "Use Slack-style markdown for other links."
     )
     args_schema: ClassVar[type[BaseModel]] = SlackSendMessageInput
+    modifies_codebase: ClassVar[bool] = False
     say: Callable[[str], None] = Field(exclude=True)
     codebase: Codebase = Field(exclude=True)
 
@@ -855,15 +993,19 @@ def get_workspace_tools(codebase: Codebase) -> list["BaseTool"]:
     """
     return [
         CommitTool(codebase),
+        CreateCheckpointTool(codebase),
         CreateFileTool(codebase),
         DeleteFileTool(codebase),
         EditFileTool(codebase),
         GithubViewPRTool(codebase),
         ListDirectoryTool(codebase),
         MoveSymbolTool(codebase),
+        MoveSymbolsTool(codebase),
         RenameFileTool(codebase),
+        RenameFilesTool(codebase),
         ReplacementEditTool(codebase),
         RevealSymbolTool(codebase),
+        RollbackToCheckpointTool(codebase),
         GlobalReplacementEditTool(codebase),
         RunBashCommandTool(),  # Note: This tool doesn't need the codebase
         RipGrepTool(codebase),
@@ -918,6 +1060,10 @@ class GlobalReplacementEditInput(BaseModel):
             "Useful when you only want to replace the first N occurrences."
         ),
     )
+    dry_run: bool = Field(
+        default=False,
+        description=("If True, do not modify any files. Only report how many replacements would be made and show a sample diff. Useful to check a broad pattern before applying it."),
+    )
 
 
 class GlobalReplacementEditTool(BaseTool):
@@ -930,9 +1076,11 @@ class GlobalReplacementEditTool(BaseTool):
     description: ClassVar[str] = "Replace text in the entire codebase using regex pattern matching."
     args_schema: ClassVar[type[BaseModel]] = GlobalReplacementEditInput
     codebase: Codebase = Field(exclude=True)
+    # Called with (files_processed, total_files) while the replacement runs
+    progress_callback: Optional[Callable[[int, int], None]] = Field(default=None, exclude=True)
 
-    def __init__(self, codebase: Codebase) -> None:
-        super().__init__(codebase=codebase)
+    def __init__(self, codebase: Codebase, progress_callback: Optional[Callable[[int, int], None]] = None) -> None:
+        super().__init__(codebase=codebase, progress_callback=progress_callback)
 
     def _run(
         self,
@@ -940,8 +1088,9 @@ class GlobalReplacementEditTool(BaseTool):
         pattern: str,
         replacement: str,
         count: int | None = None,
+        dry_run: bool = False,
     ) -> str:
-        result = replacement_edit_global(self.codebase, file_pattern, pattern, replacement, count)
+        result = replacement_edit_global(self.codebase, file_pattern, pattern, replacement, count, dry_run=dry_run, progress_callback=self.progress_callback)
         return result.render()
 
 
@@ -1049,7 +1198,7 @@ class RelaceEditInput(BaseModel):
     tool_call_id: Annotated[str, InjectedToolCallId]
 
 
-class RelaceEditTool(BaseTool):
+class RelaceEditTool(IOBoundTool):
     """Tool for editing files using the Relace Instant Apply API."""
 
     name: ClassVar[str] = "relace_edit"
@@ -1074,7 +1223,7 @@ class ReflectionInput(BaseModel):
     reflection_focus: str | None = Field(default=None, description="Optional specific aspect to focus reflection on (e.g., 'architecture', 'performance', 'next steps')")
 
 
-class ReflectionTool(BaseTool):
+class ReflectionTool(IOBoundTool):
     """Tool for agent self-reflection and planning."""
 
     name: ClassVar[str] = "reflect"
@@ -1084,6 +1233,7 @@ class ReflectionTool(BaseTool):
     Use this when you need to consolidate information or when facing complex decisions.
     """
     args_schema: ClassVar[type[BaseModel]] = ReflectionInput
+    modifies_codebase: ClassVar[bool] = False
     codebase: Codebase = Field(exclude=True)
 
     def __init__(self, codebase: Codebase) -> None:
@@ -1120,6 +1270,8 @@ Search for files and directories by glob pattern (with pagination) across the ac
 - Find files with specific names (e.g., 'README.md', 'Dockerfile')
 """
     args_schema: ClassVar[type[BaseModel]] = SearchFilesByNameInput
+    read_only: ClassVar[bool] = True
+    cacheable: ClassVar[bool] = True
     codebase: Codebase = Field(exclude=True)
 
     def __init__(self, codebase: Codebase):
@@ -1128,3 +1280,8 @@ Search for files and directories by glob pattern (with pagination) across the ac
     def _run(self, pattern: str, page: int = 1, files_per_page: int | float = 10) -> str:
         """Execute the glob pattern search using fd."""
         return search_files_by_name(self.codebase, pattern, page=page, files_per_page=files_per_page).render()
+
+
+# Record the calls of every tool defined above, see `ToolMetricsRegistry`
+for _tool_class in [obj for obj in list(globals().values()) if isinstance(obj, type) and issubclass(obj, BaseTool) and obj.__module__ == __name__ and "_run" in vars(obj)]:
+    instrument_tool(_tool_class)
@@ -1,3 +1,3 @@
-from codegen.extensions.langchain.utils.get_langsmith_url import find_and_print_langsmith_run_url, get_langsmith_url
+from codegen.extensions.langchain.utils.get_langsmith_url import RootRunIdCallbackHandler, find_and_print_langsmith_run_url, get_langsmith_url
 
-__all__ = ["find_and_print_langsmith_run_url", "get_langsmith_url"]
+__all__ = ["RootRunIdCallbackHandler", "find_and_print_langsmith_run_url", "get_langsmith_url"]
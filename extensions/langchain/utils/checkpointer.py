@@ -0,0 +1,493 @@
+"""SQLite checkpointer that stores message deltas and evicts old threads.
+
+`MemorySaver` keeps a full copy of every intermediate state of every thread in
+memory for the lifetime of the process. This checkpointer keeps them in SQLite
+(in memory or on disk) and avoids most of the duplication between steps:
+
+- Channel values are stored per channel version, so a checkpoint only adds rows
+  for the channels that changed since its parent.
+- Message lists are stored as lists of content hashes, with every message stored
+  once per thread. A step that appends one message to a history of hundreds only
+  stores that message.
+- Large payloads are zlib-compressed.
+
+Old checkpoints of a thread are pruned down to `keep_last`, and whole threads are
+evicted once they are older than `max_age_seconds` or the store exceeds `max_bytes`.
+With a database file, an interrupted run can be resumed from its last checkpoint
+by another process (see `CodeAgent.resume`).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from langgraph.constants import TASKS
+
+from codegen.shared.logging.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+# Environment variable with the path of the default checkpoint database
+CHECKPOINT_DB_ENV = "CODEGEN_CHECKPOINT_DB"
+DEFAULT_CHECKPOINT_DB = os.path.join("~", ".cache", "codegen", "checkpoints.db")
+
+# Payloads smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+# Blob type of a message list stored as message hashes
+MESSAGE_REFS_TYPE = "message_refs"
+
+# SQLite limits the number of parameters of a single statement
+_MAX_PARAMS = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    metadata_type TEXT,
+    metadata BLOB,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    thread_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (thread_id, hash)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+def _compress(data: bytes) -> tuple[bytes, int]:
+    if len(data) < COMPRESS_MIN_BYTES:
+        return data, 0
+    return zlib.compress(data), 1
+
+
+def _decompress(data: bytes, compressed: int) -> bytes:
+    return zlib.decompress(data) if compressed else data
+
+
+def _is_message_list(value: Any) -> bool:
+    return isinstance(value, list) and len(value) > 0 and all(isinstance(m, BaseMessage) for m in value)
+
+
+class SqliteCheckpointer(BaseCheckpointSaver[str]):
+    """Checkpointer backed by a single SQLite database.
+
+    Args:
+        path: Path of the database file, or ":memory:" for a private in-memory database
+        keep_last: Number of checkpoints to keep per thread. Resuming only needs the last one.
+        max_age_seconds: Evict threads that have not been updated for this long
+        max_bytes: Evict the least recently updated threads while the stored payloads exceed this size
+        evict_every: Run thread eviction every this many checkpoints
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        *,
+        keep_last: int = 20,
+        max_age_seconds: Optional[float] = 7 * 24 * 3600,
+        max_bytes: Optional[int] = 1024**3,
+        evict_every: int = 100,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.path = path
+        self.keep_last = keep_last
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self._puts = 0
+        self._lock = threading.RLock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA busy_timeout=5000")
+        self.conn.executescript(_SCHEMA)
+
+    # =================================== SYNC API ====================================
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, compressed, metadata_type, metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, compressed, metadata_type, metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._load_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, compressed, metadata_type, metadata FROM checkpoints"
+        clauses, params = [], []
+        if config is not None:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+            tuples = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[5], row[6]))
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                tuples.append(self._load_tuple(thread_id, checkpoint_ns, row))
+        yield from tuples
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        c.pop("pending_sends", None)
+        values = c.pop("channel_values")
+
+        type_, data = self.serde.dumps_typed(c)
+        data, compressed = _compress(data)
+        metadata_type, metadata_data = self.serde.dumps_typed(metadata)
+
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            # Only the channels that changed since the parent checkpoint get a new blob
+            for channel, version in new_versions.items():
+                self._put_blob(thread_id, checkpoint_ns, channel, version, values.get(channel))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"), type_, data, compressed, metadata_type, metadata_data, time.time()),
+            )
+            self._prune_thread(thread_id, checkpoint_ns)
+
+        self._puts += 1
+        if self._puts % self.evict_every == 0:
+            self.evict()
+
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            data, compressed = _compress(data)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel, type_, data, compressed, task_path))
+        # Special writes (negative index) replace earlier ones, regular writes are only stored once
+        verb = "INSERT OR REPLACE" if all(row[4] < 0 for row in rows) else "INSERT OR IGNORE"
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete all checkpoints and writes of a thread."""
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")
+            for table in ("checkpoints", "blobs", "messages", "writes"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def get_next_version(self, current: Optional[str], channel: Any) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # =================================== ASYNC API ====================================
+
+    # SQLite calls are short and serialized by the lock, so they run in a thread
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint_tuple in tuples:
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # =================================== STORAGE ====================================
+
+    # Annotations below are strings since the `list` method shadows the builtin in the class body
+
+    def _put_blob(self, thread_id: str, checkpoint_ns: str, channel: str, version: str, value: Any) -> None:
+        if value is None:
+            self.conn.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?, ?)", (thread_id, checkpoint_ns, channel, version, "empty", None, 0))
+            return
+
+        if _is_message_list(value):
+            # Store each message once per thread and the list as references to them
+            hashes = []
+            rows = []
+            for message in value:
+                type_, data = self.serde.dumps_typed(message)
+                digest = hashlib.blake2b(type_.encode() + b"\0" + data, digest_size=16).hexdigest()
+                hashes.append(digest)
+                data, compressed = _compress(data)
+                rows.append((thread_id, digest, type_, data, compressed))
+            self.conn.executemany("INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?, ?)", rows)
+            type_, data = MESSAGE_REFS_TYPE, json.dumps(hashes).encode()
+        else:
+            type_, data = self.serde.dumps_typed(value)
+
+        data, compressed = _compress(data)
+        self.conn.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?, ?)", (thread_id, checkpoint_ns, channel, version, type_, data, compressed))
+
+    def _load_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, data, compressed, metadata_type, metadata_data = row
+        checkpoint = self.serde.loads_typed((type_, _decompress(data, compressed)))
+        checkpoint["channel_values"] = self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"])
+        # Older checkpoint formats carry the sends of the parent's tasks
+        if checkpoint.get("v", 0) < 4:
+            checkpoint["pending_sends"] = [value for _, channel, value in self._load_writes(thread_id, checkpoint_ns, parent_checkpoint_id) if channel == TASKS] if parent_checkpoint_id else []
+
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, metadata_data)),
+            parent_config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id}} if parent_checkpoint_id else None,
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> dict[str, Any]:
+        values = {}
+        for channel, version in versions.items():
+            row = self.conn.execute(
+                "SELECT type, blob, compressed FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                continue
+            type_, data, compressed = row
+            data = _decompress(data, compressed)
+            if type_ == MESSAGE_REFS_TYPE:
+                values[channel] = self._load_messages(thread_id, json.loads(data))
+            else:
+                values[channel] = self.serde.loads_typed((type_, data))
+        return values
+
+    def _load_messages(self, thread_id: str, hashes: "list[str]") -> "list[BaseMessage]":
+        by_hash = {}
+        unique = list(set(hashes))
+        for i in range(0, len(unique), _MAX_PARAMS):
+            chunk = unique[i : i + _MAX_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            for digest, type_, data, compressed in self.conn.execute(f"SELECT hash, type, blob, compressed FROM messages WHERE thread_id = ? AND hash IN ({placeholders})", (thread_id, *chunk)):
+                by_hash[digest] = (type_, _decompress(data, compressed))
+        # Deserialize per reference so repeated messages don't share an object
+        return [self.serde.loads_typed(by_hash[digest]) for digest in hashes]
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> "list[tuple[str, str, Any]]":
+        rows = self.conn.execute(
+            "SELECT task_id, channel, type, blob, compressed FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return [(task_id, channel, self.serde.loads_typed((type_, _decompress(data, compressed)))) for task_id, channel, type_, data, compressed in rows]
+
+    # =================================== EVICTION ====================================
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Drop all but the last `keep_last` checkpoints of a thread and their unreferenced data.
+
+        Pruning only runs once the thread has twice as many checkpoints as it keeps,
+        so its cost is amortized over many steps.
+        """
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?", (thread_id, checkpoint_ns)).fetchone()
+        if count <= 2 * self.keep_last:
+            return
+
+        rows = self.conn.execute(
+            "SELECT checkpoint_id, type, checkpoint, compressed FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC",
+            (thread_id, checkpoint_ns),
+        ).fetchall()
+        kept, dropped = rows[: self.keep_last], rows[self.keep_last :]
+        dropped_ids = [(thread_id, checkpoint_ns, row[0]) for row in dropped]
+        self.conn.executemany("DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", dropped_ids)
+        self.conn.executemany("DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", dropped_ids)
+
+        # Channel versions still referenced by a kept checkpoint
+        referenced = set()
+        for _, type_, data, compressed in kept:
+            checkpoint = self.serde.loads_typed((type_, _decompress(data, compressed)))
+            referenced.update((channel, str(version)) for channel, version in checkpoint["channel_versions"].items())
+        stale = [(thread_id, checkpoint_ns, channel, version) for channel, version in self.conn.execute("SELECT channel, version FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?", (thread_id, checkpoint_ns)) if (channel, version) not in referenced]
+        self.conn.executemany("DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?", stale)
+
+        # Messages are shared between namespaces, so collect the references of the whole thread
+        live_messages = set()
+        for data, compressed in self.conn.execute("SELECT blob, compressed FROM blobs WHERE thread_id = ? AND type = ?", (thread_id, MESSAGE_REFS_TYPE)):
+            live_messages.update(json.loads(_decompress(data, compressed)))
+        stale_messages = [(thread_id, digest) for (digest,) in self.conn.execute("SELECT hash FROM messages WHERE thread_id = ?", (thread_id,)) if digest not in live_messages]
+        self.conn.executemany("DELETE FROM messages WHERE thread_id = ? AND hash = ?", stale_messages)
+        logger.debug(f"Pruned {len(dropped)} checkpoints, {len(stale)} blobs and {len(stale_messages)} messages of thread {thread_id}")
+
+    def evict(self) -> "list[str]":
+        """Delete threads according to the age and size policies.
+
+        Returns:
+            IDs of the evicted threads
+        """
+        with self._lock:
+            # (thread_id, last update, stored bytes), least recently updated first
+            threads = self.conn.execute(
+                """
+                SELECT c.thread_id, c.updated_at, COALESCE(c.size, 0) + COALESCE(b.size, 0) + COALESCE(m.size, 0) + COALESCE(w.size, 0)
+                FROM (SELECT thread_id, MAX(created_at) AS updated_at, SUM(LENGTH(checkpoint) + LENGTH(metadata)) AS size FROM checkpoints GROUP BY thread_id) c
+                LEFT JOIN (SELECT thread_id, SUM(LENGTH(blob)) AS size FROM blobs GROUP BY thread_id) b ON b.thread_id = c.thread_id
+                LEFT JOIN (SELECT thread_id, SUM(LENGTH(blob)) AS size FROM messages GROUP BY thread_id) m ON m.thread_id = c.thread_id
+                LEFT JOIN (SELECT thread_id, SUM(LENGTH(blob)) AS size FROM writes GROUP BY thread_id) w ON w.thread_id = c.thread_id
+                ORDER BY c.updated_at
+                """
+            ).fetchall()
+
+            evicted = []
+            total = sum(size for _, _, size in threads)
+            now = time.time()
+            # Never evict the most recently updated thread, it is most likely still running
+            for thread_id, updated_at, size in threads[:-1]:
+                too_old = self.max_age_seconds is not None and now - updated_at > self.max_age_seconds
+                too_big = self.max_bytes is not None and total > self.max_bytes
+                if not (too_old or too_big):
+                    break
+                self.delete_thread(thread_id)
+                total -= size
+                evicted.append(thread_id)
+
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} checkpoint threads")
+        return evicted
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+_checkpointers: dict[str, SqliteCheckpointer] = {}
+_checkpointers_lock = threading.Lock()
+
+
+def get_default_checkpointer() -> SqliteCheckpointer:
+    """Get the process-wide checkpointer for new agents.
+
+    Checkpoints are stored in the database file named by the CODEGEN_CHECKPOINT_DB
+    environment variable, or in ~/.cache/codegen/checkpoints.db, so runs can be
+    resumed after a restart. Agents using the same file share one checkpointer and
+    its connection, their threads are kept apart by thread ID.
+    """
+    path = os.path.expanduser(os.environ.get(CHECKPOINT_DB_ENV) or DEFAULT_CHECKPOINT_DB)
+    with _checkpointers_lock:
+        if path not in _checkpointers:
+            _checkpointers[path] = SqliteCheckpointer(path)
+            logger.info(f"Storing agent checkpoints in {path}")
+        return _checkpointers[path]
@@ -0,0 +1,144 @@
+"""LLM-free compaction of stale tool outputs in the message history.
+
+Most of the context of a long run is taken up by tool outputs that are no longer
+useful: file views superseded by a later view of the same lines or an edit of the file, repeated
+identical calls, and large outputs from many steps ago. Compaction replaces their
+content with a short stub or header. The ToolMessages themselves are kept with their
+IDs and tool_call_ids, so tool call pairing stays intact.
+"""
+
+import json
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+
+# Tools whose output shows the content of a file
+VIEW_TOOLS = {"view_file"}
+# Tools that change the content of the file in their `filepath` argument, or of any
+# file if they have none
+EDIT_TOOLS = {
+    "edit_file",
+    "create_file",
+    "delete_file",
+    "semantic_edit",
+    "replace",
+    "relace_edit",
+    "rename_file",
+    "global_replace",
+    "move_symbol",
+    "move_symbols",
+    "rename_files",
+    "rollback_to_checkpoint",
+}
+# Lines shown by a view without an end line, see `view_file`
+DEFAULT_VIEW_LINES = 500
+
+# Number of most recent messages whose outputs are never truncated
+KEEP_RECENT_MESSAGES = 10
+# Older outputs longer than this are truncated to their first lines
+MAX_OLD_OUTPUT_CHARS = 2000
+HEADER_LINES = 5
+
+
+def _tool_calls_by_id(messages: list[AnyMessage]) -> dict[str, dict[str, Any]]:
+    calls = {}
+    for msg in messages:
+        if isinstance(msg, AIMessage):
+            for tool_call in msg.tool_calls:
+                calls[tool_call["id"]] = tool_call
+    return calls
+
+
+def _call_key(tool_call: dict[str, Any]) -> tuple[str, str]:
+    args = {k: v for k, v in tool_call.get("args", {}).items() if k != "tool_call_id"}
+    return tool_call["name"], json.dumps(args, sort_keys=True, default=str)
+
+
+def _view_range(args: dict[str, Any]) -> tuple[int, int]:
+    """Get the lines a view_file call shows, 1-indexed and inclusive."""
+    start = args.get("start_line") or 1
+    last = start + (args.get("max_lines") or DEFAULT_VIEW_LINES) - 1
+    end = args.get("end_line")
+    return start, last if end is None else min(end, last)
+
+
+def _compacted(msg: ToolMessage, content: str) -> ToolMessage:
+    """Copy a tool message with new content, keeping its ID so the reducer replaces it in place."""
+    return msg.model_copy(
+        update={
+            "content": content,
+            "additional_kwargs": {**msg.additional_kwargs, "compacted": True},
+            # The artifact is never sent to the model, no need to keep it in the history
+            "artifact": None,
+        }
+    )
+
+
+def compact_messages(
+    messages: list[AnyMessage],
+    keep_recent: int = KEEP_RECENT_MESSAGES,
+    max_old_chars: int = MAX_OLD_OUTPUT_CHARS,
+) -> list[ToolMessage]:
+    """Compact stale tool outputs in a message history.
+
+    Args:
+        messages: The message history
+        keep_recent: Number of most recent messages whose outputs are never truncated
+        max_old_chars: Older outputs longer than this are truncated to a header
+
+    Returns:
+        Compacted copies of the tool messages that changed, with their original IDs
+    """
+    calls = _tool_calls_by_id(messages)
+    cutoff = len(messages) - keep_recent
+    later_calls: set[tuple[str, str]] = set()
+    later_views: dict[str, list[tuple[int, int]]] = {}  # Line ranges viewed later, by file
+    later_edited_files: set[str] = set()
+    later_edit_of_any_file = False
+    replacements = []
+
+    # Walk backwards so it is known what happened later for every output
+    for i in range(len(messages) - 1, -1, -1):
+        msg = messages[i]
+        if not isinstance(msg, ToolMessage) or msg.tool_call_id not in calls:
+            continue
+
+        tool_call = calls[msg.tool_call_id]
+        name = tool_call["name"]
+        args = tool_call.get("args", {})
+        filepath = args.get("filepath")
+        key = _call_key(tool_call)
+
+        reason: Optional[str] = None
+        if name in VIEW_TOOLS and filepath:
+            start, end = _view_range(args)
+            if filepath in later_edited_files:
+                reason = f"{filepath} was edited later"
+            elif later_edit_of_any_file:
+                reason = "files were changed by a later call"
+            elif any(s <= start and end <= e for s, e in later_views.get(filepath, [])):
+                reason = f"lines {start}-{end} of {filepath} were viewed again later"
+        if reason is None and key in later_calls:
+            reason = "the same call was made again later"
+
+        later_calls.add(key)
+        if name in VIEW_TOOLS and filepath:
+            later_views.setdefault(filepath, []).append(_view_range(args))
+        elif name in EDIT_TOOLS and msg.status != "error":
+            # A failed edit left the files as they were
+            if filepath:
+                later_edited_files.add(filepath)
+            else:
+                later_edit_of_any_file = True
+
+        if msg.additional_kwargs.get("compacted") or not isinstance(msg.content, str):
+            continue
+
+        if reason:
+            replacements.append(_compacted(msg, f"[Output of {name} compacted: {reason}]"))
+        elif i < cutoff and len(msg.content) > max_old_chars:
+            header = "\n".join(msg.content.splitlines()[:HEADER_LINES])[:max_old_chars]
+            omitted = len(msg.content) - len(header)
+            replacements.append(_compacted(msg, f"{header}\n[... {omitted} more characters of {name} output compacted, call the tool again if needed ...]"))
+
+    return replacements[::-1]
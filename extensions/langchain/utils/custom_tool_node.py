@@ -1,17 +1,147 @@
+import asyncio
 from typing import Any, Literal, Optional, Union
 
 from langchain_core.messages import (
     AIMessage,
     AnyMessage,
     ToolCall,
+    ToolMessage,
 )
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import get_config_list, get_executor_for_config
 from langchain_core.stores import InMemoryBaseStore
 from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel
 
+from codegen.extensions.langchain.utils.tool_cache import ToolResultCache, get_tool_cache
+from codegen.extensions.langchain.utils.tool_metrics import get_tool_metrics
+
 
 class CustomToolNode(ToolNode):
-    """Extended ToolNode that detects truncated tool calls."""
+    """Extended ToolNode that detects truncated tool calls.
+
+    Tool calls of one turn are run in batches: consecutive calls to read-only tools
+    (tools with a `read_only = True` class attribute) run concurrently, while every
+    other call runs on its own, in order. Results keep the order of the tool calls.
+
+    Results of tools that read the local codebase (tools with a `cacheable = True`
+    class attribute) are memoized per codebase, see `ToolResultCache`. Remote reads
+    such as GitHub or Linear lookups change over time and are never memoized.
+    A call to any tool that is not read-only invalidates the caches of every codebase
+    the node's tools use, including tools without a codebase like `run_bash_command`.
+    Only tools with a `modifies_codebase = False` class attribute (Linear and Slack
+    writes, reflect) are known to leave the codebase alone.
+    """
+
+    def _get_cache(self, call: ToolCall) -> Optional[ToolResultCache]:
+        """Get the result cache for a call, or None if its result must not be cached."""
+        tool = self.tools_by_name.get(call["name"])
+        codebase = getattr(tool, "codebase", None)
+        if codebase is None or not getattr(tool, "cacheable", False):
+            return None
+        return get_tool_cache(codebase)
+
+    def _invalidates_caches(self, call: ToolCall) -> bool:
+        tool = self.tools_by_name.get(call["name"])
+        return not getattr(tool, "read_only", False) and getattr(tool, "modifies_codebase", True)
+
+    def _invalidate_caches(self) -> None:
+        codebases = {id(tool.codebase): tool.codebase for tool in self.tools_by_name.values() if getattr(tool, "codebase", None) is not None}
+        for codebase in codebases.values():
+            get_tool_cache(codebase).invalidate()
+
+    def _run_one(self, call: ToolCall, input_type: Literal["list", "dict", "tool_calls"], config: RunnableConfig) -> Any:
+        cache = self._get_cache(call)
+        if cache is None:
+            if not self._invalidates_caches(call):
+                return super()._run_one(call, input_type, config)
+            try:
+                return super()._run_one(call, input_type, config)
+            finally:
+                self._invalidate_caches()
+
+        cached = cache.get(call["name"], call["args"], call["id"])
+        if cached is not None:
+            get_tool_metrics().record_cache_hit(call["name"])
+            return cached
+        output = super()._run_one(call, input_type, config)
+        if isinstance(output, ToolMessage) and output.status != "error":
+            cache.put(call["name"], call["args"], output)
+        return output
+
+    async def _arun_one(self, call: ToolCall, input_type: Literal["list", "dict", "tool_calls"], config: RunnableConfig) -> Any:
+        cache = self._get_cache(call)
+        if cache is None:
+            if not self._invalidates_caches(call):
+                return await super()._arun_one(call, input_type, config)
+            try:
+                return await super()._arun_one(call, input_type, config)
+            finally:
+                self._invalidate_caches()
+
+        cached = cache.get(call["name"], call["args"], call["id"])
+        if cached is not None:
+            get_tool_metrics().record_cache_hit(call["name"])
+            return cached
+        output = await super()._arun_one(call, input_type, config)
+        if isinstance(output, ToolMessage) and output.status != "error":
+            cache.put(call["name"], call["args"], output)
+        return output
+
+    def _is_read_only(self, call: ToolCall) -> bool:
+        tool = self.tools_by_name.get(call["name"])
+        return bool(getattr(tool, "read_only", False))
+
+    def _batches(self, tool_calls: list[ToolCall]) -> list[list[int]]:
+        """Group the indices of the tool calls into batches that can run concurrently."""
+        batches: list[list[int]] = []
+        for i, call in enumerate(tool_calls):
+            if self._is_read_only(call) and batches and self._is_read_only(tool_calls[batches[-1][-1]]):
+                batches[-1].append(i)
+            else:
+                batches.append([i])
+        return batches
+
+    def _func(
+        self,
+        input: Union[
+            list[AnyMessage],
+            dict[str, Any],
+            BaseModel,
+        ],
+        config: RunnableConfig,
+        *,
+        store: Optional[InMemoryBaseStore],
+    ) -> Any:
+        tool_calls, input_type = self._parse_input(input, store)
+        config_list = get_config_list(config, len(tool_calls))
+        outputs: list[Any] = [None] * len(tool_calls)
+        with get_executor_for_config(config) as executor:
+            for batch in self._batches(tool_calls):
+                if len(batch) == 1:
+                    outputs[batch[0]] = self._run_one(tool_calls[batch[0]], input_type, config_list[batch[0]])
+                    continue
+                results = executor.map(lambda i: self._run_one(tool_calls[i], input_type, config_list[i]), batch)
+                for i, result in zip(batch, results):
+                    outputs[i] = result
+        return self._combine_tool_outputs(outputs, input_type)
+
+    async def _afunc(
+        self,
+        input: Union[
+            list[AnyMessage],
+            dict[str, Any],
+            BaseModel,
+        ],
+        config: RunnableConfig,
+        *,
+        store: Optional[InMemoryBaseStore],
+    ) -> Any:
+        tool_calls, input_type = self._parse_input(input, store)
+        outputs: list[Any] = []
+        for batch in self._batches(tool_calls):
+            outputs.extend(await asyncio.gather(*(self._arun_one(tool_calls[i], input_type, config) for i in batch)))
+        return self._combine_tool_outputs(outputs, input_type)
 
     def _parse_input(
         self,
@@ -1,12 +1,56 @@
 import datetime
-from typing import Optional
+import threading
+from typing import Any, Optional
+from uuid import UUID
 
+from langchain_core.callbacks import BaseCallbackHandler
 from langsmith import Client
 
+# Tenant and project IDs never change, so they are looked up once per host (and project)
+_tenant_ids: dict[str, str] = {}
+_project_ids: dict[tuple[str, str], str] = {}
+_ids_lock = threading.Lock()
+
+
+class RootRunIdCallbackHandler(BaseCallbackHandler):
+    """Callback handler that captures the ID of the root run of a graph or chain.
+
+    LangSmith traces runs under the same IDs as the callback manager, so the captured
+    ID identifies the trace of exactly this run, even with many agents running at once.
+    """
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self.run_id: Optional[str] = None
+
+    def on_chain_start(self, serialized: dict[str, Any], inputs: dict[str, Any], *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        if parent_run_id is None:
+            self.run_id = str(run_id)
+
+
+def _get_tenant_id(client: Client) -> str:
+    host_url = client._host_url
+    with _ids_lock:
+        if host_url not in _tenant_ids:
+            _tenant_ids[host_url] = str(client._get_tenant_id())
+        return _tenant_ids[host_url]
+
+
+def _get_project_id(client: Client, project_name: str) -> str:
+    key = (client._host_url, project_name)
+    with _ids_lock:
+        if key not in _project_ids:
+            _project_ids[key] = str(client.read_project(project_name=project_name).id)
+        return _project_ids[key]
+
 
 def get_langsmith_url(client: Client, run_id: str, project_name: Optional[str] = None) -> str:
     """Get the URL for a run in LangSmith.
 
+    Only the first call for a host and project makes API requests, afterwards
+    the URL is built from cached IDs.
+
     Args:
         client: The LangSmith client
         run_id: The ID of the run
@@ -18,12 +62,12 @@ def get_langsmith_url(client: Client, run_id: str, project_name: Optional[str] =
     # Construct the URL directly using the host URL and run ID
     # This avoids the issue with the client's get_run_url method expecting a run object
     host_url = client._host_url
-    tenant_id = client._get_tenant_id()
+    tenant_id = _get_tenant_id(client)
 
     try:
         # Get the project ID from the project name
         if project_name is not None:
-            project_id = client.read_project(project_name=project_name).id
+            project_id = _get_project_id(client, project_name)
             # Construct the URL
             return f"{host_url}/o/{tenant_id}/projects/p/{project_id}/r/{run_id}?poll=true"
         else:
@@ -0,0 +1,79 @@
+"""In-process latency histograms of model requests and tool calls."""
+
+import bisect
+import math
+import threading
+
+# Bucket upper bounds grow by 10% from 50ms, which puts percentiles within 10% of the truth
+_MIN_LATENCY = 0.05
+_GROWTH = 1.1
+_NUM_BUCKETS = 100  # Up to about 11 minutes
+
+
+class LatencyHistogram:
+    """Thread-safe histogram of latencies with logarithmic buckets.
+
+    Memory use and the cost of `record` and `percentile` do not depend on the number
+    of recorded samples.
+    """
+
+    def __init__(self, min_latency: float = _MIN_LATENCY, num_buckets: int = _NUM_BUCKETS) -> None:
+        self.bounds = [min_latency * _GROWTH**i for i in range(num_buckets)]
+        self.counts = [0] * (num_buckets + 1)  # The last bucket holds everything above the largest bound
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def percentile(self, p: float) -> float:
+        """Get an upper bound of the p-th percentile (0-100) of the recorded latencies.
+
+        Returns:
+            The percentile in seconds, or inf if nothing was recorded
+        """
+        with self._lock:
+            if self.count == 0:
+                return math.inf
+            rank = math.ceil(self.count * p / 100)
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return self.bounds[i] if i < len(self.bounds) else math.inf
+        return math.inf
+
+    def cumulative_counts(self, bounds: list[float]) -> list[int]:
+        """Get the number of latencies up to each of the given bounds, e.g. for Prometheus buckets.
+
+        Bounds are rounded up to the nearest bucket bound, so counts are exact for
+        bounds that are bucket bounds and within one bucket otherwise.
+        """
+        with self._lock:
+            counts = list(self.counts)
+        cumulative = []
+        for bound in bounds:
+            i = bisect.bisect_left(self.bounds, bound)
+            cumulative.append(sum(counts[: i + 1]))
+        return cumulative
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+_histograms: dict[tuple[str, str], LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def get_latency_histogram(provider: str, model: str) -> LatencyHistogram:
+    """Get the process-wide latency histogram of a provider and model."""
+    key = (provider, model)
+    with _histograms_lock:
+        if key not in _histograms:
+            _histograms[key] = LatencyHistogram()
+        return _histograms[key]
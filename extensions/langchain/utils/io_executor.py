@@ -0,0 +1,30 @@
+"""Shared executor for blocking network calls made from async agents."""
+
+import asyncio
+import contextvars
+import functools
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+# Threads here mostly wait on sockets, so the pool can be much larger than the CPU count
+IO_EXECUTOR_WORKERS = 64
+
+
+@functools.cache
+def get_io_executor() -> ThreadPoolExecutor:
+    """Get the process-wide executor for blocking I/O (GitHub, Linear, Slack, LLM-backed tools)."""
+    return ThreadPoolExecutor(max_workers=IO_EXECUTOR_WORKERS, thread_name_prefix="agent-io")
+
+
+async def run_in_io_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking function on the I/O executor without blocking the event loop.
+
+    The context is copied so callbacks and tracing of the calling run still apply.
+    Keeping these calls off the default executor leaves it free for the CPU-bound tools.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(ctx.run, func, *args, **kwargs))
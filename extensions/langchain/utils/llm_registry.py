@@ -0,0 +1,121 @@
+"""Process-wide registry of provider chat model clients.
+
+Building a `ChatAnthropic`/`ChatOpenAI` creates new HTTP clients, so every LLM built
+for a single tool call used to pay for client construction and a fresh TLS handshake.
+The registry hands out one client per (provider, model, parameters) and keeps its
+keep-alive connections warm for every `LLM` with the same configuration.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+
+type ClientKey = tuple[str, tuple[tuple[str, Hashable], ...]]
+
+
+def make_client_key(provider: str, params: dict[str, Any]) -> ClientKey:
+    """Get the registry key of a provider and its model parameters."""
+    return provider, tuple(sorted(params.items()))
+
+
+@dataclass
+class ClientStats:
+    """Usage statistics of a registered client."""
+
+    provider: str
+    model: str
+    created_at: float
+    reuses: int = 0  # Number of times the existing client was handed out again
+    requests: int = 0
+    errors: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    hedges: int = 0  # Requests that were hedged with a second request
+    hedge_wins: int = 0  # Hedged requests where the second request answered first
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.requests if self.requests else 0.0
+
+
+class LLMClientRegistry:
+    """Thread-safe registry of chat model clients and their usage statistics."""
+
+    def __init__(self) -> None:
+        self._clients: dict[ClientKey, BaseChatModel] = {}
+        self._stats: dict[ClientKey, ClientStats] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: ClientKey, factory: Callable[[], BaseChatModel]) -> BaseChatModel:
+        """Get the client for a key, creating it with `factory` if needed."""
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._stats[key].reuses += 1
+                return client
+
+        # Build outside the lock, client construction can be slow
+        client = factory()
+        with self._lock:
+            if key in self._clients:
+                # Another thread won the race, keep a single client per key
+                self._stats[key].reuses += 1
+                return self._clients[key]
+            self._clients[key] = client
+            self._stats[key] = ClientStats(provider=key[0], model=str(dict(key[1]).get("model", "")), created_at=time.time())
+            return client
+
+    @contextmanager
+    def track(self, key: ClientKey) -> Iterator[None]:
+        """Record the latency and outcome of a request made with a registered client."""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            with self._lock:
+                stats = self._stats.get(key)
+                if stats is not None:
+                    stats.requests += 1
+                    stats.errors += error
+                    stats.total_latency += latency
+                    stats.max_latency = max(stats.max_latency, latency)
+
+    def record_hedge(self, key: ClientKey, won: bool) -> None:
+        """Record the outcome of a hedged request."""
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is not None:
+                stats.hedges += 1
+                stats.hedge_wins += won
+
+    def stats(self) -> list[ClientStats]:
+        """Get a snapshot of the statistics of every registered client."""
+        with self._lock:
+            return [replace(stats) for stats in self._stats.values()]
+
+    def clear(self) -> None:
+        """Drop all clients, e.g. after the API keys changed."""
+        with self._lock:
+            self._clients.clear()
+            self._stats.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+_registry = LLMClientRegistry()
+
+
+def get_llm_registry() -> LLMClientRegistry:
+    """Get the process-wide LLM client registry."""
+    return _registry
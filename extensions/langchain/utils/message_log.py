@@ -0,0 +1,135 @@
+"""Append-optimized message history for the agent graph state."""
+
+import uuid
+from collections.abc import Iterable
+from typing import Optional, SupportsIndex
+
+from langchain_core.messages import AnyMessage
+
+
+class MessageLog(list[AnyMessage]):
+    """A list of messages with a persistent index from message id to position.
+
+    Appending is amortized O(1) and updating a message by id only touches that
+    entry. `copy` carries the index over, so a reducer can apply the updates of a
+    graph step to a copy without assigning ids and indexing the whole history again.
+    The copy itself is still O(history): the list and the index are duplicated, which
+    is much cheaper than the per-message Python loop it replaces but not constant.
+    Mutations that shift positions (insert, delete, slicing, sorting) invalidate the
+    index, which is rebuilt on the next lookup.
+
+    The log is a plain list subclass, so checkpoint serializers store it as a list.
+    Use `MessageLog.from_messages` to rehydrate a deserialized list.
+    """
+
+    def __init__(self, messages: Iterable[AnyMessage] = ()) -> None:
+        super().__init__(messages)
+        self._index: Optional[dict[str, int]] = None
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[AnyMessage]) -> "MessageLog":
+        """Get a MessageLog for the messages, reusing them if they already are one."""
+        if isinstance(messages, cls):
+            return messages
+        return cls(messages)
+
+    @property
+    def index(self) -> dict[str, int]:
+        """Positions of the messages by id."""
+        if self._index is None:
+            self._index = {}
+            for i, msg in enumerate(self):
+                self._ensure_id(msg)
+                self._index[msg.id] = i
+        return self._index
+
+    @staticmethod
+    def _ensure_id(msg: AnyMessage) -> None:
+        if getattr(msg, "id", None) is None:
+            msg.id = str(uuid.uuid4())
+
+    def get_by_id(self, message_id: str) -> Optional[AnyMessage]:
+        """Get a message by id, or None if it is not in the log."""
+        i = self.index.get(message_id)
+        return None if i is None else self[i]
+
+    def upsert(self, messages: Iterable[AnyMessage]) -> "MessageLog":
+        """Replace messages with a known id and append the others.
+
+        Messages without an id are given one.
+
+        Returns:
+            The log itself
+        """
+        index = self.index
+        for msg in messages:
+            self._ensure_id(msg)
+            i = index.get(msg.id)
+            if i is None:
+                index[msg.id] = len(self)
+                super().append(msg)
+            else:
+                super().__setitem__(i, msg)
+        return self
+
+    # ============================ INDEX-PRESERVING MUTATIONS ============================
+
+    def append(self, msg: AnyMessage) -> None:
+        self._ensure_id(msg)
+        if self._index is not None:
+            self._index[msg.id] = len(self)
+        super().append(msg)
+
+    def extend(self, messages: Iterable[AnyMessage]) -> None:
+        for msg in messages:
+            self.append(msg)
+
+    def __iadd__(self, messages: Iterable[AnyMessage]) -> "MessageLog":
+        self.extend(messages)
+        return self
+
+    # ============================ INDEX-INVALIDATING MUTATIONS ============================
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self._index = None
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self._index = None
+
+    def insert(self, i: SupportsIndex, msg: AnyMessage) -> None:
+        super().insert(i, msg)
+        self._index = None
+
+    def pop(self, i: SupportsIndex = -1) -> AnyMessage:
+        msg = super().pop(i)
+        self._index = None
+        return msg
+
+    def remove(self, msg: AnyMessage) -> None:
+        super().remove(msg)
+        self._index = None
+
+    def clear(self) -> None:
+        super().clear()
+        self._index = None
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self._index = None
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._index = None
+
+    def copy(self) -> "MessageLog":
+        """Get a shallow copy of the log that shares no state with it, including the index."""
+        log = MessageLog(self)
+        if self._index is not None:
+            log._index = self._index.copy()
+        return log
+
+    def __reduce__(self):
+        # Pickle as a MessageLog without the index, which is rebuilt on demand
+        return (MessageLog, (list(self),))
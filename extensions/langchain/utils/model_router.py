@@ -0,0 +1,85 @@
+"""Routing of reasoner steps between the main model and a cheaper, faster model.
+
+Many steps of a run are mechanical: after paging through search results, listing a
+directory or re-viewing a file after an edit, the next action is usually obvious.
+A router classifies each step from the message history so those steps can go to a
+fast model, while planning steps (a new task, a failed tool call, a final answer)
+stay on the main model.
+"""
+
+from typing import Literal, Protocol
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+
+from codegen.extensions.langchain.utils.compaction import EDIT_TOOLS
+
+type Route = Literal["main", "fast"]
+
+# Key of the route in the response metadata of the messages produced by the reasoner
+ROUTE_KEY = "model_route"
+
+# Tools whose output rarely needs planning to act on
+READ_TOOLS = {"view_file", "list_directory", "search", "search_files_by_name", "reveal_symbol", "semantic_search"}
+# A rollback abandons the current approach, the step after it needs planning
+MECHANICAL_TOOLS = frozenset(READ_TOOLS | (EDIT_TOOLS - {"rollback_to_checkpoint"}))
+
+# Number of fast steps in a row after which the main model takes a look again
+MAX_CONSECUTIVE_FAST_STEPS = 3
+
+
+class ModelRouter(Protocol):
+    """Picks the model for the next reasoner step."""
+
+    def route(self, messages: list[AnyMessage]) -> Route:
+        """Get the route of the step that answers the last message of the history."""
+        ...
+
+
+class HeuristicModelRouter:
+    """Routes steps that follow successful mechanical tool calls to the fast model.
+
+    A step is mechanical when every tool call of the last model response was to one
+    of `mechanical_tools` and none of them failed. Everything else, including new
+    turns and steps right after a summary, goes to the main model. After
+    `max_consecutive_fast` fast steps in a row, the next step is escalated so the
+    main model can correct the course.
+    """
+
+    def __init__(self, mechanical_tools: frozenset[str] = MECHANICAL_TOOLS, max_consecutive_fast: int = MAX_CONSECUTIVE_FAST_STEPS) -> None:
+        self.mechanical_tools = mechanical_tools
+        self.max_consecutive_fast = max_consecutive_fast
+
+    def route(self, messages: list[AnyMessage]) -> Route:
+        if not messages or not isinstance(messages[-1], ToolMessage):
+            return "main"
+
+        # Tool results of the last model response, and the response itself
+        i = len(messages)
+        while i > 0 and isinstance(messages[i - 1], ToolMessage):
+            i -= 1
+        results = messages[i:]
+        if i == 0 or not isinstance(messages[i - 1], AIMessage):
+            return "main"
+        response = messages[i - 1]
+
+        if response.additional_kwargs.get("is_summary") or any(msg.additional_kwargs.get("just_summarized") for msg in results):
+            return "main"
+        if any(msg.status == "error" for msg in results):
+            return "main"
+        if not response.tool_calls or any(call["name"] not in self.mechanical_tools for call in response.tool_calls):
+            return "main"
+        if self._consecutive_fast_steps(messages[:i]) >= self.max_consecutive_fast:
+            return "main"
+        return "fast"
+
+    @staticmethod
+    def _consecutive_fast_steps(messages: list[AnyMessage]) -> int:
+        """Count the model responses at the end of the history that came from the fast model."""
+        count = 0
+        for msg in reversed(messages):
+            if not isinstance(msg, AIMessage):
+                continue
+            if msg.response_metadata.get(ROUTE_KEY) != "fast":
+                break
+            count += 1
+        return count
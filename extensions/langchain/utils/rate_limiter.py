@@ -0,0 +1,158 @@
+"""Adaptive rate limiting of model requests, shared by every agent in the process.
+
+Each (provider, model) has one limiter. Requests reserve a start time from it in
+arrival order, so concurrent agents are served first come, first served. When a
+provider answers 429, the limiter stops everyone until the `retry-after` time has
+passed and halves its rate. Successful requests slowly raise the rate again.
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from typing import Optional
+
+import anthropic
+import openai
+
+from codegen.shared.logging.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+# Request rate (per second) a limiter starts at and never exceeds
+MAX_REQUEST_RATE = 20.0
+# Request rate a limiter never goes below, however many 429s it gets
+MIN_REQUEST_RATE = 0.05
+# Number of requests that may start at once after an idle period
+BURST = 8
+# Rate added after every successful request
+RATE_INCREASE = 0.1
+# Pause after a 429 that comes without a retry-after header
+DEFAULT_RETRY_AFTER = 5.0
+# Cap on the backoff of errors that are retried without a rate limit
+MAX_BACKOFF = 30.0
+
+# Transient errors worth retrying. Bad requests, authentication and permission
+# errors and the like fail the same way again, so they are raised immediately.
+_RETRYABLE_ERRORS = (
+    anthropic.RateLimitError,
+    anthropic.InternalServerError,
+    anthropic.APIConnectionError,  # Includes timeouts
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,
+)
+_RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Check whether an error means the provider is throttling us."""
+    return isinstance(error, (anthropic.RateLimitError, openai.RateLimitError)) or getattr(error, "status_code", None) in (429, 529)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Check whether a request that failed with this error may succeed when retried."""
+    if isinstance(error, _RETRYABLE_ERRORS):
+        return True
+    if isinstance(error, (anthropic.APIStatusError, openai.APIStatusError)):
+        return error.status_code in _RETRYABLE_STATUS_CODES
+    return False
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Get how long the provider asked us to wait, from the headers of an error response."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    if value := headers.get("retry-after-ms"):
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    if value := headers.get("retry-after"):
+        try:
+            return float(value)
+        except ValueError:
+            # An HTTP date
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+class AdaptiveRateLimiter:
+    """Token bucket with an adaptive rate (AIMD) and a shared pause for 429s.
+
+    Implemented as a generic cell rate algorithm: every request reserves the next
+    start time, which keeps the order of arrival without a queue of waiters.
+    """
+
+    def __init__(self, name: str, rate: float = MAX_REQUEST_RATE, burst: int = BURST) -> None:
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.rate_limited = 0  # Number of 429s seen
+        self._tat = 0.0  # Theoretical arrival time of the next request
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Reserve a start time for a request and get how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            base = max(now, self._blocked_until)
+            self._tat = max(self._tat, base) + interval
+            start = max(base, self._tat - self.burst * interval)
+            return start - now
+
+    def acquire(self) -> None:
+        """Block until the next request may start."""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self) -> None:
+        """Wait until the next request may start without blocking the event loop."""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(MAX_REQUEST_RATE, self.rate + RATE_INCREASE)
+
+    def on_error(self, error: BaseException, attempt: int) -> float:
+        """Adapt to a failed request.
+
+        Returns:
+            How long the failed caller should wait before retrying. Rate limits pause
+            the whole limiter instead, so `acquire` does the waiting for them.
+        """
+        if not is_rate_limit_error(error):
+            return min(MAX_BACKOFF, 0.5 * 2**attempt) * random.uniform(0.5, 1.0)
+
+        retry_after = get_retry_after(error) or DEFAULT_RETRY_AFTER
+        with self._lock:
+            self.rate_limited += 1
+            self.rate = max(MIN_REQUEST_RATE, self.rate / 2)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        logger.warning(f"Rate limited by {self.name}, pausing for {retry_after:.1f}s at {self.rate:.2f} requests/s")
+        return 0.0
+
+
+_limiters: dict[tuple[str, str], AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str) -> AdaptiveRateLimiter:
+    """Get the process-wide rate limiter of a provider and model."""
+    key = (provider, model)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = AdaptiveRateLimiter(f"{provider}/{model}")
+        return _limiters[key]
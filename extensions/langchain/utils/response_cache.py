@@ -0,0 +1,182 @@
+"""On-disk record/replay cache of model responses.
+
+Responses are keyed by a canonical hash of the provider, the model parameters, the
+messages, the bound tools and the other request kwargs. Message IDs and response
+metadata are left out of the key, they differ between otherwise identical runs.
+
+Modes:
+- off: every request goes to the provider
+- record: every request goes to the provider, and its response is stored
+- replay: responses only come from the cache, a miss raises `ResponseCacheMissError`
+- read_through: cached responses are reused, misses go to the provider and are stored
+
+A replayed run needs neither network nor API keys. It runs at the speed of its tools,
+which makes it useful for profiling the rest of the agent and for benchmarks in CI.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from enum import StrEnum
+from typing import Any, Optional
+
+from langchain_core.load import dumpd, load
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+
+from codegen.shared.logging.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+# Environment variables with the default mode and database path
+CACHE_MODE_ENV = "CODEGEN_LLM_CACHE_MODE"
+CACHE_PATH_ENV = "CODEGEN_LLM_CACHE_PATH"
+DEFAULT_CACHE_PATH = os.path.join("~", ".cache", "codegen", "llm_responses.db")
+
+# Responses smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response BLOB NOT NULL,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class ResponseCacheMode(StrEnum):
+    OFF = "off"
+    RECORD = "record"
+    REPLAY = "replay"
+    READ_THROUGH = "read_through"
+
+
+class ResponseCacheMissError(Exception):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def _canonical_message(message: BaseMessage) -> dict[str, Any]:
+    return {
+        "type": message.type,
+        "content": message.content,
+        "name": message.name,
+        "tool_calls": getattr(message, "tool_calls", None) or [],
+        "tool_call_id": getattr(message, "tool_call_id", None),
+    }
+
+
+def make_cache_key(provider: str, params: dict[str, Any], messages: list[BaseMessage], stop: Optional[list[str]], kwargs: dict[str, Any]) -> str:
+    """Get the cache key of a model request."""
+    request = {
+        "provider": provider,
+        "params": params,
+        "messages": [_canonical_message(message) for message in messages],
+        "stop": stop,
+        "kwargs": kwargs,
+    }
+    data = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite store of model responses, see the module docstring for the modes."""
+
+    def __init__(self, path: str, mode: ResponseCacheMode = ResponseCacheMode.READ_THROUGH) -> None:
+        self.path = path
+        self.mode = ResponseCacheMode(mode)
+        self.hits = 0
+        self.misses = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str) -> Optional[ChatResult]:
+        """Get the cached response of a request.
+
+        Returns:
+            The response, or None if the request has to go to the provider
+
+        Raises:
+            ResponseCacheMissError: In replay mode, if the request was not recorded
+        """
+        if self.mode == ResponseCacheMode.RECORD:
+            return None
+
+        with self._lock:
+            row = self.conn.execute("SELECT response, compressed FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if row is None:
+            if self.mode == ResponseCacheMode.REPLAY:
+                msg = f"No recorded response for request {key} in {self.path}"
+                raise ResponseCacheMissError(msg)
+            return None
+
+        data, compressed = row
+        payload = json.loads(zlib.decompress(data) if compressed else data)
+        generations = [load(generation) for generation in payload["generations"]]
+        for generation in generations:
+            # Let every replayed response get a fresh ID, like a live one
+            generation.message.id = None
+        return ChatResult(generations=generations, llm_output=payload["llm_output"])
+
+    def store(self, key: str, model: str, result: ChatResult) -> None:
+        """Store the response of a request, replacing an older one."""
+        if self.mode not in (ResponseCacheMode.RECORD, ResponseCacheMode.READ_THROUGH):
+            return
+        payload = {"generations": [dumpd(generation) for generation in result.generations], "llm_output": result.llm_output}
+        data = json.dumps(payload, separators=(",", ":"), default=str).encode()
+        compressed = 0
+        if len(data) >= COMPRESS_MIN_BYTES:
+            data, compressed = zlib.compress(data), 1
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, compressed, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model, data, compressed, time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+_caches: dict[tuple[str, ResponseCacheMode], ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(mode: Optional[str] = None, path: Optional[str] = None) -> Optional[ResponseCache]:
+    """Get the process-wide response cache for a mode and database path.
+
+    Both default to the CODEGEN_LLM_CACHE_MODE and CODEGEN_LLM_CACHE_PATH environment
+    variables, with caching off unless a mode is set.
+
+    Returns:
+        The cache, or None if caching is off
+    """
+    mode = ResponseCacheMode(mode or os.environ.get(CACHE_MODE_ENV) or ResponseCacheMode.OFF)
+    if mode == ResponseCacheMode.OFF:
+        return None
+    path = os.path.expanduser(path or os.environ.get(CACHE_PATH_ENV) or DEFAULT_CACHE_PATH)
+
+    key = (path, mode)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ResponseCache(path, mode)
+            logger.info(f"Using LLM response cache {path} in {mode} mode")
+        return _caches[key]
@@ -0,0 +1,92 @@
+"""Local estimate of the input size of the next model request."""
+
+import json
+from collections.abc import Sequence
+
+from langchain_core.messages import AnyMessage, BaseMessage
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from codegen.sdk.ai.utils import count_tokens
+
+# Fixed per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Rough cost of an image in the prompt
+IMAGE_TOKENS = 1600
+# Weight of the latest observation when calibrating against reported usage
+CALIBRATION_WEIGHT = 0.3
+
+
+def _message_text(msg: BaseMessage) -> str:
+    """Get the text of a message as it is sent to the model, without images."""
+    if isinstance(msg.content, str):
+        text = msg.content
+    else:
+        parts = [item if isinstance(item, str) else json.dumps(item) for item in msg.content if not (isinstance(item, dict) and item.get("type") in ("image", "image_url"))]
+        text = "\n".join(parts)
+    for tool_call in getattr(msg, "tool_calls", None) or []:
+        text += f"\n{tool_call['name']} {json.dumps(tool_call['args'])}"
+    return text
+
+
+def _image_count(msg: BaseMessage) -> int:
+    if isinstance(msg.content, str):
+        return 0
+    return sum(1 for item in msg.content if isinstance(item, dict) and item.get("type") in ("image", "image_url"))
+
+
+class TokenEstimator:
+    """Predicts the input tokens of a request before it is sent.
+
+    The estimate covers the tool schemas and every message in the request, with
+    token counts cached per message so each step only tokenizes new or changed
+    messages. Since the local tokenizer differs from the provider's, estimates are
+    scaled by a ratio calibrated against the input tokens the provider reports.
+    """
+
+    def __init__(self, tools: Sequence[BaseTool] = ()) -> None:
+        self.tool_tokens = sum(count_tokens(json.dumps(convert_to_openai_tool(tool))) for tool in tools)
+        self.ratio = 1.0
+        # Token count of each message by ID, with a hash of the text it was computed for
+        self._message_tokens: dict[str, tuple[int, int]] = {}
+
+    def count_message(self, msg: BaseMessage) -> int:
+        """Count the tokens of a single message."""
+        text = _message_text(msg)
+        key = hash(text)
+        cached = self._message_tokens.get(msg.id) if msg.id else None
+        if cached and cached[0] == key:
+            return cached[1]
+
+        tokens = count_tokens(text) + MESSAGE_OVERHEAD_TOKENS + IMAGE_TOKENS * _image_count(msg)
+        if msg.id:
+            self._message_tokens[msg.id] = (key, tokens)
+        return tokens
+
+    def estimate_raw(self, messages: Sequence[AnyMessage]) -> int:
+        """Estimate the input tokens with the local tokenizer only."""
+        tokens = self.tool_tokens + sum(self.count_message(msg) for msg in messages)
+        # Forget the messages that left the history, e.g. the ones a summary replaced
+        if len(self._message_tokens) > len(messages):
+            ids = {msg.id for msg in messages}
+            self._message_tokens = {k: v for k, v in self._message_tokens.items() if k in ids}
+        return tokens
+
+    def estimate(self, messages: Sequence[AnyMessage]) -> int:
+        """Estimate the input tokens of a request with these messages.
+
+        Args:
+            messages: All messages of the request, including the system message
+
+        Returns:
+            Calibrated estimate of the input tokens
+        """
+        return int(self.estimate_raw(messages) * self.ratio)
+
+    def observe(self, messages: Sequence[AnyMessage], input_tokens: int) -> None:
+        """Calibrate the estimator with the input tokens reported for a request."""
+        raw = self.estimate_raw(messages)
+        if raw <= 0 or input_tokens <= 0:
+            return
+        observed = min(max(input_tokens / raw, 0.5), 3.0)
+        self.ratio = (1 - CALIBRATION_WEIGHT) * self.ratio + CALIBRATION_WEIGHT * observed
@@ -0,0 +1,73 @@
+"""Memoization of read-only tool results within an agent run."""
+
+import json
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core.messages import ToolMessage
+
+from codegen.sdk.core.codebase import Codebase
+
+# Maximum number of cached results per codebase
+MAX_CACHED_RESULTS = 256
+
+
+class ToolResultCache:
+    """Cache of rendered read-only tool results for one codebase.
+
+    Entries are keyed by tool name, normalized arguments and a version counter.
+    Every mutating tool call bumps the version, which invalidates all entries.
+    """
+
+    def __init__(self, max_size: int = MAX_CACHED_RESULTS) -> None:
+        self.max_size = max_size
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str, int], ToolMessage] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, name: str, args: dict[str, Any]) -> tuple[str, str, int]:
+        normalized = {k: v for k, v in args.items() if k != "tool_call_id"}
+        return name, json.dumps(normalized, sort_keys=True, default=str), self.version
+
+    def get(self, name: str, args: dict[str, Any], tool_call_id: str) -> Optional[ToolMessage]:
+        """Get a cached result as a new message for the given tool call, or None on a miss."""
+        with self._lock:
+            key = self._key(name, args)
+            cached = self._entries.get(key)
+            if cached is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return cached.model_copy(update={"tool_call_id": tool_call_id, "additional_kwargs": {**cached.additional_kwargs, "cache_hit": True}})
+
+    def put(self, name: str, args: dict[str, Any], message: ToolMessage) -> None:
+        """Cache the result of a tool call."""
+        # Store a copy without an ID, the reducer assigns IDs to messages in place
+        entry = message.model_copy(update={"id": None})
+        with self._lock:
+            self._entries[self._key(name, args)] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Invalidate every cached result, e.g. after the codebase changed."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+
+_caches: "weakref.WeakKeyDictionary[Codebase, ToolResultCache]" = weakref.WeakKeyDictionary()
+
+
+def get_tool_cache(codebase: Codebase) -> ToolResultCache:
+    """Get the tool result cache attached to a codebase, creating it if needed."""
+    cache = _caches.get(codebase)
+    if cache is None:
+        cache = ToolResultCache()
+        _caches[codebase] = cache
+    return cache
@@ -0,0 +1,188 @@
+"""Process-wide metrics of tool calls.
+
+Every tool in `codegen.extensions.langchain.tools` is instrumented with
+`instrument_tool`, which records per tool: calls, errors, a latency histogram and
+the size of the output in characters and tokens. A call is an error if it raised,
+returned an error ToolMessage or rendered an error observation. Cache hits of the tool node are
+recorded by `CustomToolNode`, they never reach the tool.
+
+The metrics can be read in-process with `ToolMetricsRegistry.snapshot`, exported
+through an `ExternalLogger` with `export`, or rendered in the Prometheus text format
+with `to_prometheus`.
+"""
+
+import functools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+
+from codegen.agents.data import ToolMetricsData
+from codegen.extensions.langchain.utils.histogram import LatencyHistogram
+from codegen.extensions.tools.observation import rendered_status
+from codegen.sdk.ai.utils import count_tokens
+
+if TYPE_CHECKING:
+    from codegen.agents.loggers import ExternalLogger
+
+# Tool latencies range from microseconds for cached lookups to minutes for commands
+_MIN_TOOL_LATENCY = 0.001
+_NUM_TOOL_BUCKETS = 120  # Up to about 90 seconds
+# Upper bounds of the latency buckets in the Prometheus output
+PROMETHEUS_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+
+@dataclass
+class ToolMetrics:
+    """Metrics of one tool."""
+
+    name: str
+    calls: int = 0
+    errors: int = 0  # Calls that raised, returned an error ToolMessage or rendered an error observation
+    cache_hits: int = 0
+    output_chars: int = 0
+    output_tokens: int = 0
+    total_latency: float = 0.0
+    latency: LatencyHistogram = field(default_factory=lambda: LatencyHistogram(_MIN_TOOL_LATENCY, _NUM_TOOL_BUCKETS))
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.calls if self.calls else 0.0
+
+    def to_data(self) -> ToolMetricsData:
+        return ToolMetricsData(
+            tool_name=self.name,
+            calls=self.calls,
+            errors=self.errors,
+            cache_hits=self.cache_hits,
+            output_chars=self.output_chars,
+            output_tokens=self.output_tokens,
+            total_latency=self.total_latency,
+            latency_p50=self.latency.percentile(50) if self.calls else 0.0,
+            latency_p95=self.latency.percentile(95) if self.calls else 0.0,
+        )
+
+
+def _output_text(output: Any) -> str:
+    content = output.content if isinstance(output, ToolMessage) else output
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return str(content)
+
+
+class ToolMetricsRegistry:
+    """Thread-safe metrics of every tool, by tool name."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, ToolMetrics] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str) -> ToolMetrics:
+        # Callers hold the lock
+        if name not in self._metrics:
+            self._metrics[name] = ToolMetrics(name=name)
+        return self._metrics[name]
+
+    def record_call(self, name: str, latency: float, output: Any = None, error: bool = False) -> None:
+        """Record a finished tool call and its output."""
+        text = _output_text(output) if output is not None else ""
+        error = error or (isinstance(output, ToolMessage) and output.status == "error")
+        # Count tokens outside the lock, it is the slowest part for large outputs
+        tokens = count_tokens(text) if text else 0
+        with self._lock:
+            metrics = self._get(name)
+            metrics.calls += 1
+            metrics.errors += error
+            metrics.output_chars += len(text)
+            metrics.output_tokens += tokens
+            metrics.total_latency += latency
+            metrics.latency.record(latency)
+
+    def record_cache_hit(self, name: str) -> None:
+        with self._lock:
+            self._get(name).cache_hits += 1
+
+    def snapshot(self) -> list[ToolMetricsData]:
+        """Get the current metrics of every tool."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [m.to_data() for m in sorted(metrics, key=lambda m: m.name)]
+
+    def export(self, logger: "ExternalLogger") -> None:
+        """Log the current metrics of every tool, one record per tool."""
+        for data in self.snapshot():
+            logger.log(data)
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+
+        lines = []
+        counters = [
+            ("codegen_tool_calls_total", "Number of tool calls", "calls"),
+            ("codegen_tool_errors_total", "Number of failed tool calls", "errors"),
+            ("codegen_tool_cache_hits_total", "Number of tool calls answered from the tool result cache", "cache_hits"),
+            ("codegen_tool_output_chars_total", "Characters of tool output", "output_chars"),
+            ("codegen_tool_output_tokens_total", "Tokens of tool output", "output_tokens"),
+        ]
+        for metric, help_text, attr in counters:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            lines += [f'{metric}{{tool="{m.name}"}} {getattr(m, attr)}' for m in metrics]
+
+        metric = "codegen_tool_latency_seconds"
+        lines += [f"# HELP {metric} Latency of tool calls", f"# TYPE {metric} histogram"]
+        for m in metrics:
+            for bound, count in zip(PROMETHEUS_BUCKETS, m.latency.cumulative_counts(PROMETHEUS_BUCKETS)):
+                lines.append(f'{metric}_bucket{{tool="{m.name}",le="{bound}"}} {count}')
+            lines += [
+                f'{metric}_bucket{{tool="{m.name}",le="+Inf"}} {m.latency.count}',
+                f'{metric}_sum{{tool="{m.name}"}} {m.latency.total}',
+                f'{metric}_count{{tool="{m.name}"}} {m.latency.count}',
+            ]
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+
+_registry = ToolMetricsRegistry()
+
+
+def get_tool_metrics() -> ToolMetricsRegistry:
+    """Get the process-wide tool metrics registry."""
+    return _registry
+
+
+def instrument_tool(cls: type[BaseTool]) -> type[BaseTool]:
+    """Wrap the `_run` of a tool class to record its calls in the tool metrics registry.
+
+    The default async path of tools runs `_run` in an executor, so it is recorded too.
+    Tools that return a rendered string are checked for an error observation through
+    `rendered_status`.
+    """
+    run = cls._run
+
+    @functools.wraps(run)
+    def _run(self: BaseTool, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        token = rendered_status.set(None)
+        try:
+            output = run(self, *args, **kwargs)
+            failed = rendered_status.get() == "error"
+        except Exception:
+            get_tool_metrics().record_call(self.name, time.perf_counter() - start, error=True)
+            raise
+        finally:
+            rendered_status.reset(token)
+        get_tool_metrics().record_call(self.name, time.perf_counter() - start, output, error=failed)
+        return output
+
+    cls._run = _run
+    return cls
@@ -1,21 +1,55 @@
-from langchain_core.language_models import LLM
+from dataclasses import dataclass
 
 
-def get_max_model_input_tokens(llm: LLM) -> int:
-    """Get the maximum input tokens for the current model.
+@dataclass(frozen=True)
+class ModelLimits:
+    """Context window and output limits of a model, in tokens."""
+
+    input_tokens: int
+    output_tokens: int
+
+
+# Known model limits, matched by the longest prefix of the model name
+MODEL_LIMITS: dict[str, ModelLimits] = {
+    "claude-3-7-sonnet": ModelLimits(input_tokens=200000, output_tokens=64000),
+    "claude-3-5-sonnet": ModelLimits(input_tokens=200000, output_tokens=8192),
+    "claude-3-5-haiku": ModelLimits(input_tokens=200000, output_tokens=8192),
+    "claude-3-opus": ModelLimits(input_tokens=200000, output_tokens=4096),
+    "claude-3-sonnet": ModelLimits(input_tokens=200000, output_tokens=4096),
+    "claude-3-haiku": ModelLimits(input_tokens=200000, output_tokens=4096),
+    "gpt-4o": ModelLimits(input_tokens=128000, output_tokens=16384),
+    "gpt-4-turbo": ModelLimits(input_tokens=128000, output_tokens=4096),
+    "gpt-4.1": ModelLimits(input_tokens=1047576, output_tokens=32768),
+    "o1": ModelLimits(input_tokens=200000, output_tokens=100000),
+    "o1-mini": ModelLimits(input_tokens=128000, output_tokens=65536),
+    "o1-preview": ModelLimits(input_tokens=128000, output_tokens=32768),
+    "o3-mini": ModelLimits(input_tokens=200000, output_tokens=100000),
+}
+
+
+def get_model_limits(model_name: str) -> ModelLimits:
+    """Get the context window and output limits of a model.
+
+    Args:
+        model_name: Name of the model, e.g. "claude-3-7-sonnet-latest"
 
     Returns:
-        int: Maximum number of input tokens supported by the model
+        ModelLimits of the model, falling back to the limits of its model family
     """
+    name = model_name.lower()
+    matches = [prefix for prefix in MODEL_LIMITS if name.startswith(prefix)]
+    if matches:
+        return MODEL_LIMITS[max(matches, key=len)]
+
     # For Claude models not explicitly listed, if model name contains "claude", use Claude's limit
-    if "claude" in llm.model.lower():
-        return 200000
+    if "claude" in name:
+        return ModelLimits(input_tokens=200000, output_tokens=8192)
     # For GPT-4 models
-    elif "gpt-4" in llm.model.lower():
-        return 128000
+    elif "gpt-4" in name:
+        return ModelLimits(input_tokens=128000, output_tokens=4096)
     # For Grok models
-    elif "grok" in llm.model.lower():
-        return 1000000
+    elif "grok" in name:
+        return ModelLimits(input_tokens=1000000, output_tokens=12000)
 
     # default to gpt as it's lower bound
-    return 128000
+    return ModelLimits(input_tokens=128000, output_tokens=4096)
@@ -107,7 +107,8 @@ Also DO NOT ADD OR EDIT ANY TESTS!
         pprint.pprint(f"Instance ID: {instance_id} terminated with error: {agent_error}")
         raise agent_error
 
-    # Get the diff between the current state and the original commit
+    # Diff the working tree, not the edit journal: bash commands, codemods, symbol moves
+    # and the import updates of renames change files without going through the journal
     model_patch = codebase.get_diff(base=base_commit)
     pprint.pprint(model_patch)
 
@@ -3,6 +3,7 @@
 from .commit import commit
 from .create_file import create_file
 from .delete_file import delete_file
+from .edit_checkpoint import create_checkpoint, rollback_to_checkpoint
 from .edit_file import edit_file
 from .github.create_pr import create_pr
 from .github.create_pr_comment import create_pr_comment
@@ -16,9 +17,9 @@ from .linear import (
     linear_register_webhook_tool,
 )
 from .list_directory import list_directory
-from .move_symbol import move_symbol
+from .move_symbol import move_symbol, move_symbols
 from .reflection import perform_reflection
-from .rename_file import rename_file
+from .rename_file import rename_file, rename_files
 from .replacement_edit import replacement_edit
 from .reveal_symbol import reveal_symbol
 from .run_codemod import run_codemod
@@ -31,6 +32,8 @@ from .view_file import view_file
 __all__ = [
     # Git operations
     "commit",
+    # Checkpoint operations
+    "create_checkpoint",
     # File operations
     "create_file",
     "create_pr",
@@ -46,12 +49,15 @@ __all__ = [
     "list_directory",
     # Symbol operations
     "move_symbol",
+    "move_symbols",
     # Reflection
     "perform_reflection",
     "rename_file",
+    "rename_files",
     "replacement_edit",
     "replacement_edit_global",
     "reveal_symbol",
+    "rollback_to_checkpoint",
     "run_codemod",
     # Search operations
     "search",
@@ -6,6 +6,7 @@ from pydantic import Field
 
 from codegen.sdk.core.codebase import Codebase
 
+from .edit_journal import record_edit
 from .observation import Observation
 from .view_file import ViewFileObservation, view_file
 
@@ -62,6 +63,7 @@ Create the file in chunks or break up the content into smaller files.
     try:
         file = codebase.create_file(filepath, content=content)
         codebase.commit()
+        record_edit(codebase, filepath, None, content)
 
         # Get file info using view_file
         file_info = view_file(codebase, filepath)
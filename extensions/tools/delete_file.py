@@ -6,6 +6,7 @@ from pydantic import Field
 
 from codegen.sdk.core.codebase import Codebase
 
+from .edit_journal import record_edit
 from .observation import Observation
 
 
@@ -46,8 +47,10 @@ def delete_file(codebase: Codebase, filepath: str) -> DeleteFileObservation:
         )
 
     try:
+        content = file.content
         file.remove()
         codebase.commit()
+        record_edit(codebase, filepath, content, None)
         return DeleteFileObservation(
             status="success",
             filepath=filepath,
@@ -0,0 +1,93 @@
+"""Tools for checkpointing and rolling back edits made during an agent run."""
+
+from typing import ClassVar
+
+from pydantic import Field
+
+from codegen.sdk.core.codebase import Codebase
+
+from .edit_journal import get_edit_journal
+from .observation import Observation
+
+
+class CheckpointObservation(Observation):
+    """Response from creating an edit checkpoint."""
+
+    name: str = Field(
+        description="Name of the checkpoint",
+    )
+    edit_count: int = Field(
+        description="Number of journaled edits covered by the checkpoint",
+    )
+
+    str_template: ClassVar[str] = "Created checkpoint {name} after {edit_count} edits"
+
+
+class RollbackObservation(Observation):
+    """Response from rolling back to an edit checkpoint."""
+
+    name: str = Field(
+        description="Name of the checkpoint rolled back to",
+    )
+    reverted_files: list[str] = Field(
+        default_factory=list,
+        description="Files whose changes were reverted",
+    )
+    reverted_count: int = Field(
+        default=0,
+        description="Number of journaled edits that were undone",
+    )
+
+    str_template: ClassVar[str] = "Rolled back {reverted_count} edits to checkpoint {name}"
+
+
+def create_checkpoint(codebase: Codebase, name: str) -> CheckpointObservation:
+    """Create a named checkpoint of the edits made so far.
+
+    Args:
+        codebase: The codebase to operate on
+        name: Name of the checkpoint. Reusing a name moves the checkpoint.
+
+    Returns:
+        CheckpointObservation containing the checkpoint position
+    """
+    edit_count = get_edit_journal(codebase).checkpoint(name)
+    return CheckpointObservation(
+        status="success",
+        name=name,
+        edit_count=edit_count,
+    )
+
+
+def rollback_to_checkpoint(codebase: Codebase, name: str) -> RollbackObservation:
+    """Undo all edits made after a named checkpoint.
+
+    Args:
+        codebase: The codebase to operate on
+        name: Name of the checkpoint to roll back to
+
+    Returns:
+        RollbackObservation listing the reverted files
+    """
+    try:
+        undone = get_edit_journal(codebase).rollback(codebase, name)
+    except KeyError as e:
+        return RollbackObservation(
+            status="error",
+            error=str(e.args[0]),
+            name=name,
+        )
+    except Exception as e:
+        return RollbackObservation(
+            status="error",
+            error=f"Failed to roll back to checkpoint {name}: {e!s}",
+            name=name,
+        )
+
+    reverted_files = sorted({entry.filepath for entry in undone} | {entry.new_filepath for entry in undone if entry.new_filepath})
+    return RollbackObservation(
+        status="success",
+        name=name,
+        reverted_files=reverted_files,
+        reverted_count=len(undone),
+    )
@@ -7,6 +7,7 @@ from pydantic import Field
 
 from codegen.sdk.core.codebase import Codebase
 
+from .edit_journal import record_edit
 from .observation import Observation
 from .replacement_edit import generate_diff
 
@@ -72,8 +73,10 @@ def edit_file(codebase: Codebase, filepath: str, new_content: str) -> EditFileOb
     diff = generate_diff(file.content, new_content)
 
     # Apply the edit
+    original_content = file.content
     file.edit(new_content)
     codebase.commit()
+    record_edit(codebase, filepath, original_content, new_content)
 
     return EditFileObservation(
         status="success",
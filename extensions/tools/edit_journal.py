@@ -0,0 +1,265 @@
+"""Append-only journal of file edits made by the agent tools.
+
+Every edit tool records the file it touched together with hashes of the content
+before and after the edit and a compact reverse patch. This makes it cheap to
+create named checkpoints and roll back to any of them in O(changes).
+
+The diff of a run is taken from git (`Codebase.get_diff`) instead of the journal:
+bash commands, codemods and import updates of symbol moves change files without
+going through the journal.
+"""
+
+import difflib
+import hashlib
+import weakref
+from dataclasses import dataclass, field
+from typing import Literal, Optional
+
+from codegen.sdk.core.codebase import Codebase
+from codegen.shared.logging.get_logger import get_logger
+
+logger = get_logger(__name__)
+
+# A reverse hunk replaces lines [start:end] of the edited content with `lines`
+ReverseHunk = tuple[int, int, list[str]]
+
+
+def content_hash(content: Optional[str]) -> Optional[str]:
+    """Get a short, stable hash of file content (None for a missing file)."""
+    if content is None:
+        return None
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def make_reverse_patch(before: str, after: str) -> list[ReverseHunk]:
+    """Compute the hunks that turn `after` back into `before`.
+
+    Only the changed regions are stored, so the patch size is proportional
+    to the size of the edit rather than the size of the file.
+    """
+    after_lines = after.splitlines(keepends=True)
+    before_lines = before.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, after_lines, before_lines, autojunk=False)
+    return [(i1, i2, before_lines[j1:j2]) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def apply_reverse_patch(after: str, hunks: list[ReverseHunk]) -> str:
+    """Apply a reverse patch produced by `make_reverse_patch`."""
+    lines = after.splitlines(keepends=True)
+    # Apply from the bottom up so earlier indices stay valid
+    for start, end, replacement in reversed(hunks):
+        lines[start:end] = replacement
+    return "".join(lines)
+
+
+def diffstat(path: str, before: Optional[str], after: Optional[str]) -> Optional[str]:
+    """Summarize the change of a single file as a git-style diffstat line.
+
+    Returns:
+        A line like "path | +3 -1", or None if the file did not change
+    """
+    if before == after:
+        return None
+    added = removed = 0
+    matcher = difflib.SequenceMatcher(None, (before or "").splitlines(), (after or "").splitlines(), autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            removed += i2 - i1
+            added += j2 - j1
+    if before is None:
+        return f"{path} (new) | +{added}"
+    if after is None:
+        return f"{path} (deleted) | -{removed}"
+    return f"{path} | +{added} -{removed}"
+
+
+@dataclass
+class JournalEntry:
+    """A single journaled file operation."""
+
+    op: Literal["edit", "create", "delete", "rename"]
+    filepath: str
+    before_hash: Optional[str] = None
+    after_hash: Optional[str] = None
+    reverse_patch: list[ReverseHunk] = field(default_factory=list)
+    new_filepath: Optional[str] = None  # Only set for renames
+
+
+class EditJournal:
+    """Journal of edits with named checkpoints and rollback.
+
+    The journal also keeps the latest journaled content of every touched file, to
+    detect changes made outside of it before rolling back.
+    """
+
+    def __init__(self) -> None:
+        self.entries: list[JournalEntry] = []
+        self.checkpoints: dict[str, int] = {}
+        self._current: dict[str, Optional[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # =================================== RECORDING ====================================
+
+    def record(self, filepath: str, before: Optional[str], after: Optional[str]) -> Optional[JournalEntry]:
+        """Record a content change of a file.
+
+        Args:
+            filepath: Path of the file relative to the repo root
+            before: Content before the edit, or None if the file was created
+            after: Content after the edit, or None if the file was deleted
+
+        Returns:
+            The new journal entry, or None if nothing changed
+        """
+        if before == after:
+            return None
+
+        if before is None:
+            entry = JournalEntry(op="create", filepath=filepath, after_hash=content_hash(after))
+        elif after is None:
+            entry = JournalEntry(op="delete", filepath=filepath, before_hash=content_hash(before), reverse_patch=[(0, 0, before.splitlines(keepends=True))])
+        else:
+            entry = JournalEntry(
+                op="edit",
+                filepath=filepath,
+                before_hash=content_hash(before),
+                after_hash=content_hash(after),
+                reverse_patch=make_reverse_patch(before, after),
+            )
+
+        self.entries.append(entry)
+        self._track(filepath, after)
+        return entry
+
+    def record_rename(self, filepath: str, new_filepath: str, before: str, after: str) -> JournalEntry:
+        """Record a file rename.
+
+        Import updates, in other files and in the renamed file itself, are undone by
+        renaming the file back, so they are not journaled separately.
+
+        Args:
+            filepath: Path of the file before the rename
+            new_filepath: Path of the file after the rename
+            before: Content of the file before the rename
+            after: Content of the file after the rename and its import updates
+        """
+        entry = JournalEntry(op="rename", filepath=filepath, new_filepath=new_filepath, before_hash=content_hash(before), after_hash=content_hash(after))
+        self.entries.append(entry)
+        self._track(filepath, None)
+        self._track(new_filepath, after)
+        return entry
+
+    def _track(self, filepath: str, after: Optional[str]) -> None:
+        self._current[filepath] = after
+
+    # =================================== CHECKPOINTS ====================================
+
+    def checkpoint(self, name: str) -> int:
+        """Create (or move) a named checkpoint at the current end of the journal.
+
+        Returns:
+            Number of journal entries covered by the checkpoint
+        """
+        self.checkpoints[name] = len(self.entries)
+        return self.checkpoints[name]
+
+    def rollback(self, codebase: Codebase, name: str) -> list[JournalEntry]:
+        """Undo every journaled operation made after a checkpoint.
+
+        Args:
+            codebase: The codebase the edits were made on
+            name: Name of the checkpoint to roll back to
+
+        Returns:
+            The entries that were undone, most recent first
+
+        Raises:
+            KeyError: If the checkpoint does not exist
+            ValueError: If a file was changed outside of the journal since it was edited
+        """
+        if name not in self.checkpoints:
+            msg = f"Unknown checkpoint: {name}. Available checkpoints: {', '.join(self.checkpoints) or 'none'}"
+            raise KeyError(msg)
+
+        target = self.checkpoints[name]
+        undone = self.entries[target:][::-1]
+        self._verify_unchanged(codebase, undone)
+
+        # Collapse consecutive content changes into one final write per file.
+        # Renames are replayed individually since they move the file in the graph.
+        pending: dict[str, Optional[str]] = {}
+        for entry in undone:
+            if entry.op == "rename":
+                self._write(codebase, pending)
+                pending = {}
+                codebase.get_file(entry.new_filepath).update_filepath(entry.filepath)
+                codebase.commit()
+                # Renaming back rewrites the file's own imports again, so read what it now holds
+                self._track(entry.new_filepath, None)
+                self._track(entry.filepath, codebase.get_file(entry.filepath).content)
+                continue
+
+            current = pending[entry.filepath] if entry.filepath in pending else self._current.get(entry.filepath)
+            if content_hash(current) != entry.after_hash:
+                msg = f"Edit journal is out of sync for {entry.filepath}"
+                raise ValueError(msg)
+            pending[entry.filepath] = None if entry.op == "create" else apply_reverse_patch(current or "", entry.reverse_patch)
+
+        self._write(codebase, pending)
+        codebase.commit()
+
+        del self.entries[target:]
+        # Checkpoints created after the target no longer point at valid history
+        self.checkpoints = {k: v for k, v in self.checkpoints.items() if v <= target}
+        return undone
+
+    def _verify_unchanged(self, codebase: Codebase, entries: list[JournalEntry]) -> None:
+        """Ensure the files about to be rolled back still match the journal."""
+        paths = {entry.new_filepath if entry.op == "rename" else entry.filepath for entry in entries}
+        for path in paths:
+            expected = self._current.get(path)
+            if not codebase.has_file(path):
+                actual = None
+            else:
+                actual = codebase.get_file(path).content
+            if content_hash(actual) != content_hash(expected):
+                msg = f"{path} was modified outside of the edit journal and cannot be rolled back safely"
+                raise ValueError(msg)
+
+    def _write(self, codebase: Codebase, contents: dict[str, Optional[str]]) -> None:
+        """Write the rolled back content of each file."""
+        for path, content in contents.items():
+            exists = codebase.has_file(path)
+            if content is None:
+                if exists:
+                    codebase.get_file(path).remove()
+            elif exists:
+                codebase.get_file(path).edit(content)
+            else:
+                codebase.create_file(path, content=content)
+            self._track(path, content)
+
+
+_journals: "weakref.WeakKeyDictionary[Codebase, EditJournal]" = weakref.WeakKeyDictionary()
+
+
+def get_edit_journal(codebase: Codebase) -> EditJournal:
+    """Get the edit journal attached to a codebase, creating it if needed."""
+    journal = _journals.get(codebase)
+    if journal is None:
+        journal = EditJournal()
+        _journals[codebase] = journal
+    return journal
+
+
+def record_edit(codebase: Codebase, filepath: str, before: Optional[str], after: Optional[str]) -> None:
+    """Record a content change in the codebase's edit journal.
+
+    Journaling must never make an edit fail, so errors are logged and swallowed.
+    """
+    try:
+        get_edit_journal(codebase).record(filepath, before, after)
+    except Exception as e:
+        logger.warning(f"Failed to journal edit of {filepath}: {e!s}")
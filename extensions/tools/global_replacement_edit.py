@@ -1,9 +1,17 @@
 """Tool for making regex-based replacements in files."""
 
 import difflib
+import functools
 import logging
 import math
+import multiprocessing
+import os
 import re
+import shutil
+import subprocess
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import ClassVar
 
 from pydantic import Field
@@ -11,10 +19,26 @@ from pydantic import Field
 from codegen.extensions.tools.search_files_by_name import search_files_by_name
 from codegen.sdk.core.codebase import Codebase
 
+from .edit_journal import record_edit
 from .observation import Observation
 
 logger = logging.getLogger(__name__)
 
+# Only diffs of the first few changed files are shown to the agent
+MAX_DIFFS_SHOWN = 5
+
+# Unbounded replacements over at least this many candidate files run in a process pool
+PARALLEL_MIN_FILES = 64
+MAX_WORKERS = 8
+
+PROGRESS_LOG_INTERVAL = 500
+
+# Flags ripgrep can reproduce, re.UNICODE is the default for str patterns
+_RIPGREP_FLAGS = re.IGNORECASE | re.MULTILINE | re.DOTALL | re.UNICODE
+# Syntax both engines accept with different meanings: Rust regex reads these as set
+# operations and nested classes inside a character class, Python as literals
+_RIPGREP_AMBIGUOUS_RE = re.compile(r"&&|--|~~|\[[^\]]*\[")
+
 
 class GlobalReplacementEditObservation(Observation):
     """Response from making regex-based replacements in a file."""
@@ -23,6 +47,18 @@ class GlobalReplacementEditObservation(Observation):
         default=None,
         description="Unified diff showing the changes made. Only the first 5 file's changes are shown.",
     )
+    files_changed: int | None = Field(
+        default=None,
+        description="Number of files with at least one replacement",
+    )
+    replacements: int | None = Field(
+        default=None,
+        description="Total number of replacements",
+    )
+    dry_run: bool = Field(
+        default=False,
+        description="Whether this was a dry run that did not modify any files",
+    )
     message: str | None = Field(
         default=None,
         description="Message describing the result",
@@ -63,6 +99,93 @@ def generate_diff(original: str, modified: str, path: str) -> str:
     return "".join(diff)
 
 
+@functools.lru_cache(maxsize=8)
+def _compile(pattern: str, flags: int) -> re.Pattern:
+    """Compile a regex once per worker process."""
+    return re.compile(pattern, flags)
+
+
+def _substitute_content(args: tuple[str, str, int, str]) -> tuple[str | None, int]:
+    """Run the substitution on the content of a single file.
+
+    This runs in a worker process, so it only takes picklable arguments and only
+    sends the content back for files that actually changed.
+
+    Returns:
+        Tuple of (new_content or None if unchanged, replacement_count)
+    """
+    content, pattern, flags, replacement = args
+    new_content, n = _compile(pattern, flags).subn(replacement, content)
+    if n == 0 or new_content == content:
+        return None, n
+    return new_content, n
+
+
+@functools.cache
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Get the process pool for large replacements, started on first use and then reused.
+
+    Workers are not forked: the agent process runs other threads (the logger, the I/O
+    executor, concurrent tools), and a fork taken while one of them holds a lock can
+    deadlock the worker. Started workers have to import this module, so the pool is
+    kept for the lifetime of the process instead of paying that on every call.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, MAX_WORKERS), mp_context=multiprocessing.get_context(method))
+
+
+def _ripgrep_args(pattern: str, flags: int) -> list[str] | None:
+    """Translate a Python regex and its flags into ripgrep arguments.
+
+    Returns:
+        The arguments, or None if the pattern or its flags cannot be translated faithfully
+    """
+    if flags & ~_RIPGREP_FLAGS or _RIPGREP_AMBIGUOUS_RE.search(pattern):
+        return None
+    # Search hidden and ignored files too, tracked files such as .github/workflows/*.yml
+    # would be skipped otherwise. The candidates are intersected with the codebase's files.
+    # Multiline mode lets matches span lines like they can in Python.
+    cmd = ["rg", "--files-with-matches", "--no-messages", "--hidden", "--no-ignore", "--glob", "!.git", "--multiline"]
+    if flags & re.IGNORECASE:
+        cmd.append("--ignore-case")
+    if flags & re.DOTALL:
+        cmd.append("--multiline-dotall")
+    return [*cmd, "--regexp", pattern, "."]
+
+
+def _find_candidate_files(codebase: Codebase, pattern: str, flags: int) -> set[str] | None:
+    """Find the files that can contain a match using ripgrep.
+
+    ripgrep reads the files from disk, so pending edits of the codebase have to be
+    committed first.
+
+    Returns:
+        Set of repo-relative paths, or None if ripgrep is unavailable or cannot
+        handle the pattern (e.g. Python-only regex syntax or flags), in which case
+        every file has to be checked.
+    """
+    args = _ripgrep_args(pattern, flags)
+    if args is None:
+        logger.info(f"ripgrep cannot reproduce pattern {pattern} with flags {flags!r}, checking all files")
+        return None
+    if shutil.which("rg") is None:
+        return None
+
+    try:
+        result = subprocess.run(args, cwd=codebase.repo_path, capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"ripgrep pre-filter failed, checking all files: {e!s}")
+        return None
+
+    # Exit code 1 means no matches, 2 means an error (e.g. unsupported regex syntax)
+    if result.returncode == 1:
+        return set()
+    if result.returncode != 0:
+        logger.info(f"ripgrep cannot pre-filter pattern {pattern}, checking all files")
+        return None
+    return {line.removeprefix("./") for line in result.stdout.splitlines() if line}
+
+
 def replacement_edit_global(
     codebase: Codebase,
     file_pattern: str,
@@ -70,9 +193,15 @@ def replacement_edit_global(
     replacement: str,
     count: int | None = None,
     flags: re.RegexFlag = re.MULTILINE,
+    dry_run: bool = False,
+    progress_callback: Callable[[int, int], None] | None = None,
 ) -> GlobalReplacementEditObservation:
     """Replace text in a file using regex pattern matching.
 
+    Files are pre-filtered with ripgrep so only files that can match are checked, and
+    unbounded replacements over many files run in a process pool. Both see the
+    content of the codebase, including edits that were not committed yet.
+
     Args:
         codebase: The codebase to operate on
         file_pattern: Glob pattern to match files
@@ -80,6 +209,8 @@ def replacement_edit_global(
         replacement: Replacement text (can include regex groups)
         count: Maximum number of replacements (None for all)
         flags: Regex flags (default: re.MULTILINE)
+        dry_run: If True, only count the replacements and return a sample diff
+        progress_callback: Optional callback called with (files_processed, total_files)
 
     Returns:
         GlobalReplacementEditObservation containing edit results and status
@@ -103,28 +234,86 @@ def replacement_edit_global(
             message="Invalid regex pattern",
         )
 
-    diffs = []
-    for file in search_files_by_name(codebase, file_pattern, page=1, files_per_page=math.inf).files:
-        if count is not None and count <= 0:
-            break
+    files = search_files_by_name(codebase, file_pattern, page=1, files_per_page=math.inf).files
+    # Write pending edits to disk, where ripgrep reads the files
+    codebase.commit()
+    candidates = _find_candidate_files(codebase, pattern, flags)
+    if candidates is not None:
+        files = [file for file in files if file in candidates]
+    logger.info(f"Checking {len(files)} candidate files for matches")
+
+    def report_progress(processed: int) -> None:
+        if progress_callback is not None:
+            progress_callback(processed, len(files))
+        if processed % PROGRESS_LOG_INTERVAL == 0:
+            logger.info(f"Processed {processed}/{len(files)} files")
+
+    # (filepath, original_content, new_content) for every changed file, in file order
+    changes: list[tuple[str, str, str]] = []
+    total_replacements = 0
+
+    def get_content(filepath: str) -> str:
+        try:
+            return codebase.get_file(filepath).content
+        except ValueError:
+            msg = f"File not found: {filepath}"
+            raise FileNotFoundError(msg)
+
+    parallel = count is None and len(files) >= PARALLEL_MIN_FILES
+    if parallel:
+        # Workers get the content from the codebase rather than reading the files themselves
+        contents = [get_content(filepath) for filepath in files]
+        args = [(content, pattern, int(flags), replacement) for content in contents]
+        try:
+            for processed, (filepath, content, (new_content, n)) in enumerate(zip(files, contents, _get_process_pool().map(_substitute_content, args, chunksize=32)), start=1):
+                total_replacements += n
+                if new_content is not None:
+                    changes.append((filepath, content, new_content))
+                report_progress(processed)
+        except BrokenProcessPool as e:
+            logger.warning(f"Replacement worker died, replacing sequentially: {e!s}")
+            _get_process_pool.cache_clear()
+            changes, total_replacements, parallel = [], 0, False
+
+    if not parallel:
+        for processed, filepath in enumerate(files, start=1):
+            if count is not None and count <= 0:
+                break
+            content = get_content(filepath)
+            new_content, n = regex.subn(replacement, content, count=(count or 0))
+            if count is not None:
+                count -= n
+            total_replacements += n
+            if n > 0 and new_content != content:
+                changes.append((filepath, content, new_content))
+            report_progress(processed)
+
+    diff = "\n".join(generate_diff(content, new_content, filepath) for filepath, content, new_content in changes[:MAX_DIFFS_SHOWN])
+    summary = f"{total_replacements} occurrences in {len(changes)} files matching {file_pattern} using regex pattern {pattern}"
+
+    if dry_run:
+        return GlobalReplacementEditObservation(
+            status="success",
+            diff=diff,
+            files_changed=len(changes),
+            replacements=total_replacements,
+            dry_run=True,
+            message=f"Dry run: would replace {summary}",
+        )
+
+    for filepath, content, new_content in changes:
         try:
-            file = codebase.get_file(file)
+            file = codebase.get_file(filepath)
         except ValueError:
-            msg = f"File not found: {file}"
+            msg = f"File not found: {filepath}"
             raise FileNotFoundError(msg)
-        content = file.content
-        new_content, n = regex.subn(replacement, content, count=(count or 0))
-        if count is not None:
-            count -= n
-        if n > 0:
-            file.edit(new_content)
-            if new_content != content:
-                diff = generate_diff(content, new_content, file.filepath)
-                diffs.append(diff)
-    diff = "\n".join(diffs[:5])
+        file.edit(new_content)
+        record_edit(codebase, filepath, content, new_content)
     codebase.commit()
     return GlobalReplacementEditObservation(
         status="success",
         diff=diff,
-        message=f"Successfully replaced text in files matching {file_pattern} using regex pattern {pattern}",
+        files_changed=len(changes),
+        replacements=total_replacements,
+        message=f"Successfully replaced {summary}",
     )
@@ -0,0 +1,290 @@
+"""Local merge engine for "instant apply" style edit snippets.
+
+An edit snippet contains the new code for the regions that change, separated by
+marker comments such as `// ... existing code ...` for the regions that stay the
+same. Each region of new code is placed by anchoring its unchanged context lines
+to lines of the original file. When a region cannot be placed unambiguously,
+`AmbiguousEditError` is raised so the caller can fall back to the Relace API.
+"""
+
+import difflib
+import re
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+# A marker is a comment whose text starts with "...", e.g. "# ... existing imports ..."
+_MARKER_RE = re.compile(r"^\s*(?:#|//|/\*|\{/\*|<!--|--|;)\s*\.\.\.")
+_WORD_RE = re.compile(r"\w+")
+# Lines that close a block, e.g. "}" or ");"
+_CLOSING_RE = re.compile(r"^\s*[)\]}]")
+
+# Similarity thresholds for fuzzy line matching
+MODIFIED_LINE_RATIO = 0.8
+DIFFERENT_LINE_RATIO = 0.5
+
+LineMatch = Literal["same", "modified", "different", "unclear"]
+
+
+class AmbiguousEditError(ValueError):
+    """Raised when an edit snippet cannot be anchored unambiguously."""
+
+
+@dataclass
+class _Segment:
+    """A run of snippet lines between two markers."""
+
+    lines: list[str]
+    has_before: bool  # Whether a marker precedes the segment
+    has_after: bool  # Whether a marker follows the segment
+    head: Optional[tuple[int, int]] = None  # (segment index, original index) of the first anchor
+    tail: Optional[tuple[int, int]] = None  # (segment index, original index) of the last anchor
+
+
+def is_marker(line: str) -> bool:
+    """Check whether a snippet line marks a region of unchanged code."""
+    return bool(_MARKER_RE.match(line))
+
+
+def _normalize(line: str) -> str:
+    return " ".join(line.split())
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def classify_line(new_line: str, old_line: str) -> LineMatch:
+    """Classify how a snippet line relates to an original line.
+
+    Returns:
+        "same" if they only differ in whitespace, "modified" if the snippet line
+        is an edited version of the original one, "different" if they are
+        unrelated, and "unclear" if they are too similar to call either way.
+    """
+    new, old = _normalize(new_line), _normalize(old_line)
+    if new == old:
+        return "same"
+    if not new or not old:
+        return "different"
+
+    ratio = difflib.SequenceMatcher(None, new, old, autojunk=False).ratio()
+    # A modified line keeps its leading identifiers, e.g. `def foo(a):` -> `def foo(a, b):`
+    if ratio >= MODIFIED_LINE_RATIO and _WORD_RE.findall(new)[:2] == _WORD_RE.findall(old)[:2]:
+        return "modified"
+    if ratio < DIFFERENT_LINE_RATIO:
+        return "different"
+    return "unclear"
+
+
+def _split_segments(snippet_lines: list[str]) -> list[_Segment]:
+    segments = []
+    current: list[str] = []
+    has_before = False
+    for line in snippet_lines:
+        if is_marker(line):
+            if any(l.strip() for l in current):
+                segments.append(_Segment(lines=current, has_before=has_before, has_after=True))
+            current = []
+            has_before = True
+        else:
+            current.append(line)
+    if any(l.strip() for l in current):
+        segments.append(_Segment(lines=current, has_before=has_before, has_after=False))
+    return segments
+
+
+def _unique_match(line: str, original: list[str], start: int, end: int) -> Optional[int]:
+    """Find the only original line in [start, end) equal to `line` up to whitespace."""
+    target = _normalize(line)
+    if not target:
+        return None
+    matches = [i for i in range(start, end) if _normalize(original[i]) == target]
+    return matches[0] if len(matches) == 1 else None
+
+
+def _guard_unmarked_boundary(new_block: list[str], old_block: list[str]) -> None:
+    """Refuse to silently drop code at a file boundary the snippet did not mark.
+
+    A snippet that does not start (or end) with a marker replaces everything up to
+    (or from) its first (or last) anchor. Every line of code there has to be kept or
+    edited by the snippet, otherwise the model most likely just forgot the marker.
+    """
+    matcher = difflib.SequenceMatcher(None, [_normalize(l) for l in new_block], [_normalize(l) for l in old_block], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        # Original lines missing from the snippet show up as insertions into it
+        if tag not in ("insert", "replace"):
+            continue
+        for old_line in old_block[j1:j2]:
+            if old_line.strip() and not any(classify_line(new_line, old_line) == "modified" for new_line in new_block[i1:i2]):
+                msg = f"Snippet would remove the unmarked line {old_line.strip()!r} at a file boundary"
+                raise AmbiguousEditError(msg)
+
+
+def _guard_insertion(new_lines: list[str], neighbor: Optional[str]) -> None:
+    """Refuse to guess whether new code next to a marker is inserted or replaces code.
+
+    New lines between an anchor and a marker are inserted next to the anchor. That is
+    only clear if the original block ends there: the neighbouring original line is
+    blank, closes a block or is less indented than the new code. Otherwise the snippet
+    may as well replace it, e.g. a function body written right below its signature.
+    """
+    new_code = [l for l in new_lines if l.strip()]
+    if not new_code or neighbor is None or not neighbor.strip() or _CLOSING_RE.match(neighbor):
+        return
+    if _indent(neighbor) >= _indent(new_code[0]):
+        msg = f"Cannot tell whether {new_code[0].strip()!r} is inserted next to or replaces {neighbor.strip()!r}"
+        raise AmbiguousEditError(msg)
+
+
+def _append_gap(original: list[str]) -> int:
+    """Get the number of blank lines the file puts between its top-level definitions."""
+    for i in range(len(original) - 1, 0, -1):
+        if original[i].strip() and not original[i][0].isspace() and not original[i - 1].strip():
+            gap = 0
+            while gap < i and not original[i - 1 - gap].strip():
+                gap += 1
+            return gap
+    return 1
+
+
+def apply_edit_snippet(initial_code: str, edit_snippet: str) -> str:
+    """Merge an edit snippet into the original code.
+
+    Args:
+        initial_code: The existing code to modify
+        edit_snippet: New code with marker comments for unchanged regions
+
+    Returns:
+        The merged code
+
+    Raises:
+        AmbiguousEditError: If a region of the snippet cannot be placed with confidence
+    """
+    newline = "\r\n" if "\r\n" in initial_code else "\n"
+    original = initial_code.splitlines()
+    segments = _split_segments(edit_snippet.splitlines())
+
+    if not segments:
+        msg = "Edit snippet does not contain any code"
+        raise AmbiguousEditError(msg)
+
+    # A snippet without markers is the complete new file. It may only replace the
+    # file if it keeps or edits every original line, otherwise it is more likely an
+    # excerpt of the file that is missing its markers
+    if len(segments) == 1 and not segments[0].has_before and not segments[0].has_after:
+        _guard_unmarked_boundary(segments[0].lines, original)
+        merged = "\n".join(segments[0].lines)
+        return _finish(merged, initial_code, newline)
+
+    # First pass: anchor the head of every segment, in order
+    cursor = 0
+    for segment in segments:
+        for i, line in enumerate(segment.lines):
+            match = _unique_match(line, original, cursor, len(original))
+            if match is not None:
+                segment.head = (i, match)
+                cursor = match + 1
+                break
+
+    # Second pass: anchor each tail between its head and the next segment's head
+    for k, segment in enumerate(segments):
+        if segment.head is None:
+            continue
+        limit = next((s.head[1] for s in segments[k + 1 :] if s.head is not None), len(original))
+        head_idx, head_pos = segment.head
+        segment.tail = segment.head
+        for j in range(len(segment.lines) - 1, head_idx, -1):
+            match = _unique_match(segment.lines[j], original, head_pos + 1, limit)
+            if match is not None:
+                segment.tail = (j, match)
+                break
+
+    # Place every segment, replacing original[start:end] with the segment lines
+    merged: list[str] = []
+    prev_end = 0
+    for k, segment in enumerate(segments):
+        next_head = next((s.head[1] for s in segments[k + 1 :] if s.head is not None), len(original))
+        start, end = _place_segment(segment, original, prev_end, next_head, is_first=k == 0)
+        merged.extend(original[prev_end:start])
+        lines = segment.lines
+        if start == len(original) and merged and merged[-1].strip():
+            # New code appended to the end of the file: keep it apart like the other definitions
+            lines = list(lines)
+            while lines and not lines[0].strip():
+                lines.pop(0)
+            if lines and not lines[0][0].isspace():
+                merged.extend([""] * _append_gap(original))
+        merged.extend(lines)
+        prev_end = end
+
+    if segments[-1].has_after:
+        merged.extend(original[prev_end:])
+
+    return _finish("\n".join(merged), initial_code, newline)
+
+
+def _place_segment(segment: _Segment, original: list[str], prev_end: int, next_head: int, is_first: bool) -> tuple[int, int]:
+    """Find the [start, end) range of the original code a segment replaces."""
+    if segment.head is None:
+        # New code with nothing to anchor it: only placeable at the end of the file
+        if segment.has_before and not segment.has_after:
+            return len(original), len(original)
+        msg = f"Could not find any unchanged lines to anchor: {segment.lines[0].strip()!r}"
+        raise AmbiguousEditError(msg)
+
+    (head_idx, head_pos), (tail_idx, tail_pos) = segment.head, segment.tail
+    if head_pos < prev_end:
+        msg = f"Snippet regions overlap at line {head_pos + 1}"
+        raise AmbiguousEditError(msg)
+
+    # Extend the start backwards over snippet lines that edit the preceding original lines
+    if segment.has_before or not is_first:
+        start = head_pos
+        # Snippet lines before this index are not matched to original lines
+        unmatched = head_idx
+        for i in range(head_idx - 1, -1, -1):
+            if start - 1 < prev_end:
+                break
+            match = classify_line(segment.lines[i], original[start - 1])
+            if match == "unclear":
+                msg = f"Cannot tell whether {segment.lines[i].strip()!r} replaces {original[start - 1].strip()!r}"
+                raise AmbiguousEditError(msg)
+            if match == "different":
+                break
+            start -= 1
+            unmatched = i
+        _guard_insertion(segment.lines[:unmatched][::-1], original[start - 1] if start > prev_end else None)
+    else:
+        start = 0
+        _guard_unmarked_boundary(segment.lines[:head_idx], original[:head_pos])
+
+    # Extend the end forwards over snippet lines that edit the following original lines
+    if segment.has_after:
+        end = tail_pos + 1
+        # Snippet lines from this index on are not matched to original lines
+        unmatched = tail_idx + 1
+        for i in range(tail_idx + 1, len(segment.lines)):
+            if end >= next_head:
+                break
+            match = classify_line(segment.lines[i], original[end])
+            if match == "unclear":
+                msg = f"Cannot tell whether {segment.lines[i].strip()!r} replaces {original[end].strip()!r}"
+                raise AmbiguousEditError(msg)
+            if match == "different":
+                break
+            end += 1
+            unmatched = i + 1
+        _guard_insertion(segment.lines[unmatched:], original[end] if end < next_head else None)
+    else:
+        end = len(original)
+        _guard_unmarked_boundary(segment.lines[tail_idx + 1 :], original[tail_pos + 1 :])
+
+    return start, end
+
+
+def _finish(merged: str, initial_code: str, newline: str) -> str:
+    if newline != "\n":
+        merged = merged.replace("\n", newline)
+    if initial_code.endswith(("\n", "\r\n")) and not merged.endswith("\n"):
+        merged += newline
+    return merged
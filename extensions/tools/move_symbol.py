@@ -1,11 +1,12 @@
 """Tool for moving symbols between files."""
 
-from typing import ClassVar, Literal
+from typing import ClassVar, Literal, Optional
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 
 from codegen.sdk.core.codebase import Codebase
 
+from .edit_journal import diffstat, record_edit
 from .observation import Observation
 from .view_file import ViewFileObservation, view_file
 
@@ -139,3 +140,131 @@ def move_symbol(
             source_file_info=view_file(codebase, source_file),
             target_file_info=view_file(codebase, target_file),
         )
+
+
+class SymbolMove(BaseModel):
+    """A single symbol move in a batch."""
+
+    source_file: str = Field(..., description="Path to the file containing the symbol")
+    symbol_name: str = Field(..., description="Name of the symbol to move")
+    target_file: str = Field(..., description="Path to the destination file (created if it does not exist)")
+
+
+class MoveSymbolsObservation(Observation):
+    """Response from moving several symbols in one transaction."""
+
+    moved: list[str] = Field(
+        default_factory=list,
+        description="Moves that were applied, as 'symbol: source -> target'",
+    )
+    files_changed: list[str] = Field(
+        default_factory=list,
+        description="Diffstat of every file changed by the moves",
+    )
+
+    str_template: ClassVar[str] = "Moved {moved_count} symbols, changing {files_count} files"
+
+    def _get_details(self) -> dict[str, int]:
+        return {
+            "moved_count": len(self.moved),
+            "files_count": len(self.files_changed),
+        }
+
+    def render(self) -> str:
+        """Render the moves and the diffstat of the changed files.
+
+        A batch that failed partway still lists the moves that were applied.
+        """
+        summary = self.str_template.format(**self._get_details())
+        if self.status == "error":
+            if not self.moved and not self.files_changed:
+                return f"[MOVE SYMBOLS ERROR]: {self.error}"
+            summary = f"[MOVE SYMBOLS ERROR]: {self.error}\n\n{summary}"
+        lines = [summary, "", *self.moved, "", *self.files_changed]
+        return "\n".join(lines)
+
+
+def move_symbols(
+    codebase: Codebase,
+    moves: list[SymbolMove],
+    strategy: Literal["update_all_imports", "add_back_edge"] = "update_all_imports",
+    include_dependencies: bool = True,
+) -> MoveSymbolsObservation:
+    """Move several symbols as one refactoring transaction.
+
+    All moves are validated before any of them is applied. Import rewrites for every
+    move are then computed against the same import graph and written with a single
+    commit, instead of one commit and graph update per symbol.
+
+    Args:
+        codebase: The codebase to operate on
+        moves: The symbols to move
+        strategy: Strategy for handling imports, see `move_symbol`
+        include_dependencies: Whether to move dependencies along with the symbols
+
+    Returns:
+        MoveSymbolsObservation with the applied moves and a diffstat of the changed files
+    """
+    if not moves:
+        return MoveSymbolsObservation(status="error", error="No moves specified")
+
+    # Validate everything up front so a bad entry doesn't leave a half-applied refactor
+    resolved = []
+    errors = []
+    for move in moves:
+        if not codebase.has_file(move.source_file):
+            errors.append(f"Source file not found: {move.source_file}")
+            continue
+        symbol = codebase.get_file(move.source_file).get_symbol(move.symbol_name)
+        if not symbol:
+            errors.append(f"Symbol '{move.symbol_name}' not found in {move.source_file}")
+            continue
+        resolved.append((move, symbol))
+    if errors:
+        return MoveSymbolsObservation(status="error", error="; ".join(errors))
+
+    # Snapshot every file the moves can touch so the result can be summarized and journaled
+    before: dict[str, Optional[str]] = {}
+    for move, symbol in resolved:
+        for path in _affected_files(symbol, move, include_dependencies):
+            if path not in before:
+                before[path] = codebase.get_file(path).content if codebase.has_file(path) else None
+
+    moved = []
+    error = None
+    try:
+        for move, symbol in resolved:
+            if codebase.has_file(move.target_file):
+                target = codebase.get_file(move.target_file)
+            else:
+                target = codebase.create_file(move.target_file, content="")
+            symbol.move_to_file(target, include_dependencies=include_dependencies, strategy=strategy)
+            moved.append(f"{move.symbol_name}: {move.source_file} -> {move.target_file}")
+    except Exception as e:
+        error = f"Failed to move symbol {move.symbol_name}: {e!s}. The moves before it were applied."
+    finally:
+        codebase.commit()
+
+    files_changed = []
+    for path, content in before.items():
+        after = codebase.get_file(path).content if codebase.has_file(path) else None
+        record_edit(codebase, path, content, after)
+        if stat := diffstat(path, content, after):
+            files_changed.append(stat)
+
+    return MoveSymbolsObservation(
+        status="error" if error else "success",
+        error=error,
+        moved=moved,
+        files_changed=files_changed,
+    )
+
+
+def _affected_files(symbol, move: SymbolMove, include_dependencies: bool) -> set[str]:
+    """Get the files a symbol move can modify: both ends and every file using a moved symbol."""
+    paths = {move.source_file, move.target_file}
+    moved_symbols = [symbol, *symbol.dependencies] if include_dependencies else [symbol]
+    for moved_symbol in moved_symbols:
+        for usage in getattr(moved_symbol, "symbol_usages", []):
+            paths.add(usage.file.filepath)
+    return paths
@@ -1,15 +1,45 @@
 """Base class for tool observations/responses."""
 
 import json
+from contextvars import ContextVar
 from typing import Any, ClassVar, Optional
 
 from langchain_core.messages import ToolMessage
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
+from codegen.sdk.ai.utils import count_tokens
 from codegen.shared.logging.get_logger import get_logger
 
 logger = get_logger(__name__)
 
+# Rendered output longer than this many characters per token of budget is not worth counting
+MAX_CHARS_PER_TOKEN = 8
+# (max list items, max string length) limits tried in order when an observation is too long
+TRUNCATION_LIMITS = [(100, 4000), (50, 2000), (20, 1000), (10, 400), (5, 200)]
+
+# Status of the observation last rendered in the current context. Most tools return
+# rendered strings, this is how their tool metrics tell failed calls from successful ones.
+rendered_status: ContextVar[Optional[str]] = ContextVar("rendered_status", default=None)
+
+
+def _shrink(value: Any, max_items: int, max_chars: int) -> Any:
+    """Shrink a JSON-like value while keeping its structure.
+
+    Lists keep their first `max_items` items followed by a note with the number of
+    dropped items, and long strings keep a prefix followed by a note with the number
+    of dropped characters.
+    """
+    if isinstance(value, dict):
+        return {k: _shrink(v, max_items, max_chars) for k, v in value.items()}
+    if isinstance(value, list):
+        items = [_shrink(v, max_items, max_chars) for v in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"... {len(value) - max_items} more items")
+        return items
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + f"... [{len(value) - max_chars} more characters]"
+    return value
+
 
 class Observation(BaseModel):
     """Base class for all tool observations.
@@ -30,6 +60,11 @@ class Observation(BaseModel):
     # Class variable to store a template for string representation
     str_template: ClassVar[str] = "{status}: {details}"
 
+    # Full JSON and rendered content per token budget. The JSON is the fingerprint the
+    # memo is checked against, since nested fields can change in place and `model_copy`
+    # shares private attributes between copies.
+    _rendered: dict[int, tuple[str, str]] = PrivateAttr(default_factory=dict)
+
     def _get_details(self) -> dict[str, Any]:
         """Get the details to include in string representation.
 
@@ -54,12 +89,37 @@ class Observation(BaseModel):
         This is used for string representation and as the content field
         in the ToolMessage. Subclasses can override this to customize
         their string output format.
+
+        Output over `max_tokens` is truncated structurally: long lists keep their
+        first items and long strings their prefix, so the result is still valid JSON.
+        Token counting and truncation are skipped while the JSON of the observation
+        is the same as when it was last rendered.
         """
-        rendered = json.dumps(self.model_dump(), indent=2)
-        if len(rendered) > (max_tokens * 3):
-            logger.error(f"Observation is too long to render: {len(rendered) * 3} tokens")
-            return rendered[:max_tokens] + "\n\n...truncated...\n\n"
-        return rendered
+        rendered = self.model_dump_json(indent=2)
+        cached = self._rendered.get(max_tokens)
+        if cached is None or cached[0] != rendered:
+            cached = (rendered, self._render_within(rendered, max_tokens))
+            self._rendered[max_tokens] = cached
+        return cached[1]
+
+    def _render_within(self, rendered: str, max_tokens: int) -> str:
+        # A token is at least one character, so short output always fits
+        if len(rendered) <= max_tokens:
+            return rendered
+        if len(rendered) <= max_tokens * MAX_CHARS_PER_TOKEN:
+            tokens = count_tokens(rendered)
+            if tokens <= max_tokens:
+                return rendered
+            logger.warning(f"Observation is too long to render: {tokens} tokens, truncating to {max_tokens}")
+        else:
+            logger.warning(f"Observation is too long to render: {len(rendered)} characters, truncating to {max_tokens} tokens")
+
+        data = self.model_dump(mode="json")
+        for max_items, max_chars in TRUNCATION_LIMITS:
+            truncated = json.dumps(_shrink(data, max_items, max_chars), indent=2, ensure_ascii=False)
+            if len(truncated) <= max_tokens or count_tokens(truncated) <= max_tokens:
+                return truncated
+        return truncated[:max_tokens] + "\n\n...truncated...\n\n"
 
     def render(self, tool_call_id: Optional[str] = None) -> ToolMessage | str:
         """Render the observation as a ToolMessage or string.
@@ -72,6 +132,7 @@ class Observation(BaseModel):
             ToolMessage or str containing the observation content and metadata.
             For error cases, includes error information in artifacts.
         """
+        rendered_status.set(self.status)
         if tool_call_id is None:
             return self.render_as_string()
 
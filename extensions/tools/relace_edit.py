@@ -1,21 +1,33 @@
 """Tool for making edits to files using the Relace Instant Apply API."""
 
 import difflib
+import functools
 import os
 from typing import TYPE_CHECKING, ClassVar
 
 import requests
 from langchain_core.messages import ToolMessage
 from pydantic import Field
+from requests.adapters import HTTPAdapter
 
 from codegen.sdk.core.codebase import Codebase
+from codegen.shared.logging.get_logger import get_logger
 
+from .edit_journal import record_edit
+from .instant_apply import AmbiguousEditError, apply_edit_snippet
 from .observation import Observation
 from .view_file import add_line_numbers
 
 if TYPE_CHECKING:
     from codegen.extensions.tools.tool_output_types import RelaceEditArtifacts
 
+logger = get_logger(__name__)
+
+RELACE_API_URL = "https://codegen-instantapply.endpoint.relace.run/v1/code/apply"
+# (connect, read) timeouts in seconds
+RELACE_TIMEOUT = (5, 120)
+RELACE_POOL_SIZE = 8
+
 
 class RelaceEditObservation(Observation):
     """Response from making edits to a file using Relace Instant Apply API."""
@@ -106,6 +118,15 @@ def get_relace_api_key() -> str:
     return api_key
 
 
+@functools.cache
+def _get_session() -> requests.Session:
+    """Get a shared keep-alive session for Relace API requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=RELACE_POOL_SIZE)
+    session.mount("https://", adapter)
+    return session
+
+
 def apply_relace_edit(api_key: str, initial_code: str, edit_snippet: str, stream: bool = False) -> str:
     """Apply an edit using the Relace Instant Apply API.
 
@@ -121,13 +142,12 @@ def apply_relace_edit(api_key: str, initial_code: str, edit_snippet: str, stream
     Raises:
         Exception: If the API request fails
     """
-    url = "https://codegen-instantapply.endpoint.relace.run/v1/code/apply"
     headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
 
     data = {"initialCode": initial_code, "editSnippet": edit_snippet, "stream": stream}
 
     try:
-        response = requests.post(url, headers=headers, json=data)
+        response = _get_session().post(RELACE_API_URL, headers=headers, json=data, timeout=RELACE_TIMEOUT)
         response.raise_for_status()
         return response.json()["mergedCode"]
     except Exception as e:
@@ -135,14 +155,18 @@ def apply_relace_edit(api_key: str, initial_code: str, edit_snippet: str, stream
         raise Exception(msg)
 
 
-def relace_edit(codebase: Codebase, filepath: str, edit_snippet: str, api_key: str | None = None) -> RelaceEditObservation:
+def relace_edit(codebase: Codebase, filepath: str, edit_snippet: str, api_key: str | None = None, use_local: bool = True) -> RelaceEditObservation:
     """Edit a file using the Relace Instant Apply API.
 
+    The edit snippet is first merged locally. The Relace API is only called when
+    the local merge cannot anchor the snippet unambiguously.
+
     Args:
         codebase: Codebase object
         filepath: Path to the file to edit
         edit_snippet: The edit snippet containing the modifications
         api_key: Optional Relace API key. If not provided, will be retrieved from environment variables.
+        use_local: Whether to try the local merge engine before calling the API
 
     Returns:
         RelaceEditObservation with the results
@@ -160,37 +184,45 @@ def relace_edit(codebase: Codebase, filepath: str, edit_snippet: str, api_key: s
 
     # Get the original content
     original_content = file.content
-    original_lines = original_content.split("\n")
 
-    # Get API key if not provided
-    if api_key is None:
+    merged_code = None
+    if use_local:
+        try:
+            merged_code = apply_edit_snippet(original_content, edit_snippet)
+        except AmbiguousEditError as e:
+            logger.info(f"Local merge of {filepath} is ambiguous, falling back to Relace API: {e!s}")
+
+    if merged_code is None:
+        # Get API key if not provided
+        if api_key is None:
+            try:
+                api_key = get_relace_api_key()
+            except ValueError as e:
+                return RelaceEditObservation(
+                    status="error",
+                    error=str(e),
+                    filepath=filepath,
+                )
+
+        # Apply the edit using Relace API
         try:
-            api_key = get_relace_api_key()
-        except ValueError as e:
+            merged_code = apply_relace_edit(api_key, original_content, edit_snippet)
+            if original_content.endswith("\n") and not merged_code.endswith("\n"):
+                merged_code += "\n"
+        except Exception as e:
             return RelaceEditObservation(
                 status="error",
                 error=str(e),
                 filepath=filepath,
             )
 
-    # Apply the edit using Relace API
-    try:
-        merged_code = apply_relace_edit(api_key, original_content, edit_snippet)
-        if original_content.endswith("\n") and not merged_code.endswith("\n"):
-            merged_code += "\n"
-    except Exception as e:
-        return RelaceEditObservation(
-            status="error",
-            error=str(e),
-            filepath=filepath,
-        )
-
     # Generate diff
     diff = generate_diff(original_content, merged_code)
 
     # Apply the edit to the file
     file.edit(merged_code)
     codebase.commit()
+    record_edit(codebase, filepath, original_content, merged_code)
 
     return RelaceEditObservation(
         status="success",
@@ -2,10 +2,11 @@
 
 from typing import ClassVar
 
-from pydantic import Field
+from pydantic import BaseModel, Field
 
 from codegen.sdk.core.codebase import Codebase
 
+from .edit_journal import diffstat, get_edit_journal
 from .observation import Observation
 from .view_file import ViewFileObservation, view_file
 
@@ -70,8 +71,10 @@ def rename_file(codebase: Codebase, filepath: str, new_filepath: str) -> RenameF
         )
 
     try:
+        before = file.content
         file.update_filepath(new_filepath)
         codebase.commit()
+        get_edit_journal(codebase).record_rename(filepath, new_filepath, before, codebase.get_file(new_filepath).content)
 
         return RenameFileObservation(
             status="success",
@@ -93,3 +96,116 @@ def rename_file(codebase: Codebase, filepath: str, new_filepath: str) -> RenameF
                 line_count=0,
             ),
         )
+
+
+class FileRename(BaseModel):
+    """A single file rename in a batch."""
+
+    filepath: str = Field(..., description="Current path of the file relative to workspace root")
+    new_filepath: str = Field(..., description="New path for the file relative to workspace root")
+
+
+class RenameFilesObservation(Observation):
+    """Response from renaming several files in one transaction."""
+
+    renamed: list[str] = Field(
+        default_factory=list,
+        description="Renames that were applied, as 'old -> new'",
+    )
+    files_changed: list[str] = Field(
+        default_factory=list,
+        description="Diffstat of every file whose imports were updated, renamed files included",
+    )
+
+    str_template: ClassVar[str] = "Renamed {renamed_count} files, updating imports in {files_count} files"
+
+    def _get_details(self) -> dict[str, int]:
+        return {
+            "renamed_count": len(self.renamed),
+            "files_count": len(self.files_changed),
+        }
+
+    def render(self) -> str:
+        """Render the renames and the diffstat of the updated files.
+
+        A batch that failed partway still lists the renames that were applied.
+        """
+        summary = self.str_template.format(**self._get_details())
+        if self.status == "error":
+            if not self.renamed and not self.files_changed:
+                return f"[RENAME FILES ERROR]: {self.error}"
+            summary = f"[RENAME FILES ERROR]: {self.error}\n\n{summary}"
+        lines = [summary, "", *self.renamed, "", *self.files_changed]
+        return "\n".join(lines)
+
+
+def rename_files(codebase: Codebase, renames: list[FileRename]) -> RenameFilesObservation:
+    """Rename several files and update all imports to them with a single commit.
+
+    All renames are validated before any of them is applied, and the import graph is
+    only updated once after every file has been moved.
+
+    Args:
+        codebase: The codebase to operate on
+        renames: The files to rename
+
+    Returns:
+        RenameFilesObservation with the applied renames and a diffstat of the updated importers
+    """
+    if not renames:
+        return RenameFilesObservation(status="error", error="No renames specified")
+
+    errors = []
+    sources = [rename.filepath for rename in renames]
+    destinations = [rename.new_filepath for rename in renames]
+    for rename in renames:
+        if not codebase.has_file(rename.filepath):
+            errors.append(f"File not found: {rename.filepath}")
+        if codebase.has_file(rename.new_filepath):
+            errors.append(f"Destination file already exists: {rename.new_filepath}")
+    if len(set(sources)) != len(sources) or len(set(destinations)) != len(destinations):
+        errors.append("Each file may only be renamed once and to a distinct destination")
+    if errors:
+        return RenameFilesObservation(status="error", error="; ".join(errors))
+
+    # Snapshot the renamed files and their importers so the import updates can be
+    # summarized. The renamed files are added once their new path is known.
+    files = [codebase.get_file(rename.filepath) for rename in renames]
+    contents = {rename.filepath: file.content for rename, file in zip(renames, files)}
+    before: dict[str, str] = {}
+    for file in files:
+        for imp in file.inbound_imports:
+            path = imp.file.filepath
+            if path not in contents and path not in before:
+                before[path] = imp.file.content
+
+    renamed = []
+    error = None
+    try:
+        for rename, file in zip(renames, files):
+            file.update_filepath(rename.new_filepath)
+            renamed.append(f"{rename.filepath} -> {rename.new_filepath}")
+    except Exception as e:
+        error = f"Failed to rename {rename.filepath}: {e!s}. The renames before it were applied."
+    finally:
+        codebase.commit()
+
+    # Import updates in other files are undone by renaming back, see EditJournal.record_rename
+    journal = get_edit_journal(codebase)
+    for rename in renames[: len(renamed)]:
+        journal.record_rename(rename.filepath, rename.new_filepath, contents[rename.filepath], codebase.get_file(rename.new_filepath).content)
+    for i, rename in enumerate(renames):
+        before[rename.new_filepath if i < len(renamed) else rename.filepath] = contents[rename.filepath]
+
+    files_changed = []
+    for path, content in before.items():
+        after = codebase.get_file(path).content if codebase.has_file(path) else None
+        if stat := diffstat(path, content, after):
+            files_changed.append(stat)
+
+    return RenameFilesObservation(
+        status="error" if error else "success",
+        error=error,
+        renamed=renamed,
+        files_changed=files_changed,
+    )
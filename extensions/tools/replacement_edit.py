@@ -8,6 +8,7 @@ from pydantic import Field
 
 from codegen.sdk.core.codebase import Codebase
 
+from .edit_journal import record_edit
 from .observation import Observation
 from .view_file import add_line_numbers
 
@@ -177,6 +178,7 @@ def replacement_edit(
     # Apply the edit
     file.edit(new_content)
     codebase.commit()
+    record_edit(codebase, filepath, original_content, new_content)
 
     return ReplacementEditObservation(
         status="success",
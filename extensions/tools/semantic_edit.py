@@ -2,6 +2,8 @@
 
 import difflib
 import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, ClassVar, Optional
 
 from langchain_core.messages import ToolMessage
@@ -12,13 +14,27 @@ from pydantic import Field
 from codegen.extensions.langchain.llm import LLM
 from codegen.sdk.core.codebase import Codebase
 
+from .edit_journal import record_edit
+from .instant_apply import _WORD_RE, classify_line, is_marker
 from .observation import Observation
-from .semantic_edit_prompts import _HUMAN_PROMPT_DRAFT_EDITOR, COMMANDER_SYSTEM_PROMPT
+from .semantic_edit_prompts import _HUMAN_PROMPT_DRAFT_EDITOR, COMMANDER_SYSTEM_PROMPT, WINDOWED_EDIT_PREFIX
 from .view_file import add_line_numbers
 
 if TYPE_CHECKING:
     from .tool_output_types import SemanticEditArtifacts
 
+# Files longer than this are edited in structural windows of at most this many lines
+MAX_LINES = 300
+# Maximum number of windows sent to the LLM concurrently
+MAX_PARALLEL_WINDOWS = 4
+# Lines of the neighbouring windows sent along with each window, they must come back unchanged
+CONTEXT_LINES = 3
+
+# Top-level lines that belong to the definition that follows them
+_PREFIX_LINE_RE = re.compile(r"^(@|#|//|/\*|\*)")
+# Top-level lines that close the preceding definition
+_CLOSING_LINE_RE = re.compile(r"^[)\]}]")
+
 
 class SemanticEditObservation(Observation):
     """Response from making semantic edits to a file."""
@@ -203,6 +219,140 @@ def extract_file_window(file_content: str, start: int = 1, end: int = -1) -> tup
     return window_content, start_idx, end_idx
 
 
+def split_structural_windows(lines: list[str], max_lines: int = MAX_LINES) -> list[tuple[int, int]]:
+    """Split a file into windows of whole top-level definitions.
+
+    A top-level block starts at an unindented line. Decorators and comments directly
+    above a definition stay with it, and blank lines stay with the block before them.
+    Consecutive blocks are packed into windows of at most `max_lines` lines; a single
+    block longer than that gets a window of its own.
+
+    Args:
+        lines: Lines of the file
+        max_lines: Maximum number of lines per window
+
+    Returns:
+        List of (start_idx, end_idx) tuples (0-indexed, inclusive) covering every line
+    """
+    block_starts = [0]
+    for i in range(1, len(lines)):
+        line = lines[i]
+        if not line.strip() or line[0].isspace() or _CLOSING_LINE_RE.match(line):
+            continue
+        if _PREFIX_LINE_RE.match(lines[i - 1]):
+            continue
+        block_starts.append(i)
+
+    windows = []
+    window_start = 0
+    for block_start, block_end in zip(block_starts, block_starts[1:] + [len(lines)]):
+        if block_start > window_start and block_end - window_start > max_lines:
+            windows.append((window_start, block_start - 1))
+            window_start = block_start
+    windows.append((window_start, len(lines) - 1))
+    return windows
+
+
+def _touched_windows(edit_content: str, original_lines: list[str], windows: list[tuple[int, int]]) -> list[bool]:
+    """Find the windows an edit refers to through the existing lines it keeps or modifies.
+
+    An edit that does not refer to any existing line, e.g. one made of new code
+    only, touches the last window only, where the new code is appended. Sending it
+    to every window would let each of them add the code.
+    """
+    # Index the original lines by their text and by their leading identifiers, which
+    # a modified line keeps, so only a few candidates have to be compared
+    by_text = defaultdict(list)
+    by_words = defaultdict(list)
+    for i, line in enumerate(original_lines):
+        by_text[" ".join(line.split())].append(i)
+        by_words[tuple(_WORD_RE.findall(line)[:2])].append(i)
+
+    touched_lines = set()
+    for line in edit_content.split("\n"):
+        # Lines without identifiers, like closing brackets, do not tell where an edit goes
+        if is_marker(line) or not _WORD_RE.search(line):
+            continue
+        if matches := by_text.get(" ".join(line.split())):
+            touched_lines.update(matches)
+            continue
+        candidates = by_words.get(tuple(_WORD_RE.findall(line)[:2]), [])
+        touched_lines.update(i for i in candidates if classify_line(line, original_lines[i]) == "modified")
+
+    touched = [any(start_idx <= i <= end_idx for i in touched_lines) for start_idx, end_idx in windows]
+    if not any(touched):
+        touched[-1] = True
+    return touched
+
+
+def _edit_window(original_lines: list[str], start_idx: int, end_idx: int, edit_content: str) -> list[str]:
+    """Edit a single window of a large file, keeping its surrounding blank lines.
+
+    The window is sent with up to `CONTEXT_LINES` lines of the neighbouring windows
+    around it. The LLM has to return those unchanged, which shows that it kept to the
+    window, and they are stripped from the result.
+
+    Raises:
+        ValueError: If the LLM response is invalid or changes the context lines
+    """
+    context_start = max(0, start_idx - CONTEXT_LINES)
+    context_end = min(len(original_lines) - 1, end_idx + CONTEXT_LINES)
+    before, after = start_idx - context_start, context_end - end_idx
+    section_lines = original_lines[context_start : context_end + 1]
+    section = "\n".join(section_lines)
+
+    prefix = WINDOWED_EDIT_PREFIX.format(before=before, after=after)
+    edited_lines = _extract_code_block(get_llm_edit(section, prefix + edit_content)).split("\n")
+
+    # Blank lines between definitions are often dropped from code blocks
+    leading = len(section_lines) - len(section.lstrip("\n").split("\n"))
+    trailing = len(section_lines) - len(section.rstrip("\n").split("\n"))
+    while edited_lines and not edited_lines[0].strip():
+        edited_lines.pop(0)
+    while edited_lines and not edited_lines[-1].strip():
+        edited_lines.pop()
+    edited_lines = [""] * leading + edited_lines + [""] * trailing
+
+    try:
+        if len(edited_lines) < before + after:
+            msg = "Edit dropped context lines"
+            raise ValueError(msg)
+        _validate_edit_boundaries(section_lines, edited_lines, before, len(section_lines) - after - 1)
+    except ValueError:
+        msg = f"Edit of lines {start_idx + 1}-{end_idx + 1} changed the lines around them"
+        raise ValueError(msg)
+    return edited_lines[before : len(edited_lines) - after]
+
+
+def edit_windows_in_parallel(original_content: str, edit_content: str, max_lines: int = MAX_LINES) -> str:
+    """Apply an edit to a large file by editing its structural windows concurrently.
+
+    Args:
+        original_content: Content of the file
+        edit_content: Edit specification/instructions for the whole file
+        max_lines: Maximum number of lines per window
+
+    Returns:
+        The edited file content
+
+    Raises:
+        ValueError: If the LLM response for a window is invalid or edits outside of it
+    """
+    original_lines = original_content.split("\n")
+    windows = split_structural_windows(original_lines, max_lines)
+    # Windows the edit does not refer to are kept as they are, without asking the LLM
+    touched = [window for window, is_touched in zip(windows, _touched_windows(edit_content, original_lines, windows)) if is_touched]
+
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_WINDOWS, len(touched))) as executor:
+        edited = dict(zip(touched, executor.map(lambda window: _edit_window(original_lines, *window, edit_content), touched)))
+
+    new_lines = []
+    for start_idx, end_idx in windows:
+        new_lines.extend(edited.get((start_idx, end_idx), original_lines[start_idx : end_idx + 1]))
+
+    return "\n".join(new_lines)
+
+
 def apply_semantic_edit(codebase: Codebase, filepath: str, edited_content: str, start: int = 1, end: int = -1) -> tuple[str, str]:
     """Apply a semantic edit to a section of content.
 
@@ -226,6 +376,7 @@ def apply_semantic_edit(codebase: Codebase, filepath: str, edited_content: str,
         diff = generate_diff(original_content, new_content)
         file.edit(new_content)
         codebase.commit()
+        record_edit(codebase, filepath, original_content, new_content)
         return new_content, diff
 
     # Split content into lines
@@ -253,6 +404,7 @@ def apply_semantic_edit(codebase: Codebase, filepath: str, edited_content: str,
     codebase.commit()
     with open(file.path, "w") as f:
         f.write(new_content)
+    record_edit(codebase, filepath, original_content, new_content)
 
     # Generate diff from the original section to the edited section
     original_section, _, _ = extract_file_window(original_content, start, end)
@@ -273,18 +425,26 @@ def semantic_edit(codebase: Codebase, filepath: str, edit_content: str, start: i
     original_content = file.content
     original_lines = original_content.split("\n")
 
-    # Check if file is too large for full edit
-    MAX_LINES = 300
+    # Edit large files window by window
     if len(original_lines) > MAX_LINES and start == 1 and end == -1:
+        try:
+            new_content, diff = apply_semantic_edit(codebase, filepath, edit_windows_in_parallel(original_content, edit_content))
+        except ValueError as e:
+            return SemanticEditObservation(
+                status="error",
+                error=(
+                    f"Failed to edit {filepath} ({len(original_lines)} lines) in sections: {e!s}. "
+                    "Please specify a line range using start and end parameters."
+                ),
+                filepath=filepath,
+                line_count=len(original_lines),
+            )
+
         return SemanticEditObservation(
-            status="error",
-            error=(
-                f"File is {len(original_lines)} lines long. For files longer than {MAX_LINES} lines, "
-                "please specify a line range using start and end parameters. "
-                "You may need to make multiple targeted edits."
-            ),
+            status="success",
             filepath=filepath,
-            line_count=len(original_lines),
+            diff=diff,
+            new_content=add_line_numbers(new_content),
         )
 
     # Extract the window of content to edit
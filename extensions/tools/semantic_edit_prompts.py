@@ -347,3 +347,10 @@ OUTPUT REQUIREMENTS:
 5. Keep actual code comments that are part of the functionality.
 6. Understand the intent behind the edits and apply them correctly.
 """
+
+
+WINDOWED_EDIT_PREFIX = """The section above is only one part of a larger file. The instructions below describe an edit to the whole file.
+Apply only the parts of the edit that belong in this section. If none of the edit applies to this section, return the section unchanged.
+The first {before} and the last {after} lines of the section are context from the rest of the file. Return them exactly as they are.
+
+"""
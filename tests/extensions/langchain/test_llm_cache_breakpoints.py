@@ -0,0 +1,101 @@
+"""Placement of Anthropic prompt cache breakpoints by `add_cache_breakpoints` and `LLM.bind_tools`."""
+
+from typing import Any, Optional
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from pydantic import PrivateAttr
+
+from codegen.extensions.langchain.llm import CACHE_CONTROL, LLM, add_cache_breakpoints
+
+# Anthropic rejects requests with more breakpoints than this
+MAX_BREAKPOINTS = 4
+
+
+class RecordingChatModel(BaseChatModel):
+    """Chat model that records its requests and always gives the same answer."""
+
+    _requests: list[tuple[list[BaseMessage], dict[str, Any]]] = PrivateAttr(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self._requests.append((messages, kwargs))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Done"))])
+
+
+@tool
+def view_file(filepath: str) -> str:
+    """View a file."""
+    return filepath
+
+
+@tool
+def search(query: str) -> str:
+    """Search the codebase."""
+    return query
+
+
+def _breakpoints(message: BaseMessage) -> int:
+    if isinstance(message.content, str):
+        return 0
+    return sum(1 for block in message.content if isinstance(block, dict) and block.get("cache_control") == CACHE_CONTROL)
+
+
+def _history() -> list[BaseMessage]:
+    return [
+        SystemMessage(content="You are a coding agent."),
+        HumanMessage(content="Look at main.py"),
+        AIMessage(content="", tool_calls=[{"name": "view_file", "args": {"filepath": "main.py"}, "id": "call_1"}]),
+        ToolMessage(content="print('hello')", tool_call_id="call_1"),
+    ]
+
+
+@pytest.fixture
+def llm(monkeypatch: pytest.MonkeyPatch) -> LLM:
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    monkeypatch.delenv("CODEGEN_LLM_CACHE_MODE", raising=False)
+    return LLM(model_provider="anthropic", model_name="claude-3-5-sonnet-latest")
+
+
+def test_add_cache_breakpoints_marks_system_prompt_and_last_message():
+    messages = _history()
+    result = add_cache_breakpoints(messages)
+
+    assert [_breakpoints(message) for message in result] == [1, 0, 0, 1]
+    # The history itself is not modified
+    assert all(isinstance(message.content, str) for message in messages)
+
+
+def test_add_cache_breakpoints_skips_last_ai_message():
+    messages = [*_history(), AIMessage(content="main.py prints hello")]
+    result = add_cache_breakpoints(messages)
+
+    assert [_breakpoints(message) for message in result] == [1, 0, 0, 0, 0]
+
+
+def test_bind_tools_marks_last_tool_schema(llm: LLM):
+    tools = llm.bind_tools([view_file, search]).kwargs["tools"]
+
+    assert [tool_schema.get("cache_control") for tool_schema in tools] == [None, CACHE_CONTROL]
+
+
+def test_request_breakpoints(llm: LLM):
+    recorder = RecordingChatModel()
+    bound = llm.bind_tools([view_file, search])
+    llm._model = recorder
+
+    bound.invoke(_history())
+
+    [(messages, kwargs)] = recorder._requests
+    message_breakpoints = [_breakpoints(message) for message in messages]
+    tool_breakpoints = [1 if "cache_control" in tool_schema else 0 for tool_schema in kwargs["tools"]]
+    assert isinstance(messages[0], SystemMessage) and message_breakpoints[0] == 1
+    assert isinstance(messages[-1], ToolMessage) and message_breakpoints[-1] == 1
+    assert tool_breakpoints == [0, 1]
+    assert sum(message_breakpoints) + sum(tool_breakpoints) <= MAX_BREAKPOINTS
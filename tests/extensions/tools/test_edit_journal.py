@@ -0,0 +1,122 @@
+"""Checkpoints and rollback of the edit journal."""
+
+import pytest
+
+from codegen.extensions.tools.edit_journal import EditJournal, apply_reverse_patch, make_reverse_patch
+
+
+class FakeFile:
+    def __init__(self, codebase: "FakeCodebase", filepath: str) -> None:
+        self.codebase = codebase
+        self.filepath = filepath
+
+    @property
+    def content(self) -> str:
+        return self.codebase.files[self.filepath]
+
+    def edit(self, content: str) -> None:
+        self.codebase.files[self.filepath] = content
+
+    def remove(self) -> None:
+        del self.codebase.files[self.filepath]
+
+    def update_filepath(self, new_filepath: str) -> None:
+        self.codebase.files[new_filepath] = self.codebase.files.pop(self.filepath)
+
+
+class FakeCodebase:
+    """The part of the Codebase API the journal uses, backed by a dict of file contents."""
+
+    def __init__(self, files: dict[str, str]) -> None:
+        self.files = dict(files)
+
+    def has_file(self, filepath: str) -> bool:
+        return filepath in self.files
+
+    def get_file(self, filepath: str) -> FakeFile:
+        return FakeFile(self, filepath)
+
+    def create_file(self, filepath: str, content: str) -> FakeFile:
+        self.files[filepath] = content
+        return FakeFile(self, filepath)
+
+    def commit(self) -> None:
+        pass
+
+
+def _edit(codebase: FakeCodebase, journal: EditJournal, filepath: str, content: str) -> None:
+    before = codebase.files.get(filepath)
+    codebase.files[filepath] = content
+    journal.record(filepath, before, content)
+
+
+def test_reverse_patch_round_trip():
+    before = "a\nb\nc\nd\n"
+    after = "a\nB\nc\nd\ne\n"
+
+    assert apply_reverse_patch(after, make_reverse_patch(before, after)) == before
+
+
+def test_rollback_applies_reverse_patches():
+    codebase = FakeCodebase({"main.py": "x = 1\ny = 2\n"})
+    journal = EditJournal()
+    journal.checkpoint("start")
+
+    _edit(codebase, journal, "main.py", "x = 1\ny = 3\n")
+    _edit(codebase, journal, "main.py", "x = 0\ny = 3\nz = 4\n")
+    _edit(codebase, journal, "new.py", "print('new')\n")
+    undone = journal.rollback(codebase, "start")
+
+    assert codebase.files == {"main.py": "x = 1\ny = 2\n"}
+    assert [entry.op for entry in undone] == ["create", "edit", "edit"]
+    assert len(journal) == 0
+
+
+def test_rollback_undoes_deletes_and_renames():
+    codebase = FakeCodebase({"old.py": "a = 1\n", "gone.py": "b = 2\n"})
+    journal = EditJournal()
+    journal.checkpoint("start")
+
+    codebase.get_file("old.py").update_filepath("new.py")
+    journal.record_rename("old.py", "new.py", "a = 1\n", codebase.files["new.py"])
+    journal.record("gone.py", codebase.files.pop("gone.py"), None)
+    journal.rollback(codebase, "start")
+
+    assert codebase.files == {"old.py": "a = 1\n", "gone.py": "b = 2\n"}
+
+
+def test_nested_checkpoints():
+    codebase = FakeCodebase({"main.py": "v = 0\n"})
+    journal = EditJournal()
+    journal.checkpoint("outer")
+    _edit(codebase, journal, "main.py", "v = 1\n")
+    journal.checkpoint("inner")
+    _edit(codebase, journal, "main.py", "v = 2\n")
+
+    journal.rollback(codebase, "inner")
+    assert codebase.files["main.py"] == "v = 1\n"
+    assert set(journal.checkpoints) == {"outer", "inner"}
+
+    journal.rollback(codebase, "outer")
+    assert codebase.files["main.py"] == "v = 0\n"
+    # Checkpoints after the target no longer point at valid history
+    assert set(journal.checkpoints) == {"outer"}
+
+
+def test_rollback_refuses_files_changed_outside_the_journal():
+    codebase = FakeCodebase({"main.py": "v = 0\n"})
+    journal = EditJournal()
+    journal.checkpoint("start")
+    _edit(codebase, journal, "main.py", "v = 1\n")
+    # E.g. a bash command edited the file
+    codebase.files["main.py"] = "v = 42\n"
+
+    with pytest.raises(ValueError, match="modified outside of the edit journal"):
+        journal.rollback(codebase, "start")
+    assert codebase.files["main.py"] == "v = 42\n"
+    assert len(journal) == 1
+
+
+def test_rollback_to_unknown_checkpoint():
+    with pytest.raises(KeyError):
+        EditJournal().rollback(FakeCodebase({}), "missing")
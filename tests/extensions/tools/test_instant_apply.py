@@ -0,0 +1,104 @@
+"""Merging of edit snippets by the local instant apply engine."""
+
+import pytest
+
+from codegen.extensions.tools.instant_apply import AmbiguousEditError, apply_edit_snippet
+
+ORIGINAL = """import os
+import sys
+
+
+def foo():
+    x = 1
+    return x
+
+
+def bar():
+    return 2
+"""
+
+
+def test_body_replacement_with_context():
+    snippet = """# ... existing code ...
+def foo():
+    return 1
+
+
+def bar():
+# ... existing code ...
+"""
+    assert apply_edit_snippet(ORIGINAL, snippet) == ORIGINAL.replace("    x = 1\n    return x\n", "    return 1\n")
+
+
+def test_modified_line():
+    snippet = """# ... existing code ...
+def foo(a):
+    x = 1
+# ... existing code ...
+"""
+    assert apply_edit_snippet(ORIGINAL, snippet) == ORIGINAL.replace("def foo():", "def foo(a):")
+
+
+def test_insertion_at_start_of_body():
+    snippet = """# ... existing code ...
+def foo():
+    y = 0
+    x = 1
+# ... existing code ...
+"""
+    assert apply_edit_snippet(ORIGINAL, snippet) == ORIGINAL.replace("    x = 1\n", "    y = 0\n    x = 1\n")
+
+
+def test_deletion_between_anchors():
+    snippet = """import os
+
+
+def foo():
+# ... existing code ...
+"""
+    assert apply_edit_snippet(ORIGINAL, snippet) == ORIGINAL.replace("import sys\n", "")
+
+
+def test_append_keeps_definitions_apart():
+    snippet = """# ... existing code ...
+def baz():
+    return 3
+"""
+    assert apply_edit_snippet(ORIGINAL, snippet) == ORIGINAL + "\n\ndef baz():\n    return 3\n"
+
+
+def test_keeps_crlf_line_endings():
+    original = ORIGINAL.replace("\n", "\r\n")
+    snippet = "# ... existing code ...\ndef bar(a):\n    return 2\n"
+    assert apply_edit_snippet(original, snippet) == original.replace("def bar():", "def bar(a):")
+
+
+def test_body_replacement_before_marker_is_ambiguous():
+    # The new body could be inserted above the old one or replace it
+    with pytest.raises(AmbiguousEditError):
+        apply_edit_snippet("def foo():\n    x = 1\n    return x\n", "# ... existing code ...\ndef foo():\n    return 1\n# ... existing code ...\n")
+
+
+def test_new_code_after_marker_within_block_is_ambiguous():
+    with pytest.raises(AmbiguousEditError):
+        apply_edit_snippet(ORIGINAL, "# ... existing code ...\n    y = 2\n    return x\n# ... existing code ...\n")
+
+
+def test_unmarked_boundary_line_is_not_dropped():
+    with pytest.raises(AmbiguousEditError, match="import os"):
+        apply_edit_snippet(ORIGINAL, "import sys\n\n\ndef foo():\n# ... existing code ...\n")
+
+
+def test_excerpt_without_markers_is_not_a_whole_file():
+    with pytest.raises(AmbiguousEditError):
+        apply_edit_snippet(ORIGINAL, "def foo():\n    return 1\n")
+
+
+def test_unanchored_code_between_markers():
+    with pytest.raises(AmbiguousEditError, match="anchor"):
+        apply_edit_snippet(ORIGINAL, "# ... existing code ...\ndef baz():\n    return 3\n# ... existing code ...\n")
+
+
+def test_snippet_without_code():
+    with pytest.raises(AmbiguousEditError):
+        apply_edit_snippet(ORIGINAL, "# ... existing code ...\n")
@@ -0,0 +1,150 @@
+"""Batch moves by `move_symbols` and their rollback through the edit journal."""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from codegen.extensions.tools.edit_journal import get_edit_journal
+from codegen.extensions.tools.move_symbol import SymbolMove, move_symbols
+
+
+def _module(filepath: str) -> str:
+    return filepath.removesuffix(".py").replace("/", ".")
+
+
+@dataclass
+class FakeUsage:
+    file: "FakeFile"
+
+
+class FakeSymbol:
+    """A one line function, imported elsewhere with `from <module> import <name>`."""
+
+    dependencies: list["FakeSymbol"] = []
+
+    def __init__(self, codebase: "FakeCodebase", filepath: str, name: str) -> None:
+        self.codebase = codebase
+        self.filepath = filepath
+        self.name = name
+
+    def _import_re(self) -> re.Pattern[str]:
+        return re.compile(rf"^from {re.escape(_module(self.filepath))} import {self.name}$", re.MULTILINE)
+
+    @property
+    def symbol_usages(self) -> list[FakeUsage]:
+        return [FakeUsage(FakeFile(self.codebase, path)) for path, content in self.codebase.files.items() if self._import_re().search(content)]
+
+    def move_to_file(self, target: "FakeFile", include_dependencies: bool, strategy: str) -> None:
+        if self.name in self.codebase.fail_on:
+            msg = f"{self.name} has a circular dependency"
+            raise RuntimeError(msg)
+        files = self.codebase.files
+        definition = f"def {self.name}(): ...\n"
+        pattern = self._import_re()
+        files[self.filepath] = files[self.filepath].replace(definition, "")
+        files[target.filepath] += definition
+        for path, content in files.items():
+            files[path] = pattern.sub(f"from {_module(target.filepath)} import {self.name}", content)
+        self.filepath = target.filepath
+
+
+class FakeFile:
+    def __init__(self, codebase: "FakeCodebase", filepath: str) -> None:
+        self.codebase = codebase
+        self.filepath = filepath
+
+    @property
+    def content(self) -> str:
+        return self.codebase.files[self.filepath]
+
+    def get_symbol(self, name: str) -> Optional[FakeSymbol]:
+        return FakeSymbol(self.codebase, self.filepath, name) if f"def {name}(" in self.content else None
+
+    def edit(self, content: str) -> None:
+        self.codebase.files[self.filepath] = content
+
+    def remove(self) -> None:
+        del self.codebase.files[self.filepath]
+
+
+class FakeCodebase:
+    """The part of the Codebase API symbol moves use."""
+
+    def __init__(self, files: dict[str, str], fail_on: tuple[str, ...] = ()) -> None:
+        self.files = dict(files)
+        self.fail_on = fail_on
+
+    def has_file(self, filepath: str) -> bool:
+        return filepath in self.files
+
+    def get_file(self, filepath: str) -> FakeFile:
+        return FakeFile(self, filepath)
+
+    def create_file(self, filepath: str, content: str) -> FakeFile:
+        self.files[filepath] = content
+        return FakeFile(self, filepath)
+
+    def commit(self) -> None:
+        pass
+
+
+FILES = {
+    "utils.py": "def foo(): ...\ndef bar(): ...\n",
+    "main.py": "from utils import foo\nfrom utils import bar\n",
+}
+MOVES = [
+    SymbolMove(source_file="utils.py", symbol_name="foo", target_file="helpers.py"),
+    SymbolMove(source_file="utils.py", symbol_name="bar", target_file="helpers.py"),
+]
+
+
+def test_moves_into_new_file():
+    codebase = FakeCodebase(FILES)
+    result = move_symbols(codebase, MOVES)
+
+    assert result.status == "success"
+    assert codebase.files == {
+        "utils.py": "",
+        "main.py": "from helpers import foo\nfrom helpers import bar\n",
+        "helpers.py": "def foo(): ...\ndef bar(): ...\n",
+    }
+    assert result.moved == ["foo: utils.py -> helpers.py", "bar: utils.py -> helpers.py"]
+    assert sorted(result.files_changed) == ["helpers.py (new) | +2", "main.py | +2 -2", "utils.py | +0 -2"]
+
+
+def test_rollback_undoes_moves():
+    codebase = FakeCodebase(FILES)
+    journal = get_edit_journal(codebase)
+    journal.checkpoint("start")
+
+    move_symbols(codebase, MOVES)
+    journal.rollback(codebase, "start")
+
+    assert codebase.files == FILES
+
+
+def test_failed_batch_lists_applied_moves():
+    codebase = FakeCodebase(FILES, fail_on=("bar",))
+    journal = get_edit_journal(codebase)
+    journal.checkpoint("start")
+    result = move_symbols(codebase, MOVES)
+
+    assert result.status == "error"
+    assert result.moved == ["foo: utils.py -> helpers.py"]
+    rendered = result.render()
+    assert "Failed to move symbol bar" in rendered
+    assert "foo: utils.py -> helpers.py" in rendered
+    assert "main.py | +1 -1" in rendered
+
+    # The applied moves are journaled, so they can still be undone
+    journal.rollback(codebase, "start")
+    assert codebase.files == FILES
+
+
+def test_invalid_batch_changes_nothing():
+    codebase = FakeCodebase(FILES)
+    result = move_symbols(codebase, [*MOVES, SymbolMove(source_file="utils.py", symbol_name="baz", target_file="helpers.py")])
+
+    assert result.status == "error"
+    assert result.render() == "[MOVE SYMBOLS ERROR]: Symbol 'baz' not found in utils.py"
+    assert codebase.files == FILES
@@ -0,0 +1,118 @@
+"""Batch renames by `rename_files` and their rollback through the edit journal."""
+
+import re
+from dataclasses import dataclass
+
+from codegen.extensions.tools.edit_journal import get_edit_journal
+from codegen.extensions.tools.rename_file import FileRename, rename_files
+
+
+def _module(filepath: str) -> str:
+    return filepath.removesuffix(".py").replace("/", ".")
+
+
+@dataclass
+class FakeImport:
+    file: "FakeFile"
+
+
+class FakeFile:
+    def __init__(self, codebase: "FakeCodebase", filepath: str) -> None:
+        self.codebase = codebase
+        self.filepath = filepath
+
+    @property
+    def content(self) -> str:
+        return self.codebase.files[self.filepath]
+
+    @property
+    def inbound_imports(self) -> list[FakeImport]:
+        pattern = re.compile(rf"^import {re.escape(_module(self.filepath))}$", re.MULTILINE)
+        return [FakeImport(FakeFile(self.codebase, path)) for path, content in self.codebase.files.items() if pattern.search(content)]
+
+    def edit(self, content: str) -> None:
+        self.codebase.files[self.filepath] = content
+
+    def remove(self) -> None:
+        del self.codebase.files[self.filepath]
+
+    def update_filepath(self, new_filepath: str) -> None:
+        if new_filepath in self.codebase.fail_on:
+            msg = f"cannot write {new_filepath}"
+            raise OSError(msg)
+        pattern = re.compile(rf"^import {re.escape(_module(self.filepath))}$", re.MULTILINE)
+        files = self.codebase.files
+        files[new_filepath] = files.pop(self.filepath)
+        for path, content in files.items():
+            files[path] = pattern.sub(f"import {_module(new_filepath)}", content)
+        self.filepath = new_filepath
+
+
+class FakeCodebase:
+    """The part of the Codebase API renames use, with imports written as `import <module>`."""
+
+    def __init__(self, files: dict[str, str], fail_on: tuple[str, ...] = ()) -> None:
+        self.files = dict(files)
+        self.fail_on = fail_on
+
+    def has_file(self, filepath: str) -> bool:
+        return filepath in self.files
+
+    def get_file(self, filepath: str) -> FakeFile:
+        return FakeFile(self, filepath)
+
+    def create_file(self, filepath: str, content: str) -> FakeFile:
+        self.files[filepath] = content
+        return FakeFile(self, filepath)
+
+    def commit(self) -> None:
+        pass
+
+
+FILES = {
+    "a.py": "import b\n",
+    "b.py": "x = 1\n",
+    "main.py": "import a\nimport b\n",
+}
+
+
+def test_summary_includes_imports_updated_in_renamed_files():
+    codebase = FakeCodebase(FILES)
+    result = rename_files(codebase, [FileRename(filepath="a.py", new_filepath="pkg/a.py"), FileRename(filepath="b.py", new_filepath="pkg/b.py")])
+
+    assert result.status == "success"
+    assert codebase.files == {"pkg/a.py": "import pkg.b\n", "pkg/b.py": "x = 1\n", "main.py": "import pkg.a\nimport pkg.b\n"}
+    assert result.renamed == ["a.py -> pkg/a.py", "b.py -> pkg/b.py"]
+    assert sorted(result.files_changed) == ["main.py | +2 -2", "pkg/a.py | +1 -1"]
+
+
+def test_rollback_restores_renamed_files_and_importers():
+    codebase = FakeCodebase(FILES)
+    journal = get_edit_journal(codebase)
+    journal.checkpoint("start")
+
+    rename_files(codebase, [FileRename(filepath="a.py", new_filepath="pkg/a.py"), FileRename(filepath="b.py", new_filepath="pkg/b.py")])
+    journal.rollback(codebase, "start")
+
+    assert codebase.files == FILES
+
+
+def test_failed_batch_lists_applied_renames():
+    codebase = FakeCodebase(FILES, fail_on=("pkg/b.py",))
+    result = rename_files(codebase, [FileRename(filepath="a.py", new_filepath="pkg/a.py"), FileRename(filepath="b.py", new_filepath="pkg/b.py")])
+
+    assert result.status == "error"
+    assert result.renamed == ["a.py -> pkg/a.py"]
+    assert result.files_changed == ["main.py | +1 -1"]
+    rendered = result.render()
+    assert "Failed to rename b.py" in rendered
+    assert "a.py -> pkg/a.py" in rendered
+
+
+def test_invalid_batch_changes_nothing():
+    codebase = FakeCodebase(FILES)
+    result = rename_files(codebase, [FileRename(filepath="a.py", new_filepath="c.py"), FileRename(filepath="missing.py", new_filepath="d.py")])
+
+    assert result.status == "error"
+    assert result.render() == "[RENAME FILES ERROR]: File not found: missing.py"
+    assert codebase.files == FILES